@@ -0,0 +1,63 @@
+"""
+Mesure des octets transférés et de la latence selon l'encodage négocié.
+
+Usage:
+    python scripts/bench_compression.py --url http://localhost:5001 [--requetes 50]
+        [--chemins /api/admin/capteurs,/api/capteurs/conformite,/api/capteurs/salles/1/temperature?limit=5000]
+
+Pour chaque chemin et chaque encodage (identity, gzip, br), envoie --requetes requêtes
+séquentielles et affiche la taille du corps reçu (compressé, tel que sur le réseau)
+ainsi que les latences p50 et p95. À lancer depuis un poste distant pour mesurer
+le gain réel via le tunnel SSH de production.
+"""
+import argparse
+import http.client
+import statistics
+import time
+from urllib.parse import urlsplit
+
+CHEMINS = '/api/admin/capteurs,/api/capteurs/conformite,/api/capteurs/salles/1/temperature?limit=5000'
+ENCODAGES = ('identity', 'gzip', 'br')
+
+
+def percentile(valeurs, q):
+    valeurs = sorted(valeurs)
+    return valeurs[min(int(q * len(valeurs)), len(valeurs) - 1)]
+
+
+def mesurer(url, chemin, encodage, requetes):
+    connexion_cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    conn = connexion_cls(url.netloc, timeout=60)
+    latences, taille, encodage_recu = [], 0, None
+    for _ in range(requetes):
+        debut = time.perf_counter()
+        conn.request('GET', chemin, headers={'Accept-Encoding': encodage})
+        response = conn.getresponse()
+        corps = response.read()
+        latences.append((time.perf_counter() - debut) * 1000)
+        taille = len(corps)
+        encodage_recu = response.getheader('Content-Encoding', 'identity')
+    conn.close()
+    return taille, encodage_recu, statistics.median(latences), percentile(latences, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Octets transférés et latence par encodage")
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--chemins', default=CHEMINS)
+    parser.add_argument('--requetes', type=int, default=50)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    for chemin in args.chemins.split(','):
+        print(chemin)
+        reference = None
+        for encodage in ENCODAGES:
+            taille, recu, p50, p95 = mesurer(url, chemin, encodage, args.requetes)
+            reference = reference or taille
+            print(f"  {encodage:<9} -> {recu:<9} {taille / 1024:9.1f} Kio ({taille / reference:5.1%})"
+                  f"  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
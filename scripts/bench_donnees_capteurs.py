@@ -0,0 +1,75 @@
+"""
+Latence des dernières données de N capteurs : un appel par capteur contre un appel groupé.
+
+Usage:
+    python scripts/bench_donnees_capteurs.py --url http://localhost:5001 [--tailles 1,10,100,1000]
+        [--limit 1] [--requetes 20]
+
+Les IDs sont pris parmi les capteurs actifs (GET /api/admin/capteurs), complétés par des
+IDs inexistants s'il y a moins de capteurs que la taille demandée.
+Pour chaque taille, affiche la latence p50/p95 de POST /api/capteurs/donnees et, jusqu'à
+100 capteurs, la durée cumulée des appels GET /api/capteurs/:id/donnees séquentiels.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(valeurs, q):
+    valeurs = sorted(valeurs)
+    return valeurs[min(int(q * len(valeurs)), len(valeurs) - 1)]
+
+
+def appeler(conn, methode, chemin, corps=None):
+    headers = {'Content-Type': 'application/json'} if corps is not None else {}
+    conn.request(methode, chemin, body=json.dumps(corps) if corps is not None else None, headers=headers)
+    response = conn.getresponse()
+    donnees = response.read()
+    if response.status >= 400 and response.status != 404:
+        raise RuntimeError(f"{methode} {chemin} : HTTP {response.status}")
+    return json.loads(donnees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dernières données de N capteurs, une requête ou N")
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--tailles', default='1,10,100,1000')
+    parser.add_argument('--limit', type=int, default=1)
+    parser.add_argument('--requetes', type=int, default=20)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    connexion_cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    conn = connexion_cls(url.netloc, timeout=60)
+
+    capteurs = appeler(conn, 'GET', '/api/admin/capteurs')['data']['capteurs']
+    ids_actifs = [capteur['id'] for capteur in capteurs if capteur.get('is_active', True)]
+    if not ids_actifs:
+        print("Aucun capteur actif")
+        return
+
+    for taille in (int(t) for t in args.tailles.split(',')):
+        ids = ids_actifs[:taille]
+        ids += list(range(max(ids_actifs) + 1, max(ids_actifs) + 1 + taille - len(ids)))
+        latences = []
+        for _ in range(args.requetes):
+            debut = time.perf_counter()
+            appeler(conn, 'POST', '/api/capteurs/donnees', {'ids': ids, 'limit': args.limit})
+            latences.append((time.perf_counter() - debut) * 1000)
+        ligne = f"{taille:5d} IDs  groupé p50 {statistics.median(latences):7.1f} ms  p95 {percentile(latences, 0.95):7.1f} ms"
+
+        if taille <= 100:
+            debut = time.perf_counter()
+            for capteur_id in ids:
+                appeler(conn, 'GET', f'/api/capteurs/{capteur_id}/donnees?limit={args.limit}')
+            ligne += f"  |  {taille} appels unitaires {(time.perf_counter() - debut) * 1000:8.1f} ms"
+        print(ligne)
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
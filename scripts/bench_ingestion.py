@@ -0,0 +1,69 @@
+"""
+Mesure du débit d'ingestion de POST /api/capteurs/mesures (mesures/seconde).
+
+Usage:
+    python scripts/bench_ingestion.py --url http://localhost:5000 \
+        --capteurs 1,2,3 --type temperature --lots 20 --taille 5000 [--ndjson]
+
+Les capteurs indiqués doivent être actifs et du type donné.
+Lancer l'API avec un seul worker pour obtenir le débit par worker.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+
+def generer_lot(capteur_ids, taille, debut):
+    return [
+        {
+            'capteur_id': random.choice(capteur_ids),
+            'valeur': round(random.uniform(18, 26), 2),
+            'date_update': (debut + timedelta(milliseconds=i)).isoformat()
+        }
+        for i in range(taille)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion de mesures")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--capteurs', required=True, help='IDs de capteurs séparés par des virgules')
+    parser.add_argument('--type', default='temperature')
+    parser.add_argument('--lots', type=int, default=20)
+    parser.add_argument('--taille', type=int, default=5000)
+    parser.add_argument('--ndjson', action='store_true')
+    args = parser.parse_args()
+
+    capteur_ids = [int(c) for c in args.capteurs.split(',')]
+    url = f"{args.url}/api/capteurs/mesures"
+    session = requests.Session()
+
+    total = 0
+    debut_bench = time.perf_counter()
+    for numero in range(args.lots):
+        lot = generer_lot(capteur_ids, args.taille, datetime.now())
+        for mesure in lot:
+            mesure['type'] = args.type
+
+        if args.ndjson:
+            body = '\n'.join(json.dumps(m) for m in lot)
+            response = session.post(url, data=body, headers={'Content-Type': 'application/x-ndjson'})
+        else:
+            response = session.post(url, json=lot)
+
+        response.raise_for_status()
+        data = response.json()['data']
+        total += data['inserees']
+        print(f"Lot {numero + 1}/{args.lots} : {data['inserees']} insérées, "
+              f"{data['mesures_par_seconde']} mesures/s côté serveur")
+
+    duree = time.perf_counter() - debut_bench
+    print(f"Total : {total} mesures en {duree:.2f}s -> {total / duree:.0f} mesures/s (client)")
+
+
+if __name__ == '__main__':
+    main()
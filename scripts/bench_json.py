@@ -0,0 +1,70 @@
+"""
+Benchmark de sérialisation JSON d'un historique de 10 000 mesures.
+
+Usage:
+    python scripts/bench_json.py [--lignes 10000] [--repetitions 20]
+
+Les lignes ont la forme renvoyée par CapteurService.get_temperature_by_salle
+(valeur en Decimal et date_update en datetime, comme avec PyMySQL), enveloppées
+comme par create_response. Compare le provider par défaut de Flask (json de la
+bibliothèque standard) au provider orjson de l'application, sur jsonify().
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from app.json_provider import ClimHeticJSONProvider
+
+
+def historique(nb_lignes):
+    debut = datetime(2025, 1, 1)
+    return [
+        {
+            'capteur_id': 1 + i % 3,
+            'nom': f'TEMP_A01_{i % 3}',
+            'valeur': Decimal('21.00') + Decimal(i % 700) / 100,
+            'unite': '°C',
+            'date_update': debut + timedelta(minutes=i),
+            'salle_nom': 'A01',
+            'batiment': 'A',
+            'etage': 0
+        }
+        for i in range(nb_lignes)
+    ]
+
+
+def mesurer(provider, donnees, repetitions):
+    app = Flask(__name__)
+    app.json = provider(app)
+    with app.test_request_context():
+        taille = len(jsonify(success=True, message='ok', data=donnees).get_data())
+        duree = min(timeit.repeat(
+            lambda: jsonify(success=True, message='ok', data=donnees), number=repetitions, repeat=3
+        )) / repetitions
+    return duree * 1000, taille
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du provider JSON")
+    parser.add_argument('--lignes', type=int, default=10000)
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    donnees = historique(args.lignes)
+    print(f"jsonify d'un historique de {args.lignes} lignes (meilleur de 3 x {args.repetitions}) :")
+    avant, taille_avant = mesurer(DefaultJSONProvider, donnees, args.repetitions)
+    apres, taille_apres = mesurer(ClimHeticJSONProvider, donnees, args.repetitions)
+    print(f"  json (Flask par défaut) : {avant:7.2f} ms  {taille_avant / 1024:7.0f} Kio")
+    print(f"  orjson (ClimHetic)      : {apres:7.2f} ms  {taille_apres / 1024:7.0f} Kio  (x{avant / apres:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark du coût par appel de app.queries avant/après le cache des requêtes compilées.
+
+Usage:
+    python scripts/bench_queries.py [--iterations 20000]
+
+Mesure, sans serveur MariaDB :
+  - la préparation seule (réécriture des %s et construction du TextClause) ;
+  - un appel complet execute_query sur une base SQLite en mémoire ;
+  - le nombre de checkouts du pool pour plusieurs requêtes SQL dans une même requête HTTP.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+
+import app.database as database
+import app.queries as queries
+
+REQUETE = """
+    SELECT c.id, c.nom, c.type_capteur, c.date_installation, s.nom as salle_nom
+    FROM capteur c
+    JOIN salle s ON c.id_salle = s.id
+    WHERE c.id_salle = %s AND c.is_active = %s
+    ORDER BY c.type_capteur, c.nom
+    LIMIT %s
+"""
+PARAMS = (1, 1, 10)
+
+
+def preparer_sans_cache(query, params):
+    """Ancienne implémentation : réécriture et text() à chaque appel"""
+    param_dict = {f'param_{i}': param for i, param in enumerate(params)}
+    query_with_params = query
+    for i in range(len(params)):
+        query_with_params = query_with_params.replace('%s', f':param_{i}', 1)
+    return text(query_with_params), param_dict
+
+
+def preparer_avec_cache(query, params):
+    statement, noms = queries.compiler_requete(query, len(params))
+    return statement, dict(zip(noms, params))
+
+
+def execute_query_sans_cache(query, params):
+    with database.engine.connect() as conn:
+        statement, param_dict = preparer_sans_cache(query, params)
+        result = conn.execute(statement, param_dict)
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+
+
+def mesurer(fonction, iterations):
+    return min(timeit.repeat(fonction, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du cache de requêtes de app.queries")
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"Préparation seule ({args.iterations} appels, meilleur de 5) :")
+    avant = mesurer(lambda: preparer_sans_cache(REQUETE, PARAMS), args.iterations)
+    apres = mesurer(lambda: preparer_avec_cache(REQUETE, PARAMS), args.iterations)
+    print(f"  sans cache : {avant:.2f} µs/appel")
+    print(f"  avec cache : {apres:.2f} µs/appel  (x{avant / apres:.1f})")
+
+    database.engine = create_engine("sqlite://")
+    with database.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE salle (id INTEGER PRIMARY KEY, nom TEXT)"))
+        conn.execute(text(
+            "CREATE TABLE capteur (id INTEGER PRIMARY KEY, nom TEXT, type_capteur TEXT, "
+            "date_installation TEXT, id_salle INTEGER, is_active INTEGER)"
+        ))
+        conn.execute(text("INSERT INTO salle VALUES (1, 'A01')"))
+        for i in range(3):
+            conn.execute(text(
+                f"INSERT INTO capteur VALUES ({i + 1}, 'c{i}', 'temperature', '2025-01-01', 1, 1)"
+            ))
+
+    iterations = args.iterations // 4
+    print(f"\nexecute_query complet sur SQLite en mémoire ({iterations} appels, meilleur de 5) :")
+    avant = mesurer(lambda: execute_query_sans_cache(REQUETE, PARAMS), iterations)
+    apres = mesurer(lambda: queries.execute_query(REQUETE, PARAMS), iterations)
+    print(f"  sans cache : {avant:.2f} µs/appel")
+    print(f"  avec cache : {apres:.2f} µs/appel  (x{avant / apres:.1f})")
+
+    print(f"\nCache : {queries.compiler_requete.cache_info()}")
+
+    checkouts = []
+    event.listen(database.engine, 'checkout', lambda *args: checkouts.append(1))
+    app = Flask(__name__)
+    database.init_app(app)
+
+    for _ in range(6):
+        queries.execute_query(REQUETE, PARAMS)
+    hors_requete = len(checkouts)
+    checkouts.clear()
+    with app.test_request_context():
+        for _ in range(6):
+            queries.execute_query(REQUETE, PARAMS)
+        app.do_teardown_request()
+    print(f"\nCheckouts du pool pour 6 requêtes SQL : {hors_requete} sans connexion de requête, "
+          f"{len(checkouts)} avec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark requêtes/seconde : serveur de développement Flask contre gunicorn.
+
+Usage:
+    python scripts/bench_serveur.py [--modes dev,sync,gevent] [--chemin /api/health]
+                                    [--clients 32] [--duree 10]
+
+Chaque mode est lancé dans un sous-processus sur un port libre, puis des clients
+concurrents (threads, connexions keep-alive) appellent le chemin en boucle pendant
+--duree secondes. /api/health ne touche pas la base ; passer par exemple
+--chemin /api/capteurs/salles pour inclure MariaDB (variables DB_* nécessaires).
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SRC = os.path.join(RACINE, 'src')
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def commande(mode):
+    if mode == 'dev':
+        return [sys.executable, os.path.join(SRC, 'main.py')]
+    return [sys.executable, '-m', 'gunicorn', '--config', os.path.join(SRC, 'gunicorn.conf.py'),
+            '--access-logfile', '/dev/null', 'wsgi:app']
+
+
+def environnement(mode, port):
+    env = dict(os.environ, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port), FLASK_DEBUG='false')
+    if mode != 'dev':
+        env['GUNICORN_WORKER_CLASS'] = mode
+    return env
+
+
+def attendre_serveur(port, chemin, delai=20):
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', chemin)
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client(port, chemin, fin, resultats):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    ok = erreurs = 0
+    while time.monotonic() < fin:
+        try:
+            conn.request('GET', chemin)
+            response = conn.getresponse()
+            response.read()
+            if response.status < 500:
+                ok += 1
+            else:
+                erreurs += 1
+        except (OSError, http.client.HTTPException):
+            erreurs += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    resultats.append((ok, erreurs))
+
+
+def mesurer(mode, chemin, clients, duree):
+    port = port_libre()
+    processus = subprocess.Popen(commande(mode), cwd=SRC, env=environnement(mode, port),
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not attendre_serveur(port, chemin):
+            return None
+
+        resultats = []
+        fin = time.monotonic() + duree
+        threads = [threading.Thread(target=client, args=(port, chemin, fin, resultats)) for _ in range(clients)]
+        debut = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ecoule = time.monotonic() - debut
+
+        ok = sum(r[0] for r in resultats)
+        erreurs = sum(r[1] for r in resultats)
+        return ok / ecoule, erreurs
+    finally:
+        processus.terminate()
+        processus.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serveur de développement vs gunicorn")
+    parser.add_argument('--modes', default='dev,sync,gevent')
+    parser.add_argument('--chemin', default='/api/health')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duree', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.chemin}, {args.clients} clients, {args.duree:.0f} s par mode")
+    reference = None
+    for mode in args.modes.split(','):
+        resultat = mesurer(mode, args.chemin, args.clients, args.duree)
+        if resultat is None:
+            print(f"  {mode:<7}: serveur non démarré (gunicorn/gevent installés ?)")
+            continue
+        debit, erreurs = resultat
+        reference = reference or debit
+        print(f"  {mode:<7}: {debit:8.0f} req/s  (x{debit / reference:.1f}, {erreurs} erreurs)")
+
+
+if __name__ == '__main__':
+    main()
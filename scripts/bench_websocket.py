@@ -0,0 +1,207 @@
+"""
+Test de charge du hub WebSocket : N clients simulés sur un seul worker gevent.
+
+Usage:
+    python scripts/bench_websocket.py --capteurs 1,2,3 --type temperature \
+        [--clients 5000] [--salles 1,2] [--duree 30] [--url ws://localhost:5000]
+
+Sans --url, l'API est lancée sous gunicorn avec un seul worker gevent et
+GUNICORN_WORKER_CONNECTIONS ajusté au nombre de clients (variables DB_* nécessaires).
+Chaque client s'abonne à une salle tirée parmi --salles ; une mesure par capteur est
+envoyée chaque seconde via POST /api/capteurs/mesures. On mesure la latence entre
+l'envoi d'une mesure et sa réception par les clients, et la part des événements
+attendus effectivement reçus (les clients trop lents perdent des événements).
+
+Nécessite gevent et simple-websocket (dépendance de flask-sock), et une limite de
+descripteurs de fichiers suffisante (ulimit -n) pour le client et le serveur.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import gevent
+import requests
+from simple_websocket import Client, ConnectionClosed
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SRC = os.path.join(RACINE, 'src')
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def lancer_serveur(port, clients):
+    env = dict(os.environ, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port), FLASK_DEBUG='false',
+               GUNICORN_WORKER_CLASS='gevent', GUNICORN_WORKERS='1',
+               GUNICORN_WORKER_CONNECTIONS=str(clients + 100), GUNICORN_MAX_REQUESTS='0')
+    commande = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(SRC, 'gunicorn.conf.py'),
+                '--access-logfile', '/dev/null', 'wsgi:app']
+    return subprocess.Popen(commande, cwd=SRC, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def attendre_serveur(url_http, delai=20):
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        try:
+            requests.get(f"{url_http}/api/health", timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def memoire_worker(pid_master):
+    """Mémoire résidente du worker gunicorn (premier enfant du master) en Mo (Linux)"""
+    try:
+        with open(f'/proc/{pid_master}/task/{pid_master}/children') as fichier:
+            pid = fichier.read().split()[0]
+        with open(f'/proc/{pid}/status') as fichier:
+            for ligne in fichier:
+                if ligne.startswith('VmRSS:'):
+                    return int(ligne.split()[1]) / 1024
+    except (OSError, IndexError):
+        return None
+
+
+class Statistiques:
+    def __init__(self):
+        self.connectes = 0
+        self.echecs = 0
+        self.abonnes_par_salle = defaultdict(int)
+        self.envois = {}
+        self.receptions = defaultdict(int)
+        self.salle_par_valeur = {}
+        self.latences = []
+
+
+def client(url_ws, salle_id, stats, fin):
+    try:
+        ws = Client.connect(f"{url_ws}/api/capteurs/ws")
+    except Exception:
+        stats.echecs += 1
+        return
+    stats.connectes += 1
+    try:
+        ws.send(json.dumps({'action': 'abonner', 'salle_ids': [salle_id]}))
+        stats.abonnes_par_salle[salle_id] += 1
+        while time.monotonic() < fin:
+            message = ws.receive(timeout=1)
+            if message is None:
+                continue
+            evenement = json.loads(message)
+            if evenement['event'] != 'mesure':
+                continue
+            valeur = evenement['data']['valeur']
+            envoi = stats.envois.get(valeur)
+            if envoi is not None:
+                stats.latences.append(time.monotonic() - envoi)
+                stats.receptions[valeur] += 1
+                stats.salle_par_valeur[valeur] = evenement['data']['salle_id']
+    except ConnectionClosed:
+        pass
+    finally:
+        ws.close()
+
+
+def publier(url_http, capteur_ids, type_mesure, stats, fin):
+    """Une mesure par capteur et par seconde, avec une valeur unique pour la retrouver"""
+    session = requests.Session()
+    compteur = 0
+    while time.monotonic() < fin:
+        lot = []
+        for capteur_id in capteur_ids:
+            compteur += 1
+            valeur = round(10 + compteur / 100, 2)
+            lot.append({'capteur_id': capteur_id, 'type': type_mesure, 'valeur': valeur,
+                        'date_update': datetime.now().isoformat()})
+            stats.envois[valeur] = time.monotonic()
+        session.post(f"{url_http}/api/capteurs/mesures", json=lot).raise_for_status()
+        gevent.sleep(1)
+
+
+def percentile(valeurs, p):
+    if not valeurs:
+        return 0
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du hub WebSocket")
+    parser.add_argument('--url', help='URL ws:// d\'une API déjà lancée')
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--salles', default='1', help='IDs de salles séparés par des virgules')
+    parser.add_argument('--capteurs', required=True, help='IDs de capteurs actifs de ces salles')
+    parser.add_argument('--type', default='temperature')
+    parser.add_argument('--duree', type=float, default=30)
+    args = parser.parse_args()
+
+    _, maximum = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximum, maximum))
+
+    processus = None
+    if args.url:
+        url_ws = args.url
+    else:
+        port = port_libre()
+        processus = lancer_serveur(port, args.clients)
+        url_ws = f"ws://127.0.0.1:{port}"
+    url_http = url_ws.replace('ws://', 'http://').replace('wss://', 'https://')
+
+    try:
+        if not attendre_serveur(url_http):
+            print("Serveur non démarré (gunicorn, gevent et flask-sock installés ?)")
+            return
+
+        salle_ids = [int(s) for s in args.salles.split(',')]
+        capteur_ids = [int(c) for c in args.capteurs.split(',')]
+        stats = Statistiques()
+
+        # Connexions étalées sur environ 5 s, puis mesures pendant --duree secondes
+        debut = time.monotonic()
+        fin = debut + 5 + args.duree
+        clients = []
+        for i in range(args.clients):
+            clients.append(gevent.spawn(client, url_ws, random.choice(salle_ids), stats, fin + 2))
+            if i % 500 == 499:
+                gevent.sleep(0.5)
+        gevent.sleep(max(0, debut + 5 - time.monotonic()))
+        connexion_s = time.monotonic() - debut
+
+        gevent.joinall([gevent.spawn(publier, url_http, capteur_ids, args.type, stats, fin)])
+        gevent.joinall(clients, timeout=10)
+
+        attendues = sum(stats.abonnes_par_salle[stats.salle_par_valeur[v]] for v in stats.salle_par_valeur)
+        recues = sum(stats.receptions.values())
+        print(f"{stats.connectes} clients connectés en {connexion_s:.1f} s ({stats.echecs} échecs)")
+        print(f"{len(stats.envois)} mesures envoyées, {recues} événements reçus"
+              f" ({recues / attendues * 100 if attendues else 0:.1f} % des attendus)")
+        print(f"Latence envoi -> réception : p50 {percentile(stats.latences, 50) * 1000:.0f} ms,"
+              f" p95 {percentile(stats.latences, 95) * 1000:.0f} ms,"
+              f" p99 {percentile(stats.latences, 99) * 1000:.0f} ms")
+        if processus is not None:
+            memoire = memoire_worker(processus.pid)
+            if memoire is not None:
+                print(f"Mémoire du worker : {memoire:.0f} Mo")
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
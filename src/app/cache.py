@@ -0,0 +1,301 @@
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import make_response, request
+from app.metrics import metriques
+from app.single_flight import SingleFlight
+from app.versions import data_versions
+
+InfoCache = namedtuple('InfoCache', ['hits', 'misses', 'taille', 'taille_max', 'appels_partages', 'servies_perimees'])
+
+FRAIS = 'frais'
+PERIME = 'perime'
+
+class CacheReponses:
+    """
+    Cache LRU en mémoire du processus, borné en nombre d'entrées, avec durée de vie
+    par entrée et invalidation par tags.
+
+    Les tags sont les noms de tables suivis par app.versions (salle, capteur) : chaque
+    entrée mémorise la version de ses tags au moment du calcul et n'est plus servie dès
+    qu'une écriture a changé l'une d'elles, y compris depuis un autre worker gunicorn.
+    Dans le worker qui écrit, les entrées concernées sont en plus retirées aussitôt.
+
+    En cas d'absence, les appels simultanés pour une même clé partagent un seul calcul
+    (SingleFlight), y compris quand le cache est désactivé.
+
+    Les valeurs sont partagées entre les appels : elles ne doivent pas être modifiées.
+    """
+
+    def __init__(self, taille_max=1024, actif=True):
+        """
+        Args:
+            taille_max (int): Nombre maximal d'entrées, les moins récemment lues sont évincées
+            actif (bool): False pour désactiver le cache (chaque appel est alors exécuté)
+        """
+        self.taille_max = taille_max
+        self.actif = actif
+        self._lock = threading.Lock()
+        self._entrees = OrderedDict()
+        self._vols = SingleFlight()
+        self._rafraichissements = set()
+        self.hits = 0
+        self.misses = 0
+        self.perimees = 0
+
+    def _lire(self, cle):
+        """
+        Returns:
+            tuple: (état, valeur), état valant FRAIS, PERIME (durée de vie dépassée mais
+                obsolescence maximale non atteinte) ou None
+        """
+        with self._lock:
+            entree = self._entrees.get(cle)
+        if entree is None:
+            return None, None
+        expiration, limite, tags, versions, valeur = entree
+        maintenant = time.monotonic()
+        if limite > maintenant and data_versions.get_versions(tags) == versions:
+            with self._lock:
+                if cle in self._entrees:
+                    self._entrees.move_to_end(cle)
+            return (FRAIS if expiration > maintenant else PERIME), valeur
+        with self._lock:
+            if self._entrees.get(cle) is entree:
+                del self._entrees[cle]
+        return None, None
+
+    def get(self, cle):
+        """
+        Returns:
+            tuple: (trouvé, valeur)
+        """
+        etat, valeur = self._lire(cle)
+        with self._lock:
+            if etat is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return etat is not None, valeur
+
+    def set(self, cle, valeur, ttl, tags=(), versions=None, obsolescence_max=0):
+        """
+        Args:
+            cle: Clé hashable
+            valeur: Valeur à mettre en cache
+            ttl (float): Durée de vie en secondes
+            tags (tuple): Tables dont dépend la valeur
+            versions (tuple): Versions des tags lues avant le calcul de la valeur ; une
+                écriture survenue pendant le calcul rend ainsi l'entrée aussitôt périmée
+            obsolescence_max (float): Durée en secondes après ttl pendant laquelle la valeur
+                peut encore être servie, le temps de son recalcul en arrière-plan
+        """
+        if versions is None:
+            versions = data_versions.get_versions(tags)
+        expiration = time.monotonic() + ttl
+        with self._lock:
+            self._entrees[cle] = (expiration, expiration + obsolescence_max, tuple(tags), versions, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def memoriser(self, cle, calcul, ttl, tags=(), obsolescence_max=0):
+        """
+        Valeur en cache pour cette clé, sinon résultat de calcul() mis en cache.
+        Une valeur dont la durée de vie est dépassée depuis moins de obsolescence_max
+        secondes est renvoyée telle quelle et recalculée en arrière-plan
+        (stale-while-revalidate) ; au-delà, l'appel attend le recalcul.
+        """
+        if not self.actif:
+            return self._vols.executer(cle, calcul)
+
+        etat, valeur = self._lire(cle)
+        with self._lock:
+            if etat is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if etat == PERIME:
+                    self.perimees += 1
+        if etat == PERIME:
+            self._rafraichir_en_fond(cle, calcul, ttl, tags, obsolescence_max)
+        if etat is not None:
+            return valeur
+        return self._vols.executer(cle, lambda: self._calculer(cle, calcul, ttl, tags, obsolescence_max))
+
+    def _calculer(self, cle, calcul, ttl, tags, obsolescence_max):
+        # Un calcul partagé a pu se terminer entre la lecture du cache et l'entrée dans executer
+        etat, valeur = self._lire(cle)
+        if etat == FRAIS:
+            return valeur
+        versions = data_versions.get_versions(tags)
+        valeur = calcul()
+        self.set(cle, valeur, ttl, tags, versions, obsolescence_max)
+        return valeur
+
+    def _rafraichir_en_fond(self, cle, calcul, ttl, tags, obsolescence_max):
+        """Recalculer une entrée périmée dans un thread (une greenlet sous gevent), une fois par clé"""
+        with self._lock:
+            if cle in self._rafraichissements:
+                return
+            self._rafraichissements.add(cle)
+
+        def rafraichir():
+            try:
+                self._vols.executer(cle, lambda: self._calculer(cle, calcul, ttl, tags, obsolescence_max))
+            except Exception as e:
+                # La valeur périmée reste servie jusqu'à son obsolescence maximale
+                print(f"Erreur lors du rafraîchissement du cache {cle}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._rafraichissements.discard(cle)
+
+        threading.Thread(target=rafraichir, name='cache-rafraichissement', daemon=True).start()
+
+    def invalider(self, *tags):
+        """Retirer les entrées qui dépendent de l'un des tags"""
+        tags = set(tags)
+        with self._lock:
+            for cle in [cle for cle, entree in self._entrees.items() if tags.intersection(entree[2])]:
+                del self._entrees[cle]
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+            self.hits = 0
+            self.misses = 0
+            self.perimees = 0
+        self._vols.partages = 0
+
+    def cache_info(self):
+        with self._lock:
+            return InfoCache(self.hits, self.misses, len(self._entrees), self.taille_max,
+                             self._vols.partages, self.perimees)
+
+def should_cache_responses():
+    """Vérifier si le cache des réponses est activé"""
+    return os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+
+cache_reponses = CacheReponses(
+    taille_max=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+    actif=should_cache_responses()
+)
+
+# Les écritures de l'API (AdminService, routes admin des salles) passent par
+# data_versions.incrementer : les entrées concernées sont évincées immédiatement
+data_versions.abonner(cache_reponses.invalider)
+metriques.enregistrer_cache('reponses', cache_reponses.cache_info)
+
+def _cle_arguments(signature, args, kwargs):
+    """Arguments normalisés (hors self) : f(10), f(limit=10) et f() partagent la même clé"""
+    try:
+        arguments = signature.bind(None, *args, **kwargs)
+    except TypeError:
+        return None
+    arguments.apply_defaults()
+    cle = tuple(arguments.arguments.items())[1:]
+    try:
+        hash(cle)
+    except TypeError:
+        return None
+    return cle
+
+def cache_service(ttl, *tags, obsolescence_max=0):
+    """
+    Décorateur de méthode de service : résultat mis en cache par arguments (hors self)
+
+    Args:
+        ttl (float): Durée de vie en secondes
+        tags (str): Tables dont dépend le résultat
+        obsolescence_max (float): Durée après ttl pendant laquelle l'ancien résultat est
+            renvoyé pendant son recalcul en arrière-plan (0 : recalcul synchrone)
+    """
+    def decorateur(methode):
+        signature = inspect.signature(methode)
+
+        @wraps(methode)
+        def wrapper(self, *args, **kwargs):
+            cle = _cle_arguments(signature, args, kwargs)
+            if cle is None:
+                return methode(self, *args, **kwargs)
+            return cache_reponses.memoriser(
+                (methode.__qualname__, cle), lambda: methode(self, *args, **kwargs),
+                ttl, tags, obsolescence_max
+            )
+        return wrapper
+    return decorateur
+
+# Calculs à mettre en cache au démarrage, par nom (voir CACHE_PREWARM)
+PRECHAUFFAGES = {}
+
+def enregistrer_prechauffage(nom, calcul):
+    """
+    Args:
+        nom (str): Nom utilisé dans CACHE_PREWARM
+        calcul (callable): Méthode décorée par cache_service, appelée sans argument
+    """
+    PRECHAUFFAGES[nom] = calcul
+
+def get_prechauffages():
+    """Noms des calculs à préchauffer (CACHE_PREWARM, séparés par des virgules)"""
+    noms = os.getenv('CACHE_PREWARM', 'conformite')
+    return [nom.strip() for nom in noms.split(',') if nom.strip()]
+
+def prechauffer(noms=None):
+    """
+    Remplir le cache avec les calculs demandés. Une erreur (base indisponible) est
+    journalisée sans empêcher le démarrage : le calcul aura lieu à la première requête.
+
+    Returns:
+        dict: Durée en millisecondes par calcul réussi
+    """
+    durees = {}
+    if not cache_reponses.actif:
+        return durees
+    for nom in get_prechauffages() if noms is None else noms:
+        calcul = PRECHAUFFAGES.get(nom)
+        if calcul is None:
+            print(f"Préchauffage inconnu: {nom} (disponibles: {', '.join(sorted(PRECHAUFFAGES))})")
+            continue
+        debut = time.perf_counter()
+        try:
+            calcul()
+            durees[nom] = round((time.perf_counter() - debut) * 1000, 1)
+        except Exception as e:
+            print(f"Erreur lors du préchauffage du cache {nom}: {str(e)}")
+    return durees
+
+def cache_route(ttl, *tags):
+    """
+    Décorateur de route GET : réponse 200 complète mise en cache par URL (chemin et paramètres).
+    La réponse est stockée avant compression, qui reste négociée à chaque requête.
+
+    Args:
+        ttl (float): Durée de vie en secondes
+        tags (str): Tables dont dépend la réponse
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def wrapper(*args, **kwargs):
+            if not cache_reponses.actif:
+                return vue(*args, **kwargs)
+
+            cle = ('route', request.endpoint, request.full_path)
+            trouve, valeur = cache_reponses.get(cle)
+            if trouve:
+                donnees, status, headers = valeur
+                return make_response(donnees, status, headers)
+
+            versions = data_versions.get_versions(tags)
+            response = make_response(vue(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache_reponses.set(
+                    cle, (response.get_data(), response.status_code, list(response.headers)),
+                    ttl, tags, versions
+                )
+            return response
+        return wrapper
+    return decorateur
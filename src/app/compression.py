@@ -0,0 +1,131 @@
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIMETYPES_COMPRESSIBLES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+}
+
+def encodages_acceptes(accept_encoding):
+    """Encodages acceptés par le client avec leur poids q (Accept-Encoding: gzip;q=0.8, br)"""
+    acceptes = {}
+    for element in accept_encoding.split(','):
+        nom, _, parametres = element.strip().partition(';')
+        q = 1.0
+        parametres = parametres.strip()
+        if parametres.startswith('q='):
+            try:
+                q = float(parametres[2:])
+            except ValueError:
+                q = 0.0
+        if nom:
+            acceptes[nom.strip().lower()] = q
+    return acceptes
+
+class Compression:
+    """
+    Compression négociée des réponses (brotli si le module est installé, sinon gzip).
+    Les réponses complètes sont compressées d'un bloc au-delà de taille_min octets ;
+    les réponses streamées (NDJSON, CSV) sont compressées morceau par morceau,
+    chaque morceau étant vidé vers le client au fur et à mesure.
+    """
+
+    def __init__(self, niveau_gzip=6, niveau_brotli=4, taille_min=1024):
+        """
+        Args:
+            niveau_gzip (int): Niveau zlib, de 1 (rapide) à 9 (compact)
+            niveau_brotli (int): Qualité brotli, de 0 (rapide) à 11 (compact)
+            taille_min (int): Taille en octets en dessous de laquelle on ne compresse pas
+        """
+        self.niveau_gzip = niveau_gzip
+        self.niveau_brotli = niveau_brotli
+        self.taille_min = taille_min
+
+    def init_app(self, app):
+        app.after_request(self.compresser_reponse)
+
+    def choisir_encodage(self, accept_encoding):
+        acceptes = encodages_acceptes(accept_encoding or '')
+        candidats = ['br', 'gzip'] if brotli is not None else ['gzip']
+        candidats = [nom for nom in candidats if acceptes.get(nom, acceptes.get('*', 0)) > 0]
+        if not candidats:
+            return None
+        return max(candidats, key=lambda nom: acceptes.get(nom, acceptes.get('*', 0)))
+
+    def _compresseur(self, encodage):
+        """Fonctions (compresser, vider, terminer) d'une compression incrémentale"""
+        if encodage == 'br':
+            compresseur = brotli.Compressor(quality=self.niveau_brotli)
+            return compresseur.process, compresseur.flush, compresseur.finish
+        compresseur = zlib.compressobj(self.niveau_gzip, zlib.DEFLATED, 31)
+        return (
+            compresseur.compress,
+            lambda: compresseur.flush(zlib.Z_SYNC_FLUSH),
+            compresseur.flush
+        )
+
+    def compresser(self, donnees, encodage):
+        compresser, _, terminer = self._compresseur(encodage)
+        return compresser(donnees) + terminer()
+
+    def compresser_flux(self, morceaux, encodage):
+        """Générateur : chaque morceau est compressé puis vidé (flush) pour être envoyé immédiatement"""
+        compresser, vider, terminer = self._compresseur(encodage)
+        try:
+            for morceau in morceaux:
+                if isinstance(morceau, str):
+                    morceau = morceau.encode('utf-8')
+                if morceau:
+                    yield compresser(morceau) + vider()
+            yield terminer()
+        finally:
+            if hasattr(morceaux, 'close'):
+                morceaux.close()
+
+    def compresser_reponse(self, response):
+        """after_request : compresser la réponse si le client l'accepte et qu'elle s'y prête"""
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in MIMETYPES_COMPRESSIBLES):
+            return response
+
+        encodage = self.choisir_encodage(request.headers.get('Accept-Encoding'))
+        response.vary.add('Accept-Encoding')
+        if encodage is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.compresser_flux(response.response, encodage)
+            response.headers.pop('Content-Length', None)
+        else:
+            donnees = response.get_data()
+            if len(donnees) < self.taille_min:
+                return response
+            response.set_data(self.compresser(donnees, encodage))
+            etag, faible = response.get_etag()
+            if etag and not faible:
+                # Un ETag fort identifie des octets précis : une variante par encodage
+                response.set_etag(f'{etag}-{encodage}')
+
+        response.headers['Content-Encoding'] = encodage
+        return response
+
+def should_compress_responses():
+    """Vérifier si la compression des réponses est activée"""
+    return os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+
+compression = Compression(
+    niveau_gzip=int(os.getenv('COMPRESSION_LEVEL', 6)),
+    niveau_brotli=int(os.getenv('BROTLI_QUALITY', 4)),
+    taille_min=int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+)
@@ -1,7 +1,10 @@
 import os
+from contextlib import contextmanager
+from flask import g, has_request_context
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from app.query_stats import query_stats, should_collect_query_stats
 import sys
 
 try:
@@ -34,30 +37,141 @@ engine = create_engine(
     connect_args=connect_args,
 )
 
+if should_collect_query_stats():
+    query_stats.installer(engine)
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 def get_session():
     return SessionLocal()
 
-def execute_query(query, params=None):
+@contextmanager
+def connexion():
+    """
+    Connexion à utiliser par les helpers SQL.
+    Pendant une requête Flask, une seule connexion est empruntée au pool, gardée sur g
+    et réutilisée par tous les appels (un seul checkout et un seul ping par requête) ;
+    elle est rendue au pool par liberer_connexion en teardown_request.
+    Hors requête (threads, scripts), une connexion dédiée est ouverte puis fermée.
+    En cas d'erreur, le travail non validé est annulé comme à la fermeture d'une connexion.
+    """
+    if not has_request_context():
+        with engine.connect() as conn:
+            yield conn
+        return
 
-    with engine.connect() as conn:
+    conn = g.get('connexion_db')
+    if conn is None:
+        conn = g.connexion_db = engine.connect()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+
+@contextmanager
+def transaction():
+    """Équivalent de engine.begin() sur la connexion de la requête : commit en sortie de bloc"""
+    with connexion() as conn:
+        yield conn
+        conn.commit()
+
+def liberer_connexion(exception=None):
+    """Rendre au pool la connexion de la requête (le travail non validé est annulé)"""
+    conn = g.pop('connexion_db', None)
+    if conn is not None:
+        conn.close()
+
+def init_app(app):
+    app.teardown_request(liberer_connexion)
+
+class Resultat:
+    """
+    Résultat tabulaire : noms de colonnes et lignes telles que renvoyées par le driver.
+    Évite de construire un dict par ligne pour les gros historiques.
+    """
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def compact(self):
+        """{"columns": [...], "rows": [[...], ...]}"""
+        return {'columns': self.columns, 'rows': [tuple(row) for row in self.rows]}
+
+    def colonnes(self):
+        """{"colonne": [valeurs...], ...}"""
+        if not self.rows:
+            return {column: [] for column in self.columns}
+        return dict(zip(self.columns, map(list, zip(*self.rows))))
+
+    def objets(self):
+        """Lignes sous forme de dicts, construits un par un à la demande"""
+        for row in self.rows:
+            yield dict(zip(self.columns, row))
+
+FORMATS_TABULAIRES = {
+    'compact': Resultat.compact,
+    'colonnes': Resultat.colonnes
+}
+
+def execute_query(query, params=None, tabulaire=False):
+
+    with connexion() as conn:
         result = conn.execute(text(query), params or {})
+        if tabulaire:
+            return Resultat(result.keys(), result.fetchall())
         return result.fetchall()
-def ping():
+
+def stream_query(query, params=None, taille_lot=1000):
+    """
+    Générateur : lignes lues par lots de taille_lot sur un curseur côté serveur
+    (stream_results, SSCursor avec PyMySQL), renvoyées sous forme de Resultat.
+    Utilise sa propre connexion : un curseur non lu en entier bloquerait celle de la requête.
+    query est une requête à paramètres nommés ou un TextClause déjà construit
+    (app.queries.preparer_requete pour une requête écrite avec des %s).
+    """
     with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=taille_lot)
+        result = conn.execute(text(query) if isinstance(query, str) else query, params or {})
+        columns = list(result.keys())
+        for lot in result.partitions(taille_lot):
+            yield Resultat(columns, lot)
+
+def ping():
+    with connexion() as conn:
         conn.execute(text("SELECT 1"))
 
 def execute_single_query(query, params=None):
-    with engine.connect() as conn:
+    with connexion() as conn:
         result = conn.execute(text(query), params or {})
         row = result.fetchone()
         return dict(row._mapping) if row else None
 
 def execute_write(query, params=None):
-    with engine.begin() as conn:
+    with transaction() as conn:
         result = conn.execute(text(query), params or {})
         try:
             return result.lastrowid
         except Exception:
             return None
+
+def execute_many(batches):
+    """
+    Exécuter plusieurs requêtes en mode executemany dans une seule transaction.
+    Avec PyMySQL, un INSERT ... VALUES exécuté ainsi est envoyé en INSERT multi-lignes.
+
+    batches: liste de (query, liste de paramètres)
+    """
+    total = 0
+    with transaction() as conn:
+        for query, params_list in batches:
+            if not params_list:
+                continue
+            result = conn.execute(text(query), params_list)
+            total += result.rowcount
+    return total
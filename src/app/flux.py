@@ -0,0 +1,183 @@
+import csv
+import io
+import itertools
+import queue
+import threading
+from flask import Response, current_app, stream_with_context
+
+def encoder_ndjson(lots):
+    """Un objet JSON par ligne, un morceau de réponse par lot"""
+    for lot in lots:
+        yield ''.join(current_app.json.dumps(ligne) + '\n' for ligne in lot.objets())
+
+def encoder_csv(lots):
+    """CSV avec une ligne d'en-tête, un morceau de réponse par lot"""
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+    en_tete = False
+    for lot in lots:
+        if not en_tete:
+            writer.writerow(lot.columns)
+            en_tete = True
+        writer.writerows(lot.rows)
+        yield tampon.getvalue()
+        tampon.seek(0)
+        tampon.truncate()
+
+FORMATS_FLUX = {
+    'ndjson': (encoder_ndjson, 'application/x-ndjson'),
+    'csv': (encoder_csv, 'text/csv')
+}
+
+def reponse_flux(format_flux, lots, nom_fichier=None):
+    """
+    Réponse HTTP streamée (chunked) à partir d'un générateur de Resultat.
+    Le premier lot est lu avant l'envoi des en-têtes : une erreur SQL donne encore
+    une réponse d'erreur normale. Le générateur est fermé à la fin de la réponse,
+    y compris si le client se déconnecte, ce qui libère la connexion.
+
+    Args:
+        format_flux (str): ndjson ou csv
+        lots (iterable): Lots de lignes, par exemple renvoyés par stream_query
+        nom_fichier (str): Nom proposé au téléchargement (Content-Disposition)
+    """
+    encoder, mimetype = FORMATS_FLUX[format_flux]
+    lots = iter(lots)
+    premier = next(lots, None)
+
+    def generer():
+        try:
+            if premier is not None:
+                yield from encoder(itertools.chain([premier], lots))
+        finally:
+            if hasattr(lots, 'close'):
+                lots.close()
+
+    response = Response(stream_with_context(generer()), mimetype=mimetype)
+    if nom_fichier:
+        response.headers['Content-Disposition'] = f'attachment; filename="{nom_fichier}.{format_flux}"'
+    return response
+
+def encoder_sse(nom, donnees, json):
+    """Un événement Server-Sent Events (event + data sur une ligne JSON)"""
+    return f'event: {nom}\ndata: {json.dumps(donnees)}\n\n'
+
+def reponse_sse(abonnement, initiaux=(), keepalive=15, retry_ms=3000):
+    """
+    Réponse text/event-stream alimentée par la file d'un abonnement (services.live_service).
+    La réponse n'utilise pas stream_with_context : le contexte de requête, et donc la
+    connexion SQL de la requête, est libéré dès la fin de la vue et non à la
+    déconnexion du client. L'abonnement est fermé quand le client se déconnecte.
+
+    Args:
+        abonnement (Abonnement): Source des événements (nom, données)
+        initiaux (iterable): Événements envoyés dès la connexion
+        keepalive (float): Délai sans événement après lequel un commentaire est envoyé,
+            pour garder la connexion ouverte à travers les proxys
+        retry_ms (int): Délai de reconnexion conseillé au navigateur
+    """
+    json = current_app.json
+
+    def generer():
+        try:
+            yield f'retry: {retry_ms}\n\n'
+            for nom, donnees in initiaux:
+                yield encoder_sse(nom, donnees, json)
+            while True:
+                try:
+                    evenement = abonnement.file.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if evenement is None:
+                    return
+                yield encoder_sse(*evenement, json)
+        finally:
+            abonnement.fermer()
+
+    response = Response(generer(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Désactiver la mise en tampon de nginx, sinon les événements arrivent par paquets
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+MAX_SALLES_PAR_WEBSOCKET = 500
+
+def traiter_commande(abonnement, message, json):
+    """
+    Commande JSON reçue d'un client WebSocket :
+      {"action": "abonner" | "desabonner", "salle_ids": [1, 2]} ou {"action": "ping"}
+
+    Returns:
+        dict: Réponse à envoyer au client (événement abonnements, pong ou erreur)
+    """
+    try:
+        commande = json.loads(message)
+        action = commande.get('action')
+    except (ValueError, AttributeError):
+        return {'event': 'erreur', 'data': {'message': 'Message JSON invalide'}}
+
+    if action == 'ping':
+        return {'event': 'pong', 'data': None}
+    if action not in ('abonner', 'desabonner'):
+        return {'event': 'erreur', 'data': {'message': "action doit valoir abonner, desabonner ou ping"}}
+
+    salle_ids = commande.get('salle_ids')
+    if not isinstance(salle_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in salle_ids):
+        return {'event': 'erreur', 'data': {'message': "salle_ids doit être une liste d'entiers"}}
+
+    if action == 'abonner':
+        if len(abonnement.salle_ids | set(salle_ids)) > MAX_SALLES_PAR_WEBSOCKET:
+            return {'event': 'erreur', 'data': {'message': f"Abonnement limité à {MAX_SALLES_PAR_WEBSOCKET} salles"}}
+        abonnement.ajouter_salles(salle_ids)
+    else:
+        abonnement.retirer_salles(salle_ids)
+    return {'event': 'abonnements', 'data': {'salle_ids': sorted(abonnement.salle_ids)}}
+
+def servir_websocket(ws, hub, json, keepalive=25):
+    """
+    Session WebSocket (flask-sock / simple-websocket) : les commandes du client modifient
+    les salles suivies, les événements du hub lui sont envoyés au fil de l'eau.
+
+    Un thread (une greenlet sous gevent) lit les commandes ; seule la boucle principale
+    écrit sur la socket, depuis la file bornée de l'abonnement. Les réponses aux
+    commandes passent par la même file, en attendant qu'elle ait de la place.
+
+    Args:
+        ws: Connexion avec receive(), send(), connected
+        hub (LiveService): Source des événements
+        json: Provider JSON de l'application (dumps, loads)
+        keepalive (float): Délai sans événement après lequel l'état de la connexion est vérifié
+    """
+    abonnement = hub.abonner(set())
+
+    def lire_commandes():
+        try:
+            while True:
+                message = ws.receive()
+                if message is not None:
+                    abonnement.file.put(traiter_commande(abonnement, message, json))
+        except Exception:
+            # Déconnexion du client (ConnectionClosed) : la boucle d'envoi s'arrête
+            pass
+        finally:
+            abonnement.reveiller()
+
+    lecteur = threading.Thread(target=lire_commandes, name='websocket-commandes', daemon=True)
+    lecteur.start()
+    try:
+        while True:
+            try:
+                evenement = abonnement.file.get(timeout=keepalive)
+            except queue.Empty:
+                if not ws.connected:
+                    return
+                continue
+            if evenement is None:
+                return
+            if isinstance(evenement, dict):
+                ws.send(json.dumps(evenement))
+            else:
+                ws.send(evenement.message(json))
+    finally:
+        abonnement.fermer()
@@ -0,0 +1,132 @@
+import atexit
+import os
+import threading
+from sqlalchemy import text
+from app.database import engine
+
+# Jobs déclarés par les services, démarrés et arrêtés ensemble (create_app, gunicorn.conf.py)
+JOBS = []
+
+class JobArrierePlan:
+    """
+    Job exécuté en boucle dans un thread d'arrière-plan, au plus un par processus.
+
+    Avec un verrou, un seul processus à la fois l'exécute : le verrou MariaDB
+    (GET_LOCK) est gardé sur une connexion dédiée tant que le job tourne, et un autre
+    worker ne prend la main (en repartant de l'état enregistré via initialiser) que
+    si ce processus s'arrête ou perd sa connexion.
+
+    Sous gunicorn avec preload_app, les jobs démarrés dans le master sont arrêtés
+    (when_ready) puis relancés dans chaque worker (post_fork) : un thread ne survit
+    pas au fork.
+    """
+
+    def __init__(self, nom, iteration, intervalle, activation, verrou=None,
+                 initialiser=None, attendre=None, reveiller=None, apres_arret=None):
+        """
+        Args:
+            nom (str): Nom du job ('rollup' : thread rollup-job)
+            iteration (callable): Une exécution du job
+            intervalle (callable): Délai entre deux exécutions, en secondes
+            activation (str): Variable d'environnement activant le job ('true')
+            verrou (str): Nom du verrou MariaDB gardé tant que le job tourne, None sans verrou
+            initialiser (callable): Appelé après l'obtention du verrou
+            attendre (callable): attendre(delai) entre deux exécutions, à la place de
+                l'attente par défaut (réveil anticipé du job)
+            reveiller (callable): Interrompre attendre lors de l'arrêt
+            apres_arret (callable): Appelé une fois le thread arrêté
+        """
+        self.nom = nom
+        self.iteration = iteration
+        self.intervalle = intervalle
+        self.activation = activation
+        self.verrou = verrou
+        self.initialiser = initialiser
+        self.attendre = attendre
+        self.reveiller = reveiller
+        self.apres_arret = apres_arret
+        self._thread = None
+        self._arret = threading.Event()
+        JOBS.append(self)
+        atexit.register(self.arreter)
+
+    def doit_tourner(self):
+        return os.getenv(self.activation, 'false').lower() == 'true'
+
+    def demarrer(self):
+        """Démarrer le job en arrière-plan (une fois par processus)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name=f'{self.nom}-job', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def arreter(self):
+        """Arrêter le job et attendre la fin de l'exécution en cours"""
+        self._arret.set()
+        if self.reveiller is not None:
+            self.reveiller()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self.apres_arret is not None:
+            self.apres_arret()
+
+    def _attendre(self, delai):
+        if self.attendre is not None:
+            self.attendre(delai)
+        else:
+            self._arret.wait(delai)
+
+    def _boucle(self):
+        if self.verrou is None:
+            while not self._arret.wait(self.intervalle()):
+                self._executer()
+            return
+
+        while not self._arret.is_set():
+            try:
+                self._boucle_verrouillee()
+            except Exception as e:
+                print(f"Erreur du job {self.nom} : {e}")
+                self._arret.wait(self.intervalle())
+
+    def _boucle_verrouillee(self):
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT GET_LOCK(:verrou, 0)"), {'verrou': self.verrou}).scalar():
+                conn.rollback()
+                self._arret.wait(self.intervalle() * 10)
+                return
+
+            try:
+                if self.initialiser is not None:
+                    self.initialiser()
+                while not self._arret.is_set():
+                    # Vérifier que le verrou est toujours détenu (connexion coupée par le serveur)
+                    if not conn.execute(text("SELECT IS_USED_LOCK(:verrou) = CONNECTION_ID()"),
+                                        {'verrou': self.verrou}).scalar():
+                        return
+                    conn.rollback()
+                    self._executer()
+                    self._attendre(self.intervalle())
+            finally:
+                conn.execute(text("SELECT RELEASE_LOCK(:verrou)"), {'verrou': self.verrou})
+                conn.commit()
+
+    def _executer(self):
+        try:
+            self.iteration()
+        except Exception as e:
+            print(f"Erreur du job {self.nom} : {e}")
+
+def demarrer_jobs():
+    """Démarrer les jobs activés par leur variable d'environnement"""
+    for job in JOBS:
+        if job.doit_tourner():
+            job.demarrer()
+
+def arreter_jobs():
+    for job in JOBS:
+        job.arreter()
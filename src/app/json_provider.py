@@ -0,0 +1,55 @@
+from decimal import Decimal
+import orjson
+from flask.json.provider import JSONProvider
+from app.database import Resultat
+
+def _default(o):
+    """Types non gérés nativement par orjson"""
+    if isinstance(o, Resultat):
+        return o.compact()
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Objet de type {type(o).__name__} non sérialisable en JSON")
+
+class ClimHeticJSONProvider(JSONProvider):
+    """
+    Provider JSON de l'API, basé sur orjson (sérialisation en C, sortie en bytes UTF-8).
+    - datetime et date sont encodés nativement en ISO 8601 (2025-01-15T10:30:00) ;
+    - Decimal (valeurs des mesures renvoyées par MariaDB) est encodé en nombre ;
+    - les Resultat tabulaires sont sérialisés au format compact.
+    Sortie compacte par défaut, indentée en mode debug ou si compact vaut False.
+    """
+
+    default = staticmethod(_default)
+    sort_keys = False
+    compact = None
+    mimetype = 'application/json'
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        """Sérialiser en bytes UTF-8, sans passer par str"""
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype
+        )
@@ -0,0 +1,258 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from flask import g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bornes de l'histogramme de durée des requêtes HTTP, en secondes
+BUCKETS_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+DESCRIPTIONS = {
+    'climhetic_http_requests_total': ('counter', 'Requêtes HTTP traitées'),
+    'climhetic_http_request_duration_seconds': ('histogram', 'Durée de traitement des requêtes HTTP'),
+    'climhetic_db_pool_size': ('gauge', 'Taille du pool de connexions SQLAlchemy'),
+    'climhetic_db_pool_checked_out': ('gauge', 'Connexions empruntées au pool'),
+    'climhetic_db_pool_overflow': ('gauge', 'Connexions ouvertes au-delà de la taille du pool'),
+    'climhetic_ssh_tunnel_enabled': ('gauge', 'Tunnel SSH activé (USE_SSH_TUNNEL)'),
+    'climhetic_ssh_tunnel_active': ('gauge', 'Tunnel SSH actif'),
+    'climhetic_cache_hits_total': ('counter', 'Accès aux caches servis depuis le cache'),
+    'climhetic_cache_misses_total': ('counter', 'Accès aux caches non servis depuis le cache'),
+    'climhetic_cache_hit_ratio': ('gauge', 'Part des accès servis depuis le cache'),
+}
+
+def _cle(labels):
+    return tuple(sorted(labels.items()))
+
+def _statut_tunnel():
+    # Import à la demande : le tunnel n'est utilisé que si USE_SSH_TUNNEL=true
+    from services.ssh_service import get_tunnel_status
+    return get_tunnel_status()
+
+class Metriques:
+    """
+    Métriques du processus au format d'exposition Prometheus.
+    Compteurs et histogrammes sont alimentés par les hooks Flask ; les jauges
+    (pool, tunnel, caches) sont relevées au moment de la collecte.
+
+    Avec plusieurs workers gunicorn, METRICS_MULTIPROC_DIR désigne un répertoire
+    partagé : chaque worker y écrit régulièrement un instantané de ses métriques et
+    /metrics renvoie la somme de tous les instantanés. Les compteurs des workers
+    arrêtés restent comptés ; les jauges ne sont prises que des workers vivants.
+    """
+
+    def __init__(self, repertoire=None, intervalle_ecriture=2):
+        """
+        Args:
+            repertoire (str): Répertoire partagé entre workers, None pour un seul processus
+            intervalle_ecriture (float): Délai minimal entre deux écritures d'instantané, en secondes
+        """
+        self.repertoire = repertoire
+        self.intervalle_ecriture = intervalle_ecriture
+        self.engine = None
+        self._lock = threading.Lock()
+        self._compteurs = {}
+        self._histogrammes = {}
+        self._caches = {}
+        self._derniere_ecriture = 0
+
+    def init_app(self, app, engine=None):
+        """Mesurer chaque requête de l'application et relever les jauges du pool de l'engine"""
+        self.engine = engine
+        app.before_request(self._debut_requete)
+        app.after_request(self._fin_requete)
+
+    def enregistrer_cache(self, nom, statistiques):
+        """
+        Exposer le taux de succès d'un cache
+
+        Args:
+            nom (str): Nom du cache (label cache)
+            statistiques (callable): Renvoie un objet avec hits et misses (comme lru_cache.cache_info)
+        """
+        self._caches[nom] = statistiques
+
+    def incrementer(self, nom, labels, valeur=1):
+        cle = (nom, _cle(labels))
+        with self._lock:
+            self._compteurs[cle] = self._compteurs.get(cle, 0) + valeur
+
+    def observer(self, nom, labels, valeur):
+        cle = (nom, _cle(labels))
+        with self._lock:
+            histogramme = self._histogrammes.get(cle)
+            if histogramme is None:
+                histogramme = self._histogrammes[cle] = [0] * (len(BUCKETS_SECONDES) + 2)
+            for i, borne in enumerate(BUCKETS_SECONDES):
+                if valeur <= borne:
+                    histogramme[i] += 1
+                    break
+            histogramme[-2] += valeur
+            histogramme[-1] += 1
+
+    def _debut_requete(self):
+        g.debut_requete_metriques = time.perf_counter()
+
+    def _fin_requete(self, response):
+        debut = g.pop('debut_requete_metriques', None)
+        if debut is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule is not None else 'inconnue'
+        labels = {'blueprint': request.blueprint or 'app', 'route': route, 'method': request.method}
+        self.observer('climhetic_http_request_duration_seconds', labels, time.perf_counter() - debut)
+        self.incrementer('climhetic_http_requests_total', dict(labels, status=str(response.status_code)))
+
+        if self.repertoire and time.monotonic() - self._derniere_ecriture >= self.intervalle_ecriture:
+            self.ecrire_instantane()
+        return response
+
+    def _jauges(self):
+        jauges = {}
+        pool = getattr(self.engine, 'pool', None)
+        if pool is not None and hasattr(pool, 'checkedout'):
+            jauges[('climhetic_db_pool_size', ())] = pool.size()
+            jauges[('climhetic_db_pool_checked_out', ())] = pool.checkedout()
+            jauges[('climhetic_db_pool_overflow', ())] = max(pool.overflow(), 0)
+        return jauges
+
+    def _compteurs_caches(self):
+        compteurs = {}
+        for nom, statistiques in self._caches.items():
+            info = statistiques()
+            compteurs[('climhetic_cache_hits_total', (('cache', nom),))] = info.hits
+            compteurs[('climhetic_cache_misses_total', (('cache', nom),))] = info.misses
+        return compteurs
+
+    def instantane(self):
+        """Métriques du processus sous une forme sérialisable en JSON"""
+        with self._lock:
+            compteurs = dict(self._compteurs)
+            histogrammes = {cle: list(valeurs) for cle, valeurs in self._histogrammes.items()}
+        compteurs.update(self._compteurs_caches())
+        return {
+            'pid': os.getpid(),
+            'compteurs': [[nom, labels, valeur] for (nom, labels), valeur in compteurs.items()],
+            'histogrammes': [[nom, labels, valeurs] for (nom, labels), valeurs in histogrammes.items()],
+            'jauges': [[nom, labels, valeur] for (nom, labels), valeur in self._jauges().items()]
+        }
+
+    def ecrire_instantane(self):
+        """Écrire l'instantané du worker dans le répertoire partagé (remplacement atomique)"""
+        if not self.repertoire:
+            return
+        self._derniere_ecriture = time.monotonic()
+        chemin = os.path.join(self.repertoire, f'worker_{os.getpid()}.json')
+        temporaire = f'{chemin}.{threading.get_ident()}.tmp'
+        try:
+            with open(temporaire, 'w') as fichier:
+                json.dump(self.instantane(), fichier)
+            os.replace(temporaire, chemin)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture des métriques dans {self.repertoire}: {e}")
+
+    def _instantanes(self):
+        if not self.repertoire:
+            return [self.instantane()]
+
+        self.ecrire_instantane()
+        instantanes = []
+        for chemin in glob.glob(os.path.join(self.repertoire, 'worker_*.json')):
+            try:
+                with open(chemin) as fichier:
+                    instantanes.append(json.load(fichier))
+            except (OSError, ValueError):
+                continue
+        return instantanes
+
+    def collecter(self):
+        """Agréger les instantanés : (compteurs, histogrammes, jauges) indexés par (nom, labels)"""
+        compteurs, histogrammes, jauges = {}, {}, {}
+        for instantane in self._instantanes():
+            for nom, labels, valeur in instantane['compteurs']:
+                cle = (nom, tuple(map(tuple, labels)))
+                compteurs[cle] = compteurs.get(cle, 0) + valeur
+            for nom, labels, valeurs in instantane['histogrammes']:
+                cle = (nom, tuple(map(tuple, labels)))
+                cumul = histogrammes.setdefault(cle, [0] * len(valeurs))
+                histogrammes[cle] = [a + b for a, b in zip(cumul, valeurs)]
+            if _processus_vivant(instantane['pid']):
+                for nom, labels, valeur in instantane['jauges']:
+                    cle = (nom, tuple(map(tuple, labels)))
+                    jauges[cle] = jauges.get(cle, 0) + valeur
+
+        for (nom, labels), hits in list(compteurs.items()):
+            if nom == 'climhetic_cache_hits_total':
+                total = hits + compteurs.get(('climhetic_cache_misses_total', labels), 0)
+                jauges[('climhetic_cache_hit_ratio', labels)] = hits / total if total else 0
+
+        try:
+            tunnel = _statut_tunnel()
+            jauges[('climhetic_ssh_tunnel_enabled', ())] = int(bool(tunnel.get('enabled')))
+            jauges[('climhetic_ssh_tunnel_active', ())] = int(bool(tunnel.get('active')))
+        except Exception as e:
+            print(f"Statut du tunnel SSH indisponible pour /metrics: {e}")
+
+        return compteurs, histogrammes, jauges
+
+    def exposer(self):
+        """Texte au format d'exposition Prometheus 0.0.4"""
+        compteurs, histogrammes, jauges = self.collecter()
+        series = {}
+        for cle, valeur in list(compteurs.items()) + list(jauges.items()):
+            series.setdefault(cle[0], []).append((cle[1], valeur))
+        for (nom, labels), valeurs in histogrammes.items():
+            series.setdefault(nom, []).append((labels, valeurs))
+
+        lignes = []
+        for nom in sorted(series):
+            type_metrique, description = DESCRIPTIONS.get(nom, ('untyped', nom))
+            lignes.append(f'# HELP {nom} {description}')
+            lignes.append(f'# TYPE {nom} {type_metrique}')
+            for labels, valeur in sorted(series[nom]):
+                if type_metrique == 'histogram':
+                    lignes.extend(_lignes_histogramme(nom, labels, valeur))
+                else:
+                    lignes.append(f'{nom}{_labels(labels)} {_nombre(valeur)}')
+        return '\n'.join(lignes) + '\n'
+
+def _lignes_histogramme(nom, labels, valeurs):
+    lignes = []
+    cumul = 0
+    for borne, nb in zip(BUCKETS_SECONDES, valeurs):
+        cumul += nb
+        lignes.append(f'{nom}_bucket{_labels(labels + (("le", _nombre(borne)),))} {cumul}')
+    lignes.append(f'{nom}_bucket{_labels(labels + (("le", "+Inf"),))} {valeurs[-1]}')
+    lignes.append(f'{nom}_sum{_labels(labels)} {_nombre(valeurs[-2])}')
+    lignes.append(f'{nom}_count{_labels(labels)} {valeurs[-1]}')
+    return lignes
+
+def _labels(labels):
+    if not labels:
+        return ''
+    echapper = lambda valeur: str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nom}="{echapper(valeur)}"' for nom, valeur in labels) + '}'
+
+def _nombre(valeur):
+    return repr(valeur) if isinstance(valeur, float) else str(valeur)
+
+def _processus_vivant(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+
+metriques = Metriques(
+    repertoire=os.getenv('METRICS_MULTIPROC_DIR') or None,
+    intervalle_ecriture=float(os.getenv('METRICS_WRITE_INTERVAL', 2))
+)
+
+atexit.register(metriques.ecrire_instantane)
@@ -1,29 +1,55 @@
-from app.database import engine
+from functools import lru_cache
+from app.database import connexion, Resultat, stream_query
+from app.metrics import metriques
 from sqlalchemy import text
 
-def execute_query(query, params=None):
-    try:
-        with engine.connect() as conn:
-            if params is not None:
-                if not isinstance(params, (tuple, list)):
-                    params = (params,)
-                else:
-                    params = tuple(params) if not isinstance(params, tuple) else params
-
-            if params:
-                if isinstance(params, (tuple, list)):
-                    param_dict = {f'param_{i}': param for i, param in enumerate(params)}
-                    query_with_params = query
-                    for i in range(len(params)):
-                        query_with_params = query_with_params.replace('%s', f':param_{i}', 1)
-                    result = conn.execute(text(query_with_params), param_dict)
-                else:
-                    result = conn.execute(text(query), params)
-            else:
-                result = conn.execute(text(query))
+@lru_cache(maxsize=512)
+def compiler_requete(query, nb_params):
+    """
+    Réécrire les %s d'une requête en :param_i et construire son TextClause.
+    Le résultat est mis en cache (LRU borné) : les requêtes des services sont
+    des constantes, les appels suivants n'ont plus qu'à lier les valeurs.
+    """
+    noms = tuple(f'param_{i}' for i in range(nb_params))
+    query_with_params = query
+    for nom in noms:
+        query_with_params = query_with_params.replace('%s', f':{nom}', 1)
+    return text(query_with_params), noms
+
+metriques.enregistrer_cache('requetes_compilees', compiler_requete.cache_info)
+
+def preparer_requete(query, params):
+    """
+    TextClause et paramètres nommés d'une requête écrite avec des %s
+
+    Returns:
+        tuple: (statement, dict des paramètres ou None)
+    """
+    if params is not None:
+        if not isinstance(params, (tuple, list)):
+            params = (params,)
+        else:
+            params = tuple(params) if not isinstance(params, tuple) else params
 
+    if params:
+        statement, noms = compiler_requete(query, len(params))
+        return statement, dict(zip(noms, params))
+    return compiler_requete(query, 0)[0], None
+
+def _executer(conn, query, params):
+    statement, params = preparer_requete(query, params)
+    if params:
+        return conn.execute(statement, params)
+    return conn.execute(statement)
+
+def execute_query(query, params=None, tabulaire=False):
+    try:
+        with connexion() as conn:
+            result = _executer(conn, query, params)
             columns = result.keys()
             rows = result.fetchall()
+            if tabulaire:
+                return Resultat(columns, rows)
             return [dict(zip(columns, row)) for row in rows]
     except Exception as e:
         print(f"Erreur SQL: {query}")
@@ -32,25 +58,8 @@ def execute_query(query, params=None):
 
 def execute_single_query(query, params=None):
     try:
-        with engine.connect() as conn:
-            if params is not None:
-                if not isinstance(params, (tuple, list)):
-                    params = (params,)
-                else:
-                    params = tuple(params) if not isinstance(params, tuple) else params
-
-            if params:
-                if isinstance(params, (tuple, list)):
-                    param_dict = {f'param_{i}': param for i, param in enumerate(params)}
-                    query_with_params = query
-                    for i in range(len(params)):
-                        query_with_params = query_with_params.replace('%s', f':param_{i}', 1)
-                    result = conn.execute(text(query_with_params), param_dict)
-                else:
-                    result = conn.execute(text(query), params)
-            else:
-                result = conn.execute(text(query))
-
+        with connexion() as conn:
+            result = _executer(conn, query, params)
             row = result.fetchone()
             if row:
                 columns = result.keys()
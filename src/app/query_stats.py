@@ -0,0 +1,235 @@
+import os
+import re
+import sys
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import event
+
+# Bornes supérieures des classes de l'histogramme de latence, en millisecondes
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOSSIERS_APPELANTS = (os.path.join(SRC, 'services') + os.sep, os.path.join(SRC, 'routes') + os.sep)
+
+_ESPACES = re.compile(r'\s+')
+_CHAINES = re.compile(r"'(?:[^'\\]|\\.)*'")
+_PARAMETRES = re.compile(r'%\(\w+\)s|%s|:\w+|\?|\b\d+(?:\.\d+)?\b')
+_LISTES = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+@lru_cache(maxsize=1024)
+def normaliser_requete(statement):
+    """
+    Forme normalisée d'une requête : espaces réduits, valeurs et paramètres remplacés
+    par ?, listes IN (?, ?, ...) ramenées à (?). Deux appels d'une même requête avec
+    des valeurs différentes partagent ainsi les mêmes statistiques.
+    """
+    requete = _CHAINES.sub('?', statement)
+    requete = _PARAMETRES.sub('?', requete)
+    requete = _LISTES.sub('(?)', requete)
+    return _ESPACES.sub(' ', requete).strip()
+
+def trouver_appelant():
+    """Méthode de service (ou route) à l'origine de la requête : Classe.methode ou module.fonction"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(DOSSIERS_APPELANTS):
+            instance = frame.f_locals.get('self')
+            if instance is not None:
+                return f"{type(instance).__name__}.{code.co_name}"
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            return f"{module}.{code.co_name}"
+        frame = frame.f_back
+    return 'inconnu'
+
+def _percentile(histogramme, total, duree_max, q):
+    """Estimation d'un percentile : borne supérieure de la classe qui l'atteint"""
+    seuil = q * total
+    cumul = 0
+    for borne, nb in zip(BUCKETS_MS, histogramme):
+        cumul += nb
+        if cumul >= seuil:
+            return min(borne, duree_max)
+    return duree_max
+
+class StatRequete:
+    """Statistiques cumulées d'une requête normalisée"""
+    __slots__ = ('appels', 'temps_total', 'temps_max', 'lignes', 'histogramme', 'appelants')
+
+    def __init__(self):
+        self.appels = 0
+        self.temps_total = 0.0
+        self.temps_max = 0.0
+        self.lignes = 0
+        self.histogramme = [0] * (len(BUCKETS_MS) + 1)
+        self.appelants = {}
+
+    def ajouter(self, duree_ms, lignes, appelant):
+        self.appels += 1
+        self.temps_total += duree_ms
+        self.temps_max = max(self.temps_max, duree_ms)
+        self.lignes += lignes
+        self.histogramme[self._classe(duree_ms)] += 1
+        if appelant is None:
+            return
+        cumul = self.appelants.get(appelant)
+        if cumul is None:
+            cumul = self.appelants[appelant] = [0, 0.0]
+        cumul[0] += 1
+        cumul[1] += duree_ms
+
+    @staticmethod
+    def _classe(duree_ms):
+        for i, borne in enumerate(BUCKETS_MS):
+            if duree_ms <= borne:
+                return i
+        return len(BUCKETS_MS)
+
+    def to_dict(self, requete):
+        return {
+            'requete': requete,
+            'appels': self.appels,
+            'temps_total_ms': round(self.temps_total, 3),
+            'temps_moyen_ms': round(self.temps_total / self.appels, 3),
+            'temps_max_ms': round(self.temps_max, 3),
+            'p50_ms': _percentile(self.histogramme, self.appels, round(self.temps_max, 3), 0.5),
+            'p95_ms': _percentile(self.histogramme, self.appels, round(self.temps_max, 3), 0.95),
+            'p99_ms': _percentile(self.histogramme, self.appels, round(self.temps_max, 3), 0.99),
+            'lignes_total': self.lignes,
+            'lignes_moyennes': round(self.lignes / self.appels, 1),
+            'histogramme': dict(zip([f'le_{borne}' for borne in BUCKETS_MS] + ['le_inf'], self.histogramme)),
+            'appelants': {
+                appelant: appels
+                for appelant, (appels, _) in sorted(self.appelants.items(), key=lambda item: -item[1][1])
+            }
+        }
+
+class QueryStats:
+    """
+    Statistiques des requêtes SQL du processus, alimentées par les événements
+    before_cursor_execute / after_cursor_execute de l'engine.
+    Chaque worker gunicorn a ses propres statistiques.
+
+    La méthode appelante (remontée de la pile) n'est cherchée que pour les requêtes
+    lentes et une exécution sur periode_appelants : la répartition par appelant est
+    un échantillon. Les paramètres des requêtes ne sont jamais conservés.
+    """
+
+    TRIS = ('temps_total_ms', 'temps_moyen_ms', 'temps_max_ms', 'appels', 'lignes_total')
+
+    def __init__(self, seuil_lent_ms=500, taille_journal=100, periode_appelants=10):
+        """
+        Args:
+            seuil_lent_ms (float): Durée au-delà de laquelle une requête est journalisée comme lente
+            taille_journal (int): Nombre de requêtes lentes conservées
+            periode_appelants (int): Une exécution sur periode_appelants est attribuée à son appelant
+        """
+        self.seuil_lent_ms = seuil_lent_ms
+        self.periode_appelants = periode_appelants
+        self._executions = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._lentes = deque(maxlen=taille_journal)
+        self._depuis = datetime.now()
+
+    def installer(self, engine):
+        """Brancher les événements de mesure sur l'engine"""
+        event.listen(engine, 'before_cursor_execute', self._avant_execution)
+        event.listen(engine, 'after_cursor_execute', self._apres_execution)
+
+    def _avant_execution(self, conn, cursor, statement, parameters, context, executemany):
+        # Début porté par le contexte d'exécution : rien ne reste sur la connexion si la requête échoue
+        if context is not None:
+            context._debut_requete = time.perf_counter()
+
+    def _apres_execution(self, conn, cursor, statement, parameters, context, executemany):
+        debut = getattr(context, '_debut_requete', None)
+        if debut is None:
+            return
+        duree_ms = (time.perf_counter() - debut) * 1000
+        lignes = cursor.rowcount if 0 <= cursor.rowcount < 2 ** 63 else 0
+        echantillon = duree_ms >= self.seuil_lent_ms or next(self._executions) % self.periode_appelants == 0
+        self.enregistrer(statement, duree_ms, lignes, trouver_appelant() if echantillon else None)
+
+    def enregistrer(self, statement, duree_ms, lignes, appelant):
+        """
+        Ajouter une exécution aux statistiques
+
+        Args:
+            statement (str): Requête telle qu'envoyée au driver
+            duree_ms (float): Durée d'exécution
+            lignes (int): Lignes renvoyées ou modifiées
+            appelant (str): Méthode à l'origine de la requête (None hors échantillon)
+        """
+        requete = normaliser_requete(statement)
+        with self._lock:
+            stat = self._stats.get(requete)
+            if stat is None:
+                stat = self._stats[requete] = StatRequete()
+            stat.ajouter(duree_ms, lignes, appelant)
+
+            if duree_ms >= self.seuil_lent_ms:
+                self._lentes.append({
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'duree_ms': round(duree_ms, 3),
+                    'lignes': lignes,
+                    'appelant': appelant,
+                    'requete': requete
+                })
+
+    def get_stats(self, tri='temps_total_ms', limite=50):
+        """
+        Statistiques par requête normalisée et par appelant
+
+        Args:
+            tri (str): Critère de tri décroissant, parmi QueryStats.TRIS
+            limite (int): Nombre maximal de requêtes renvoyées
+        """
+        if tri not in self.TRIS:
+            raise ValueError(f"tri doit valoir {', '.join(self.TRIS)}")
+
+        par_appelant = {}
+        with self._lock:
+            requetes = [stat.to_dict(requete) for requete, stat in self._stats.items()]
+            lentes = list(self._lentes)
+            temps_total = sum(stat.temps_total for stat in self._stats.values())
+            temps_echantillon = 0.0
+            for stat in self._stats.values():
+                for appelant, (appels, temps) in stat.appelants.items():
+                    cumul = par_appelant.setdefault(appelant, {'appelant': appelant, 'appels': 0, 'temps_total_ms': 0.0})
+                    cumul['appels'] += appels
+                    cumul['temps_total_ms'] += temps
+                    temps_echantillon += temps
+
+        for cumul in par_appelant.values():
+            cumul['temps_total_ms'] = round(cumul['temps_total_ms'], 3)
+            cumul['part'] = round(cumul['temps_total_ms'] / temps_echantillon, 4) if temps_echantillon else 0
+
+        requetes.sort(key=lambda requete: requete[tri], reverse=True)
+        return {
+            'depuis': self._depuis.isoformat(timespec='seconds'),
+            'seuil_lent_ms': self.seuil_lent_ms,
+            'temps_total_ms': round(temps_total, 3),
+            'par_appelant': sorted(par_appelant.values(), key=lambda cumul: -cumul['temps_total_ms']),
+            'requetes': requetes[:limite],
+            'requetes_lentes': lentes[::-1]
+        }
+
+    def reinitialiser(self):
+        with self._lock:
+            self._stats = {}
+            self._lentes.clear()
+            self._depuis = datetime.now()
+
+def should_collect_query_stats():
+    """Vérifier si la mesure des requêtes SQL est activée"""
+    return os.getenv('QUERY_STATS_ENABLED', 'true').lower() == 'true'
+
+query_stats = QueryStats(
+    seuil_lent_ms=float(os.getenv('SLOW_QUERY_MS', 500)),
+    periode_appelants=int(os.getenv('QUERY_STATS_CALLER_EVERY', 10))
+)
@@ -0,0 +1,70 @@
+import threading
+
+class _Vol:
+    """Exécution en cours pour une clé, attendue par les appels identiques"""
+
+    __slots__ = ('termine', 'resultat', 'erreur')
+
+    def __init__(self):
+        self.termine = threading.Event()
+        self.resultat = None
+        self.erreur = None
+
+class SingleFlight:
+    """
+    Regroupement des appels concurrents identiques : le premier appel pour une clé
+    exécute le calcul, les appels arrivés pendant son exécution l'attendent et
+    reçoivent le même résultat (ou la même exception).
+
+    Repose sur threading.Lock et threading.Event, que gevent.monkey.patch_all rend
+    coopératifs : l'attente suspend le thread ou seulement la greenlet, selon le worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vols = {}
+        self.executions = 0
+        self.partages = 0
+
+    def executer(self, cle, calcul):
+        """
+        Args:
+            cle: Clé hashable identifiant le calcul (fonction et arguments)
+            calcul (callable): Calcul sans argument
+
+        Returns:
+            Résultat du calcul, exécuté une seule fois pour les appels simultanés
+        """
+        with self._lock:
+            vol = self._vols.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = self._vols[cle] = _Vol()
+                self.executions += 1
+            else:
+                self.partages += 1
+
+        if not meneur:
+            vol.termine.wait()
+            if vol.erreur is not None:
+                raise vol.erreur
+            return vol.resultat
+
+        try:
+            vol.resultat = calcul()
+            return vol.resultat
+        except Exception as e:
+            vol.erreur = e
+            raise
+        except BaseException:
+            # Greenlet tuée ou interruption : les appels en attente ne doivent pas recevoir None
+            vol.erreur = Exception("Calcul partagé interrompu")
+            raise
+        finally:
+            with self._lock:
+                del self._vols[cle]
+            vol.termine.set()
+
+    def en_cours(self):
+        with self._lock:
+            return len(self._vols)
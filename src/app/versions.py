@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from functools import wraps
+from flask import make_response, request
+
+# Variantes d'un même ETag ajoutées par la compression (app.compression)
+SUFFIXES_ENCODAGE = ('', '-gzip', '-br')
+
+class DataVersions:
+    """
+    Versions des tables rarement modifiées (salle, capteur), partagées entre workers.
+    Chaque table a un fichier dans un répertoire commun contenant un jeton unique,
+    remplacé atomiquement à chaque écriture : lire une version ne coûte qu'une
+    lecture de fichier local, sans requête SQL.
+    """
+
+    def __init__(self, repertoire):
+        """
+        Args:
+            repertoire (str): Répertoire partagé par tous les workers de la machine
+        """
+        self.repertoire = repertoire
+        self._abonnes = []
+
+    def abonner(self, callback):
+        """Appeler callback(*tables) après chaque incrementer (invalidation des caches du processus)"""
+        self._abonnes.append(callback)
+
+    def _chemin(self, table):
+        return os.path.join(self.repertoire, f'{table}.version')
+
+    def incrementer(self, *tables):
+        """Marquer des tables comme modifiées : leurs ETags changent"""
+        os.makedirs(self.repertoire, exist_ok=True)
+        for table in tables:
+            chemin = self._chemin(table)
+            temporaire = f'{chemin}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+            with open(temporaire, 'w') as fichier:
+                fichier.write(uuid.uuid4().hex)
+            os.replace(temporaire, chemin)
+        for callback in self._abonnes:
+            callback(*tables)
+
+    def get_version(self, table):
+        """Jeton de version d'une table (créé au premier accès)"""
+        try:
+            with open(self._chemin(table)) as fichier:
+                version = fichier.read()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        self.incrementer(table)
+        return self.get_version(table)
+
+    def get_versions(self, tables):
+        return tuple(self.get_version(table) for table in tables)
+
+data_versions = DataVersions(
+    os.getenv('DATA_VERSIONS_DIR') or os.path.join(tempfile.gettempdir(), 'climhetic_versions')
+)
+
+def calculer_etag(tables, fenetre=None):
+    """
+    ETag fort de la requête courante : URL complète (chemin et paramètres) et versions des tables.
+
+    Args:
+        tables (tuple): Tables dont dépend la réponse
+        fenetre (int): Durée en secondes après laquelle l'ETag change même sans écriture,
+            pour les colonnes alimentées hors de l'API (dernière mesure d'un capteur)
+    """
+    elements = [request.full_path, *data_versions.get_versions(tables)]
+    if fenetre:
+        elements.append(str(int(time.time() // fenetre)))
+    return hashlib.sha1('|'.join(elements).encode()).hexdigest()[:32]
+
+def etag_versions(*tables, fenetre=None):
+    """
+    Décorateur de route GET : ETag calculé à partir des versions des tables.
+    Un If-None-Match correspondant reçoit un 304 avant toute exécution de la vue,
+    donc sans requête SQL.
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def wrapper(*args, **kwargs):
+            etag = calculer_etag(tables, fenetre)
+
+            for suffixe in SUFFIXES_ENCODAGE:
+                if request.if_none_match.contains(etag + suffixe):
+                    response = make_response('', 304)
+                    response.set_etag(etag + suffixe)
+                    response.vary.add('Accept-Encoding')
+                    return response
+
+            response = make_response(vue(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorateur
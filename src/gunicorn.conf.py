@@ -0,0 +1,81 @@
+"""
+Configuration gunicorn de l'API ClimHetic.
+
+Usage (depuis la racine du projet) :
+    gunicorn --config src/gunicorn.conf.py wsgi:app
+
+Toutes les valeurs sont surchargeables par variables d'environnement GUNICORN_*.
+"""
+import multiprocessing
+import os
+import shutil
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    # Le patch doit précéder tout import de socket/threading, donc celui de l'application
+    # (préchargée dans le master) : PyMySQL étant en pur Python, ses lectures réseau
+    # deviennent alors coopératives et une requête SQL bloque seulement sa greenlet.
+    from gevent import monkey
+    monkey.patch_all()
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+# Avec gevent, un worker par cœur suffit : la concurrence vient des greenlets.
+# En sync/gthread, la formule classique 2 x cœurs + 1.
+_cpu = multiprocessing.cpu_count()
+workers = int(os.getenv('GUNICORN_WORKERS', _cpu if worker_class == 'gevent' else _cpu * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+# Greenlets par worker : au-delà de pool_size + max_overflow (15), les requêtes attendent une
+# connexion du pool ; on borne donc la concurrence pour ne pas accumuler d'attentes.
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recyclage des workers pour contenir une éventuelle fuite mémoire ; la gigue évite
+# que tous les workers redémarrent en même temps
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+def on_starting(server):
+    """Vider le répertoire partagé des métriques laissé par une exécution précédente"""
+    repertoire = os.getenv('METRICS_MULTIPROC_DIR')
+    if repertoire:
+        shutil.rmtree(repertoire, ignore_errors=True)
+        os.makedirs(repertoire, exist_ok=True)
+
+def when_ready(server):
+    """Le master ne fait que superviser : les jobs d'agrégation, d'alertes et de notifications tournent dans les workers"""
+    from app.jobs import arreter_jobs
+    arreter_jobs()
+
+def post_fork(server, worker):
+    """
+    Connexions du pool ouvertes par le master non partagées avec le worker, threads relancés.
+    Le cache de chaque worker est préchauffé ici plutôt qu'à la construction de l'application,
+    qui a aussi lieu dans le master, les tests et le serveur de développement.
+    """
+    from app.cache import prechauffer
+    from app.database import engine
+    from app.jobs import demarrer_jobs
+
+    engine.dispose(close=False)
+    demarrer_jobs()
+    prechauffer()
+
+def worker_exit(server, worker):
+    """Dernier instantané des métriques et écriture des mesures en attente"""
+    from app.metrics import metriques
+    from services.mesure_service import ingestion_buffer
+
+    ingestion_buffer.arreter()
+    metriques.ecrire_instantane()
@@ -1,15 +1,27 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
+from app import database
+from app.compression import compression, should_compress_responses
+from app.jobs import demarrer_jobs
+from app.json_provider import ClimHeticJSONProvider
+from app.metrics import metriques, CONTENT_TYPE as CONTENT_TYPE_METRIQUES
 from routes.admin import admin_bp
 from routes.capteurs import capteurs_bp
 from routes.search import search_bp
 from routes.filters import filters_bp
 from routes.admin_salle import admin_salle_bp
+from routes.alertes import alertes_bp
+from routes.websocket import sock
 
 import os
 
 def create_app():
     app = Flask(__name__)
+    app.json = ClimHeticJSONProvider(app)
+    database.init_app(app)
+    metriques.init_app(app, database.engine)
+    if should_compress_responses():
+        compression.init_app(app)
     
     CORS(app, origins=[
         "http://localhost:5173", 
@@ -17,14 +29,15 @@ def create_app():
         "http://09.hetic.arcplex.dev"  # Frontend en production
     ])
     
-    app.config['JSON_SORT_KEYS'] = False
-    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-    
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(capteurs_bp, url_prefix='/api/capteurs')
     app.register_blueprint(search_bp),
     app.register_blueprint(filters_bp),
     app.register_blueprint(admin_salle_bp)
+    app.register_blueprint(alertes_bp)
+    sock.init_app(app)
+    
+    demarrer_jobs()
     
     @app.route('/api/health')
     def health_check():
@@ -34,14 +47,20 @@ def create_app():
             'version': '1.0.0'
         })
     
+    @app.route('/metrics')
+    def metrics():
+        return Response(metriques.exposer(), mimetype=CONTENT_TYPE_METRIQUES)
+    
     @app.route('/')
     def index():
         return jsonify({
             'message': 'Bienvenue sur ClimHetic API',
             'endpoints': {
                 'health': '/api/health',
+                'metrics': '/metrics',
                 'admin': '/api/admin/*',
-                'capteurs': '/api/capteurs/*'
+                'capteurs': '/api/capteurs/*',
+                'alertes': '/api/alertes'
             }
         })
     
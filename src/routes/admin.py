@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from services.admin_service import AdminService
+from app.query_stats import query_stats
+from app.versions import etag_versions
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -22,6 +24,7 @@ def handle_exception(e, default_message="Erreur interne du serveur"):
     )
 
 @admin_bp.route('/capteurs', methods=['GET'])
+@etag_versions('capteur', 'salle', fenetre=60)
 def get_all_capteurs_admin():
     """GET /api/admin/capteurs - Récupérer tous les capteurs avec leur statut"""
     try:
@@ -189,4 +192,29 @@ def dissocier_capteur(capteur_id):
             message=result['message']
         )
     except Exception as e:
-        return handle_exception(e)
\ No newline at end of file
+        return handle_exception(e)
+
+@admin_bp.route('/requetes/stats', methods=['GET'])
+def get_stats_requetes():
+    """GET /api/admin/requetes/stats - Temps passé en base par requête et par méthode de service (?tri=&limite=)"""
+    try:
+        tri = request.args.get('tri', 'temps_total_ms')
+        limite = request.args.get('limite', 50, type=int)
+        
+        return create_response(
+            data=query_stats.get_stats(tri, limite),
+            message='Statistiques des requêtes SQL de ce worker'
+        )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
+
+@admin_bp.route('/requetes/stats', methods=['DELETE'])
+def reinitialiser_stats_requetes():
+    """DELETE /api/admin/requetes/stats - Remettre à zéro les statistiques des requêtes SQL"""
+    try:
+        query_stats.reinitialiser()
+        return create_response(message='Statistiques des requêtes SQL réinitialisées')
+    except Exception as e:
+        return handle_exception(e)
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from app.database import execute_query, execute_write
+from app.database import execute_query, execute_write, FORMATS_TABULAIRES
+from app.versions import data_versions, etag_versions
 
 admin_salle_bp = Blueprint("admin_salle", __name__, url_prefix="/api/admin/salles")
 
@@ -10,18 +11,25 @@ def create_response(success=True, data=None, message="", status_code=200):
     return jsonify(payload), status_code
 
 @admin_salle_bp.get("/")
+@etag_versions("salle")
 def list_salles():
     limit  = request.args.get("limit", 50, type=int)
     offset = request.args.get("offset", 0, type=int)
 
-    rows = execute_query(
-        "SELECT * FROM salle ORDER BY date_creation DESC LIMIT :limit OFFSET :offset",
-        {"limit": limit, "offset": offset},
-    )
-    data = [dict(r._mapping) for r in rows]
+    format_resultat = request.args.get("format")
+
+    sql = "SELECT * FROM salle ORDER BY date_creation DESC LIMIT :limit OFFSET :offset"
+    params = {"limit": limit, "offset": offset}
+
+    if format_resultat in FORMATS_TABULAIRES:
+        data = FORMATS_TABULAIRES[format_resultat](execute_query(sql, params, tabulaire=True))
+    else:
+        rows = execute_query(sql, params)
+        data = [dict(r._mapping) for r in rows]
     return create_response(True, data=data, message="Liste des salles")
 
 @admin_salle_bp.get("/<int:salle_id>")
+@etag_versions("salle")
 def get_salle(salle_id):
     rows = execute_query("SELECT * FROM salle WHERE id = :id", {"id": salle_id})
     if not rows:
@@ -58,6 +66,7 @@ def create_salle():
     sql = f"INSERT INTO salle ({colnames}) VALUES ({placeholders})"
 
     new_id = execute_write(sql, params)
+    data_versions.incrementer("salle")
     row = execute_query("SELECT * FROM salle WHERE id = LAST_INSERT_ID()", {})[0]
     return create_response(True, data=dict(row._mapping), message="Salle créée", status_code=201)
 
@@ -87,6 +96,7 @@ def update_salle(salle_id):
     updates["id"] = salle_id
 
     execute_write(f"UPDATE salle SET {set_clause} WHERE id = :id", updates)
+    data_versions.incrementer("salle")
 
     rows = execute_query("SELECT * FROM salle WHERE id = :id", {"id": salle_id})
     if not rows:
@@ -100,11 +110,13 @@ def delete_salle(salle_id):
     if hard:
         try:
             execute_write("DELETE FROM salle WHERE id = :id", {"id": salle_id})
+            data_versions.incrementer("salle")
             return create_response(True, message="Salle supprimée (hard)")
         except Exception as e:
             return create_response(False, message=f"Impossible de supprimer (FK ?): {e}", status_code=409)
     else:
         execute_write("UPDATE salle SET etat = 'inactive' WHERE id = :id", {"id": salle_id})
+        data_versions.incrementer("salle")
         rows = execute_query("SELECT * FROM salle WHERE id = :id", {"id": salle_id})
         if not rows:
             return create_response(False, message="Salle introuvable", status_code=404)
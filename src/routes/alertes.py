@@ -0,0 +1,79 @@
+from flask import Blueprint, request
+from routes.capteurs import create_response, handle_exception, parse_date
+from services.alerte_service import alerte_service, HYSTERESIS
+from services.notification_service import notification_service
+
+alertes_bp = Blueprint('alertes', __name__, url_prefix='/api/alertes')
+
+LIMITE_DEFAUT = 100
+LIMITE_MAX = 1000
+STATUTS_NOTIFICATION = ('en_attente', 'envoyee', 'echec')
+
+@alertes_bp.route('', methods=['GET'])
+def get_alertes():
+    """
+    Événements d'alerte de seuils (déclenchement et fin), du plus récent au plus ancien
+
+    Query params:
+        salle_id (int): Filtrer sur une salle
+        parametre (str): temperature, humidite ou pression
+        actives (bool): true pour les seules alertes en cours
+        depuis (str): Date ISO 8601 minimale de l'événement
+        limit (int): Nombre d'événements (100 par défaut, 1000 au plus)
+    """
+    try:
+        parametre = request.args.get('parametre')
+        if parametre is not None and parametre not in HYSTERESIS:
+            raise ValueError(f"parametre doit être l'un de : {', '.join(HYSTERESIS)}")
+
+        limit = request.args.get('limit', LIMITE_DEFAUT, type=int)
+        if limit < 1 or limit > LIMITE_MAX:
+            raise ValueError(f"limit doit être compris entre 1 et {LIMITE_MAX}")
+
+        depuis = parse_date(request.args['depuis'], 'depuis') if 'depuis' in request.args else None
+
+        alertes = alerte_service.get_alertes(
+            salle_id=request.args.get('salle_id', type=int),
+            parametre=parametre,
+            actives=request.args.get('actives', 'false').lower() == 'true',
+            depuis=depuis,
+            limit=limit
+        )
+        return create_response(
+            success=True,
+            data=alertes,
+            message=f'{len(alertes)} événements d\'alerte récupérés'
+        )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
+
+@alertes_bp.route('/notifications', methods=['GET'])
+def get_notifications():
+    """
+    Notifications envoyées aux webhooks (outbox), des plus récentes aux plus anciennes
+
+    Query params:
+        statut (str): en_attente, envoyee ou echec
+        limit (int): Nombre de notifications (100 par défaut, 1000 au plus)
+    """
+    try:
+        statut = request.args.get('statut')
+        if statut is not None and statut not in STATUTS_NOTIFICATION:
+            raise ValueError(f"statut doit être l'un de : {', '.join(STATUTS_NOTIFICATION)}")
+
+        limit = request.args.get('limit', LIMITE_DEFAUT, type=int)
+        if limit < 1 or limit > LIMITE_MAX:
+            raise ValueError(f"limit doit être compris entre 1 et {LIMITE_MAX}")
+
+        notifications = notification_service.get_notifications(statut=statut, limit=limit)
+        return create_response(
+            success=True,
+            data=notifications,
+            message=f'{len(notifications)} notifications récupérées'
+        )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
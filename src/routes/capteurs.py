@@ -1,5 +1,15 @@
 from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+import json
+import time
+from app.cache import cache_route
+from app.database import FORMATS_TABULAIRES
+from app.flux import FORMATS_FLUX, reponse_flux, reponse_sse
+from app.versions import etag_versions
 from services.capteur_service import capteur_service
+from services.mesure_service import mesure_service, ingestion_buffer, should_use_ingestion_buffer
+from services.ingestion_buffer import BufferPleinError
+from services.live_service import live_service
 
 capteurs_bp = Blueprint('capteurs', __name__)
 
@@ -22,7 +32,96 @@ def handle_exception(e, default_message="Erreur interne du serveur"):
         status_code=500
     )
 
+MAX_POINTS_DEFAUT = 500
+MAX_POINTS_LIMITE = 5000
+PARAMS_INTERVALLE = ('from', 'to', 'max_points')
+MAX_SALLES_PAR_REQUETE = 100
+MAX_CAPTEURS_PAR_REQUETE = 1000
+MAX_DONNEES_PAR_CAPTEUR = 100
+
+def parse_date(valeur, nom):
+    """Lire une date ISO 8601 (les dates avec fuseau sont ramenées en heure locale)"""
+    try:
+        date = datetime.fromisoformat(valeur)
+    except ValueError:
+        raise ValueError(f"{nom} doit être une date ISO 8601")
+    if date.tzinfo is not None:
+        date = date.astimezone().replace(tzinfo=None)
+    return date
+
+def parse_ids(valeur, nom, maximum):
+    """Lire une liste d'IDs (entiers séparés par des virgules, ou liste JSON), sans doublon"""
+    try:
+        if isinstance(valeur, str):
+            valeur = [i for i in valeur.split(',') if i.strip()]
+        if not isinstance(valeur, list) or any(isinstance(i, bool) for i in valeur):
+            raise ValueError()
+        ids = list(dict.fromkeys(int(i) for i in valeur))
+    except (TypeError, ValueError):
+        raise ValueError(f"{nom} doit être une liste d'entiers séparés par des virgules")
+    if not ids:
+        raise ValueError(f"{nom} ne doit pas être vide")
+    if len(ids) > maximum:
+        raise ValueError(f"{nom} est limité à {maximum} éléments")
+    return ids
+
+def parse_salle_ids(valeur):
+    """Lire une liste d'IDs de salles séparés par des virgules (salle_ids=1,2,3)"""
+    return sorted(parse_ids(valeur, 'salle_ids', MAX_SALLES_PAR_REQUETE))
+
+def get_historique_intervalle(type_mesure, salle_id=None, capteur_id=None):
+    """
+    Historique réduit côté serveur si from, to ou max_points sont fournis, None sinon.
+    Par défaut : les dernières 24h, 500 points, moyenne par intervalle.
+    """
+    if not any(param in request.args for param in PARAMS_INTERVALLE):
+        return None
+    
+    fin = parse_date(request.args['to'], 'to') if 'to' in request.args else datetime.now()
+    debut = parse_date(request.args['from'], 'from') if 'from' in request.args else fin - timedelta(days=1)
+    if debut >= fin:
+        raise ValueError("from doit être antérieur à to")
+    
+    max_points = request.args.get('max_points', MAX_POINTS_DEFAUT, type=int)
+    if max_points is None or not 3 <= max_points <= MAX_POINTS_LIMITE:
+        raise ValueError(f"max_points doit être un entier entre 3 et {MAX_POINTS_LIMITE}")
+    
+    methode = (request.args.get('methode') or 'moyenne').lower()
+    if methode not in ('moyenne', 'lttb'):
+        raise ValueError("methode doit valoir moyenne ou lttb")
+    
+    return capteur_service.get_historique(
+        type_mesure, debut, fin, max_points, methode,
+        salle_id=salle_id, capteur_id=capteur_id
+    )
+
+def get_historique_limite(methode, identifiant):
+    """
+    Les `limit` dernières mesures. Avec ?format=compact ou ?format=colonnes,
+    le résultat est renvoyé sous forme tabulaire, sans dict par ligne.
+    """
+    limit = request.args.get('limit', 10, type=int)
+    format_resultat = request.args.get('format')
+    
+    if format_resultat in FORMATS_TABULAIRES:
+        return FORMATS_TABULAIRES[format_resultat](methode(identifiant, limit, tabulaire=True))
+    return methode(identifiant, limit)
+
+def get_historique_flux(methode, identifiant, nom_fichier):
+    """
+    Avec ?format=ndjson ou ?format=csv (mode limit), les `limit` dernières mesures
+    sont streamées par lots depuis un curseur côté serveur : la mémoire du worker
+    ne dépend pas de limit. None si aucun format streamé n'est demandé.
+    """
+    format_flux = request.args.get('format')
+    if format_flux not in FORMATS_FLUX or any(param in request.args for param in PARAMS_INTERVALLE):
+        return None
+    
+    limit = request.args.get('limit', 10, type=int)
+    return reponse_flux(format_flux, methode(identifiant, limit, flux=True), nom_fichier)
+
 @capteurs_bp.route('/salles', methods=['GET'])
+@etag_versions('salle')
 def get_salles():
     """GET /api/capteurs/salles - Récupérer toutes les salles actives"""
     try:
@@ -35,6 +134,7 @@ def get_salles():
         return handle_exception(e)
 
 @capteurs_bp.route('/salles/<int:salle_id>/capteurs', methods=['GET'])
+@etag_versions('capteur', 'salle')
 def get_capteurs_by_salle(salle_id):
     """GET /api/capteurs/salles/:id/capteurs - Récupérer les capteurs d'une salle"""
     try:
@@ -47,6 +147,7 @@ def get_capteurs_by_salle(salle_id):
         return handle_exception(e)
 
 @capteurs_bp.route('/salles/<int:salle_id>/moyennes', methods=['GET'])
+@cache_route(5, 'salle', 'capteur')
 def get_moyennes_by_salle(salle_id):
     """GET /api/capteurs/salles/:id/moyennes - Récupérer les moyennes des dernières données d'une salle"""
     try:
@@ -68,6 +169,61 @@ def get_moyennes_by_salle(salle_id):
     except Exception as e:
         return handle_exception(e)
 
+@capteurs_bp.route('/moyennes', methods=['GET'])
+@cache_route(5, 'salle', 'capteur')
+def get_moyennes_salles():
+    """GET /api/capteurs/moyennes?salle_ids=1,2,3 ou ?batiment=A - Moyennes de plusieurs salles en un appel"""
+    try:
+        salle_ids = parse_salle_ids(request.args['salle_ids']) if 'salle_ids' in request.args else None
+        batiments = [b.strip() for b in request.args.getlist('batiment') if b.strip()] or None
+
+        moyennes = capteur_service.get_moyennes_salles(salle_ids=salle_ids, batiments=batiments)
+
+        return create_response(
+            data=moyennes,
+            message=f'Moyennes de {len(moyennes)} salle(s) récupérées avec succès'
+        )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
+
+@capteurs_bp.route('/donnees', methods=['GET', 'POST'])
+def get_donnees_by_capteurs():
+    """
+    GET /api/capteurs/donnees?ids=1,2,3&limit=1 - Dernières données de plusieurs capteurs
+    POST /api/capteurs/donnees {"ids": [1, 2, 3], "limit": 1} - Même réponse, pour les longues listes
+    """
+    try:
+        if request.method == 'POST':
+            corps = request.get_json(silent=True)
+            if not isinstance(corps, dict) or 'ids' not in corps:
+                raise ValueError("Le corps doit être un objet JSON {\"ids\": [...]}")
+            ids, limit = corps['ids'], corps.get('limit', 1)
+        else:
+            if 'ids' not in request.args:
+                raise ValueError("ids est obligatoire")
+            ids, limit = request.args['ids'], request.args.get('limit', 1, type=int)
+
+        capteur_ids = parse_ids(ids, 'ids', MAX_CAPTEURS_PAR_REQUETE)
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_DONNEES_PAR_CAPTEUR:
+            raise ValueError(f"limit doit être compris entre 1 et {MAX_DONNEES_PAR_CAPTEUR}")
+
+        capteurs = capteur_service.get_dernieres_donnees_by_capteurs(capteur_ids, limit)
+        trouves = {donnees['capteur']['id'] for donnees in capteurs}
+
+        return create_response(
+            data={
+                'capteurs': capteurs,
+                'introuvables': [capteur_id for capteur_id in capteur_ids if capteur_id not in trouves]
+            },
+            message=f'Données de {len(capteurs)} capteur(s) récupérées avec succès'
+        )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
+
 @capteurs_bp.route('/<int:capteur_id>/donnees', methods=['GET'])
 def get_donnees_by_capteur(capteur_id):
     """GET /api/capteurs/:id/donnees - Récupérer les dernières données d'un capteur"""
@@ -92,57 +248,153 @@ def get_donnees_by_capteur(capteur_id):
 
 @capteurs_bp.route('/salles/<int:salle_id>/temperature', methods=['GET'])
 def get_temperature_by_salle(salle_id):
-    """GET /api/capteurs/salles/:id/temperature - Récupérer les données de température d'une salle"""
+    """GET /api/capteurs/salles/:id/temperature - Récupérer les données de température d'une salle (?limit=&format=compact|colonnes|ndjson|csv ou ?from=&to=&max_points=)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
+        flux = get_historique_flux(capteur_service.get_temperature_by_salle, salle_id, f'temperature_salle_{salle_id}')
+        if flux is not None:
+            return flux
+        
+        temperatures = get_historique_intervalle('temperature', salle_id=salle_id)
+        
+        if temperatures is None:
+            temperatures = get_historique_limite(capteur_service.get_temperature_by_salle, salle_id)
         
-        temperatures = capteur_service.get_temperature_by_salle(salle_id, limit)
         return create_response(
             data=temperatures,
             message=f'Températures de la salle {salle_id} récupérées avec succès'
         )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return handle_exception(e)
 
 @capteurs_bp.route('/salles/<int:salle_id>/humidite', methods=['GET'])
 def get_humidite_by_salle(salle_id):
-    """GET /api/capteurs/salles/:id/humidite - Récupérer les données d'humidité d'une salle"""
+    """GET /api/capteurs/salles/:id/humidite - Récupérer les données d'humidité d'une salle (?limit=&format=compact|colonnes|ndjson|csv ou ?from=&to=&max_points=)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
+        flux = get_historique_flux(capteur_service.get_humidite_by_salle, salle_id, f'humidite_salle_{salle_id}')
+        if flux is not None:
+            return flux
+        
+        humidites = get_historique_intervalle('humidite', salle_id=salle_id)
+        
+        if humidites is None:
+            humidites = get_historique_limite(capteur_service.get_humidite_by_salle, salle_id)
         
-        humidites = capteur_service.get_humidite_by_salle(salle_id, limit)
         return create_response(
             data=humidites,
             message=f'Humidités de la salle {salle_id} récupérées avec succès'
         )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return handle_exception(e)
 
 @capteurs_bp.route('/salles/<int:salle_id>/pression', methods=['GET'])
 def get_pression_by_salle(salle_id):
-    """GET /api/capteurs/salles/:id/pression - Récupérer les données de pression d'une salle"""
+    """GET /api/capteurs/salles/:id/pression - Récupérer les données de pression d'une salle (?limit=&format=compact|colonnes|ndjson|csv ou ?from=&to=&max_points=)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
+        flux = get_historique_flux(capteur_service.get_pression_by_salle, salle_id, f'pression_salle_{salle_id}')
+        if flux is not None:
+            return flux
+        
+        pressions = get_historique_intervalle('pression', salle_id=salle_id)
+        
+        if pressions is None:
+            pressions = get_historique_limite(capteur_service.get_pression_by_salle, salle_id)
         
-        pressions = capteur_service.get_pression_by_salle(salle_id, limit)
         return create_response(
             data=pressions,
             message=f'Pressions de la salle {salle_id} récupérées avec succès'
         )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return handle_exception(e)
 
 @capteurs_bp.route('/<int:capteur_id>/temperature', methods=['GET'])
 def get_temperature_by_capteur(capteur_id):
-    """GET /api/capteurs/:id/temperature - Récupérer les données de température d'un capteur"""
+    """GET /api/capteurs/:id/temperature - Récupérer les données de température d'un capteur (?limit=&format=compact|colonnes|ndjson|csv ou ?from=&to=&max_points=)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
+        flux = get_historique_flux(capteur_service.get_temperature_by_capteur, capteur_id, f'temperature_capteur_{capteur_id}')
+        if flux is not None:
+            return flux
+        
+        temperatures = get_historique_intervalle('temperature', capteur_id=capteur_id)
+        
+        if temperatures is None:
+            temperatures = get_historique_limite(capteur_service.get_temperature_by_capteur, capteur_id)
         
-        temperatures = capteur_service.get_temperature_by_capteur(capteur_id, limit)
         return create_response(
             data=temperatures,
             message=f'Températures du capteur {capteur_id} récupérées avec succès'
         )
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
+
+def lire_mesures():
+    """Lire un lot de mesures en JSON (liste ou {"mesures": [...]}) ou en NDJSON (une mesure par ligne)"""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        lignes = request.get_data(as_text=True).splitlines()
+        return [json.loads(ligne) for ligne in lignes if ligne.strip()]
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('mesures')
+    if not isinstance(data, list):
+        raise ValueError('Corps attendu : liste JSON de mesures, {"mesures": [...]} ou NDJSON')
+    return data
+
+@capteurs_bp.route('/mesures', methods=['POST'])
+def post_mesures():
+    """POST /api/capteurs/mesures - Enregistrer un lot de mesures (JSON ou NDJSON)"""
+    try:
+        mesures = lire_mesures()
+        
+        if not mesures:
+            return create_response(
+                success=False,
+                message='Aucune mesure fournie',
+                status_code=400
+            )
+        
+        buffer = ingestion_buffer if should_use_ingestion_buffer() else None
+        
+        debut = time.perf_counter()
+        resultat = mesure_service.enregistrer_mesures(mesures, buffer=buffer)
+        duree = time.perf_counter() - debut
+        
+        resultat['duree_ms'] = round(duree * 1000, 2)
+        resultat['mesures_par_seconde'] = round(resultat['inserees'] / duree) if duree > 0 else None
+        
+        if resultat['inserees'] == 0:
+            return create_response(
+                success=False,
+                data=resultat,
+                message=f'Aucune mesure valide ({resultat["rejetees"]} rejetée(s))',
+                status_code=400
+            )
+        
+        if resultat['differee']:
+            return create_response(
+                data=resultat,
+                message=f'{resultat["inserees"]} mesure(s) acceptée(s), {resultat["rejetees"]} rejetée(s)',
+                status_code=202
+            )
+        
+        return create_response(
+            data=resultat,
+            message=f'{resultat["inserees"]} mesure(s) enregistrée(s), {resultat["rejetees"]} rejetée(s)',
+            status_code=201
+        )
+    except BufferPleinError as e:
+        response, status_code = create_response(success=False, message=str(e), status_code=429)
+        response.headers['Retry-After'] = '1'
+        return response, status_code
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return handle_exception(e)
 
@@ -276,4 +528,33 @@ def get_conformite_salle(salle_id):
     except Exception as e:
         return handle_exception(e)
 
- 
\ No newline at end of file
+ 
+
+@capteurs_bp.route('/salles/<int:salle_id>/stream', methods=['GET'])
+def stream_salle(salle_id):
+    """
+    GET /api/capteurs/salles/:id/stream - Nouvelles mesures et moyennes de la salle (Server-Sent Events)
+    Événements : moyennes (à la connexion puis à chaque changement) et mesure
+    """
+    try:
+        moyennes = capteur_service.get_moyennes_dernieres_donnees_by_salle(salle_id)
+        initiaux = [('moyennes', moyennes)] if moyennes else []
+        return reponse_sse(live_service.abonner({salle_id}), initiaux)
+    except Exception as e:
+        return handle_exception(e)
+
+@capteurs_bp.route('/stream', methods=['GET'])
+def stream_salles():
+    """
+    GET /api/capteurs/stream - Server-Sent Events de plusieurs salles
+    Query params:
+      - salle_ids: IDs séparés par des virgules (défaut: toutes les salles actives)
+    """
+    try:
+        salle_ids = parse_salle_ids(request.args['salle_ids']) if 'salle_ids' in request.args else None
+        initiaux = [('moyennes', moyennes) for moyennes in capteur_service.get_moyennes_salles(salle_ids=salle_ids)]
+        return reponse_sse(live_service.abonner(salle_ids), initiaux)
+    except ValueError as e:
+        return create_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return handle_exception(e)
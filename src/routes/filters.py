@@ -2,7 +2,8 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy import text, bindparam
 from typing import List, Optional
 from services.capteur_service import capteur_service   
-from app.database import engine                        
+from app.database import connexion                      
+from app.versions import etag_versions
 
 filters_bp = Blueprint("filters", __name__, url_prefix="/api")
 
@@ -17,6 +18,7 @@ def create_response(success: bool = True, data=None, message: str = "", status_c
 #  -> filtre par batiment, etage, capacite
 
 @filters_bp.get("/filter")
+@etag_versions("salle")
 def filter_salles():
     """
     GET /api/filter
@@ -71,7 +73,7 @@ def filter_salles():
         params["limit"]  = limit
         params["offset"] = offset
 
-        with engine.connect() as conn:
+        with connexion() as conn:
             stmt = text(sql)
             if "batiments" in params:
                 stmt = stmt.bindparams(bindparam("batiments", expanding=True))
@@ -98,7 +100,8 @@ def _filtrer_par_niveau(niveaux: Optional[List[str]] = None,
     ordre = (ordre or "asc").lower()
     reverse = (ordre == "desc")
 
-    resultats = capteur_service.verifier_conformite_salles(limit=limit_mesures) or []
+    # Copie : la liste renvoyée par le service est partagée via le cache et triée ci-dessous
+    resultats = list(capteur_service.verifier_conformite_salles(limit=limit_mesures) or [])
 
     if niveaux:
         resultats = [r for r in resultats if r.get("niveau_conformite") in niveaux]
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from app.database import execute_query
+from app.database import execute_query, FORMATS_TABULAIRES
 
 def create_response(success=True, data=None, message="", status_code=200):
     payload = {"success": success, "message": message}
@@ -58,9 +58,14 @@ def search():
     params["limit"] = int(limit)
     params["offset"] = int(offset)
 
+    format_resultat = request.args.get("format")
+
     try:
-        rows = execute_query(sql, params)
-        data = [dict(r._mapping) for r in rows]
+        if format_resultat in FORMATS_TABULAIRES:
+            data = FORMATS_TABULAIRES[format_resultat](execute_query(sql, params, tabulaire=True))
+        else:
+            rows = execute_query(sql, params)
+            data = [dict(r._mapping) for r in rows]
         return create_response(True, data=data, message="Résultats trouvés")
     except Exception as e:
         return create_response(False, message=str(e), status_code=500)
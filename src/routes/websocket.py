@@ -0,0 +1,16 @@
+from flask import current_app
+from flask_sock import Sock
+from app.flux import servir_websocket
+from services.live_service import live_service
+
+# Routes WebSocket, enregistrées sur l'application par sock.init_app dans create_app
+sock = Sock()
+
+@sock.route('/api/capteurs/ws')
+def websocket_salles(ws):
+    """
+    WS /api/capteurs/ws - Abonnement aux événements de plusieurs salles sur une seule socket
+    Commandes : {"action": "abonner"|"desabonner", "salle_ids": [...]}, {"action": "ping"}
+    Événements : {"event": "mesure"|"moyennes"|"conformite"|"abonnements"|"pong"|"erreur", "data": ...}
+    """
+    servir_websocket(ws, live_service, current_app.json)
@@ -1,6 +1,8 @@
 from typing import Dict, Any, List, Optional
+from app.cache import cache_service, enregistrer_prechauffage
 from app.queries import execute_query, execute_single_query
-from app.database import engine
+from app.database import connexion
+from app.versions import data_versions
 from sqlalchemy import text
 
 class AdminService:
@@ -29,29 +31,12 @@ class AdminService:
                         WHEN c.is_active = 0 THEN 'Inactif'
                         ELSE 'Actif'
                     END as statut,
-                    CASE 
-                        WHEN c.type_capteur = 'temperature' THEN 
-                            (SELECT CONCAT(t.valeur, ' ', t.unite, ' (', DATE_FORMAT(t.date_update, '%d/%m/%Y %H:%i'), ')')
-                             FROM temperature t 
-                             WHERE t.capteur_id = c.id AND t.date_update >= c.date_installation
-                             ORDER BY t.date_update DESC 
-                             LIMIT 1)
-                        WHEN c.type_capteur = 'humidite' THEN 
-                            (SELECT CONCAT(h.valeur, ' ', h.unite, ' (', DATE_FORMAT(h.date_update, '%d/%m/%Y %H:%i'), ')')
-                             FROM humidite h 
-                             WHERE h.capteur_id = c.id AND h.date_update >= c.date_installation
-                             ORDER BY h.date_update DESC 
-                             LIMIT 1)
-                        WHEN c.type_capteur = 'pression' THEN 
-                            (SELECT CONCAT(p.valeur, ' ', p.unite, ' (', DATE_FORMAT(p.date_update, '%d/%m/%Y %H:%i'), ')')
-                             FROM pression p 
-                             WHERE p.capteur_id = c.id AND p.date_update >= c.date_installation
-                             ORDER BY p.date_update DESC 
-                             LIMIT 1)
-                        ELSE NULL
-                    END as derniere_mesure
+                    CONCAT(d.valeur, ' ', d.unite, ' (', DATE_FORMAT(d.date_update, '%d/%m/%Y %H:%i'), ')') as derniere_mesure
                 FROM capteur c
                 LEFT JOIN salle s ON c.id_salle = s.id
+                LEFT JOIN capteur_derniere_mesure d ON d.capteur_id = c.id
+                    AND d.type = c.type_capteur
+                    AND d.date_update >= c.date_installation
                 ORDER BY c.is_active DESC, c.nom
             """
             
@@ -113,6 +98,7 @@ class AdminService:
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération des capteurs indisponibles: {str(e)}")
     
+    @cache_service(300, 'salle', 'capteur')
     def get_capteurs_par_salle(self):
         """
         Récupérer les capteurs groupés par salle
@@ -172,7 +158,7 @@ class AdminService:
             if not salle:
                 raise Exception("Salle introuvable")
             
-            with engine.connect() as conn:
+            with connexion() as conn:
                 query = """
                     UPDATE capteur 
                     SET id_salle = :salle_id 
@@ -180,6 +166,7 @@ class AdminService:
                 """
                 result = conn.execute(text(query), {'salle_id': salle_id, 'capteur_id': capteur_id})
                 conn.commit()
+                data_versions.incrementer('capteur')
                 
                 if result.rowcount == 0:
                     raise Exception("Impossible d'associer le capteur")
@@ -210,7 +197,7 @@ class AdminService:
             if capteur['id_salle'] is None:
                 raise Exception("Le capteur n'est associé à aucune salle")
             
-            with engine.connect() as conn:
+            with connexion() as conn:
                 query = """
                     UPDATE capteur 
                     SET id_salle = NULL 
@@ -218,6 +205,7 @@ class AdminService:
                 """
                 result = conn.execute(text(query), {'capteur_id': capteur_id})
                 conn.commit()
+                data_versions.incrementer('capteur')
                 
                 if result.rowcount == 0:
                     raise Exception("Impossible de dissocier le capteur")
@@ -262,9 +250,10 @@ class AdminService:
                 WHERE id = :id AND is_active = TRUE
             """
             
-            with engine.connect() as connection:
+            with connexion() as connection:
                 result = connection.execute(text(query_update), {"id_salle": nouvelle_salle_id, "id": capteur_id})
                 connection.commit()
+                data_versions.incrementer('capteur')
                 
                 if result.rowcount == 0:
                     raise Exception("Impossible de changer la salle du capteur")
@@ -294,7 +283,7 @@ class AdminService:
             dict: Résultat de l'opération
         """
         try:
-            with engine.connect() as conn:
+            with connexion() as conn:
                 query = """
                     UPDATE capteur 
                     SET is_active = TRUE 
@@ -302,6 +291,7 @@ class AdminService:
                 """
                 result = conn.execute(text(query), {'capteur_id': capteur_id})
                 conn.commit()
+                data_versions.incrementer('capteur')
                 
                 if result.rowcount == 0:
                     raise Exception("Capteur introuvable")
@@ -330,7 +320,7 @@ class AdminService:
             if not capteur['is_active']:
                 raise Exception(f"Le capteur {capteur_id} est déjà désactivé")
             
-            with engine.connect() as conn:
+            with connexion() as conn:
                 query = """
                     UPDATE capteur 
                     SET is_active = FALSE, id_salle = NULL 
@@ -338,6 +328,7 @@ class AdminService:
                 """
                 result = conn.execute(text(query), {'capteur_id': capteur_id})
                 conn.commit()
+                data_versions.incrementer('capteur')
                 
                 if result.rowcount == 0:
                     raise Exception("Capteur introuvable")
@@ -402,6 +393,7 @@ class AdminService:
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération de la salle: {str(e)}")
     
+    @cache_service(300, 'salle', 'capteur', obsolescence_max=600)
     def get_statistiques(self):
         """
         Récupérer les statistiques générales
@@ -487,7 +479,7 @@ class AdminService:
                 VALUES (%s, %s, %s, NOW(), TRUE)
             """
             
-            with engine.connect() as conn:
+            with connexion() as conn:
                 params = (nom, type_capteur, id_salle)
                 param_dict = {f'param_{i}': param for i, param in enumerate(params)}
                 query_with_params = insert_query
@@ -496,6 +488,7 @@ class AdminService:
                 
                 result = conn.execute(text(query_with_params), param_dict)
                 conn.commit()
+                data_versions.incrementer('capteur')
                 
                 capteur_id = result.lastrowid
             
@@ -563,11 +556,12 @@ class AdminService:
                 WHERE id = %s
             """
             
-            with engine.connect() as conn:
+            with connexion() as conn:
                 param_dict = {'param_0': capteur_id}
                 query_with_params = update_query.replace('%s', ':param_0')
                 conn.execute(text(query_with_params), param_dict)
                 conn.commit()
+                data_versions.incrementer('capteur')
             
             capteur['is_active'] = True
             return capteur
@@ -600,10 +594,11 @@ class AdminService:
             delete_temp_query = "DELETE FROM temperature WHERE capteur_id = %s"
             delete_hum_query = "DELETE FROM humidite WHERE capteur_id = %s"
             delete_press_query = "DELETE FROM pression WHERE capteur_id = %s"
+            delete_derniere_query = "DELETE FROM capteur_derniere_mesure WHERE capteur_id = %s"
             delete_capteur_query = "DELETE FROM capteur WHERE id = %s"
             
-            with engine.connect() as conn:
-                for query in [delete_temp_query, delete_hum_query, delete_press_query]:
+            with connexion() as conn:
+                for query in [delete_temp_query, delete_hum_query, delete_press_query, delete_derniere_query]:
                     param_dict = {'param_0': capteur_id}
                     query_with_params = query.replace('%s', ':param_0')
                     conn.execute(text(query_with_params), param_dict)
@@ -613,10 +608,14 @@ class AdminService:
                 conn.execute(text(query_with_params), param_dict)
                 
                 conn.commit()
+                data_versions.incrementer('capteur')
             
             return True
             
         except Exception as e:
             raise Exception(f"Erreur lors de la suppression du capteur: {str(e)}")
 
-admin_service = AdminService()
\ No newline at end of file
+admin_service = AdminService()
+
+enregistrer_prechauffage('statistiques', admin_service.get_statistiques)
+enregistrer_prechauffage('capteurs_par_salle', admin_service.get_capteurs_par_salle)
@@ -0,0 +1,439 @@
+import copy
+import os
+import time
+from datetime import datetime, timedelta
+from app.database import engine, execute_many
+from app.jobs import JobArrierePlan
+from app.queries import execute_query
+from services.capteur_service import capteur_service
+from services.live_service import SuiviMesures, RETENTION_FLUX
+from services.notification_service import notification_service, INSERT_NOTIFICATION_QUERY
+from sqlalchemy import text
+
+CREATE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS alerte (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        salle_id INT NOT NULL,
+        parametre VARCHAR(32) NOT NULL,
+        evenement VARCHAR(16) NOT NULL,
+        sens VARCHAR(8) NOT NULL,
+        valeur DECIMAL(10, 2) NOT NULL,
+        seuil DECIMAL(10, 2),
+        date_debut DATETIME NOT NULL,
+        date_evenement DATETIME NOT NULL,
+        date_creation DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_alerte_salle (salle_id, parametre, id),
+        INDEX idx_alerte_date (date_evenement)
+    )
+"""
+
+INSERT_ALERTE_QUERY = """
+    INSERT INTO alerte (salle_id, parametre, evenement, sens, valeur, seuil, date_debut, date_evenement)
+    VALUES (:salle_id, :parametre, :evenement, :sens, :valeur, :seuil, :date_debut, :date_evenement)
+"""
+
+# Alerte en cours : déclenchement sans fin postérieure pour la même salle et le même paramètre
+CONDITION_ALERTE_ACTIVE = """
+    a.evenement = 'declenchement' AND NOT EXISTS (
+        SELECT 1 FROM alerte f
+        WHERE f.salle_id = a.salle_id AND f.parametre = a.parametre
+            AND f.evenement = 'fin' AND f.id > a.id
+    )
+"""
+
+# Salle de chaque capteur actif, pour retirer des moyennes les capteurs désactivés ou déplacés
+CAPTEURS_ACTIFS_QUERY = """
+    SELECT id, id_salle FROM capteur WHERE is_active = TRUE AND id_salle IS NOT NULL
+"""
+
+# Écart à repasser sous le seuil avant de considérer le retour à la normale
+HYSTERESIS = {
+    'temperature': float(os.getenv('ALERTE_HYSTERESIS_TEMPERATURE', 0.5)),
+    'humidite': float(os.getenv('ALERTE_HYSTERESIS_HUMIDITE', 2)),
+    'pression': float(os.getenv('ALERTE_HYSTERESIS_PRESSION', 1))
+}
+
+class EtatParametre:
+    """
+    État d'un paramètre d'une salle : dernière valeur de chaque capteur (somme tenue à
+    jour pour la moyenne) et sa date, alerte en cours et début du dépassement ou du
+    retour en attente. Les dates sont rangées de la plus ancienne à la plus récente.
+    """
+
+    __slots__ = ('valeurs', 'dates', 'somme', 'alerte', 'sens', 'date_debut', 'debut_depassement', 'debut_retour')
+
+    def __init__(self):
+        self.valeurs = {}
+        self.dates = {}
+        self.somme = 0.0
+        self.alerte = False
+        self.sens = None
+        self.date_debut = None
+        self.debut_depassement = None
+        self.debut_retour = None
+
+    def mettre_a_jour(self, capteur_id, valeur, date):
+        """Remplacer la valeur du capteur et renvoyer la nouvelle moyenne de la salle"""
+        self.somme += valeur - self.valeurs.get(capteur_id, 0.0)
+        self.valeurs[capteur_id] = valeur
+        self.dates.pop(capteur_id, None)
+        self.dates[capteur_id] = date
+        return self.somme / len(self.valeurs)
+
+    def expirer(self, limite):
+        """Retirer les valeurs des capteurs sans mesure depuis limite"""
+        while self.dates:
+            capteur_id, date = next(iter(self.dates.items()))
+            if date >= limite:
+                break
+            self.retirer(capteur_id)
+
+    def retirer(self, capteur_id):
+        self.dates.pop(capteur_id, None)
+        valeur = self.valeurs.pop(capteur_id, None)
+        if valeur is not None:
+            self.somme -= valeur
+
+class AlerteService:
+    """
+    Moteur d'alertes de seuils, évalué mesure par mesure.
+
+    Chaque nouvelle mesure met à jour en O(1) la moyenne de son paramètre dans sa salle
+    (somme des dernières valeurs par capteur), comparée aux seuils de conformité gardés en
+    mémoire. Une alerte n'est déclenchée qu'après un dépassement continu d'au moins
+    duree_min secondes, et ne prend fin qu'après un retour sous le seuil diminué de
+    l'hystérésis pendant la même durée : une valeur qui oscille autour du seuil ne
+    produit pas de série d'alertes. Les durées sont mesurées sur les dates des mesures.
+
+    Une valeur plus ancienne que fraicheur secondes ne compte pas : les mesures reçues
+    en retard (dernières mesures relues au démarrage) sont ignorées, et la valeur d'un
+    capteur silencieux sort de la moyenne. Les capteurs désactivés ou sortis de leur
+    salle en sont retirés à chaque relecture de la liste des capteurs actifs.
+    """
+
+    def __init__(self, duree_min=120, ttl_seuils=60, fraicheur=900):
+        """
+        Args:
+            duree_min (float): Durée minimale d'un dépassement ou d'un retour, en secondes
+            ttl_seuils (float): Durée de conservation des seuils de conformité et de la
+                liste des capteurs actifs, en secondes
+            fraicheur (float): Âge maximal d'une valeur prise en compte, en secondes
+                (None : pas de limite)
+        """
+        self.duree_min = duree_min
+        self.ttl_seuils = ttl_seuils
+        self.fraicheur = fraicheur
+        self.suivi = SuiviMesures(depuis_debut=True, retention=RETENTION_FLUX)
+        self._etats = {}
+        self._salles_capteurs = {}
+        self._nb_alertes = {}
+        self._seuils = {}
+        self._expiration_seuils = 0
+        self._expiration_capteurs = 0
+
+    def installer(self):
+        """
+        Créer la table des alertes
+
+        Returns:
+            bool: True si succès
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(CREATE_TABLE_QUERY))
+            return True
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'installation des alertes: {str(e)}")
+
+    def reinitialiser(self):
+        """
+        Repartir de l'état enregistré : alertes en cours relues depuis la table, puis
+        dernières mesures de tous les capteurs réévaluées à la prochaine exécution
+        """
+        try:
+            self._etats = {}
+            self._salles_capteurs = {}
+            self._nb_alertes = {}
+            self._expiration_seuils = 0
+            self._expiration_capteurs = 0
+            self.suivi.reinitialiser()
+
+            for alerte in execute_query(f"SELECT a.* FROM alerte a WHERE {CONDITION_ALERTE_ACTIVE}"):
+                etat = self._etat(alerte['salle_id'], alerte['parametre'])
+                etat.alerte = True
+                etat.sens = alerte['sens']
+                etat.date_debut = alerte['date_debut']
+                self._nb_alertes[alerte['salle_id']] = self._nb_alertes.get(alerte['salle_id'], 0) + 1
+
+        except Exception as e:
+            raise Exception(f"Erreur lors du chargement des alertes en cours: {str(e)}")
+
+    def _etat(self, salle_id, parametre):
+        etat = self._etats.get((salle_id, parametre))
+        if etat is None:
+            etat = self._etats[(salle_id, parametre)] = EtatParametre()
+        return etat
+
+    def get_seuils(self):
+        """Seuils de conformité par salle, relus au plus toutes les ttl_seuils secondes"""
+        if time.monotonic() >= self._expiration_seuils:
+            self._seuils = capteur_service.get_seuils_conformite_salles()
+            self._expiration_seuils = time.monotonic() + self.ttl_seuils
+        return self._seuils
+
+    def rafraichir_capteurs(self):
+        """
+        Retirer des moyennes les capteurs désactivés ou changés de salle depuis leur
+        dernière mesure, d'après la liste des capteurs actifs relue au plus toutes les
+        ttl_seuils secondes
+        """
+        if time.monotonic() < self._expiration_capteurs:
+            return
+
+        salles = {capteur['id']: capteur['id_salle'] for capteur in execute_query(CAPTEURS_ACTIFS_QUERY)}
+        for (capteur_id, parametre), salle_id in list(self._salles_capteurs.items()):
+            if salles.get(capteur_id) != salle_id:
+                self._etat(salle_id, parametre).retirer(capteur_id)
+                del self._salles_capteurs[(capteur_id, parametre)]
+        self._expiration_capteurs = time.monotonic() + self.ttl_seuils
+
+    def traiter_mesure(self, mesure):
+        """
+        Évaluer une nouvelle mesure
+
+        Args:
+            mesure (dict): capteur_id, salle_id, type, valeur, date_update
+
+        Returns:
+            dict: Événement d'alerte (declenchement ou fin), None sinon
+        """
+        parametre = mesure['type']
+        if parametre not in HYSTERESIS or mesure['valeur'] is None:
+            return None
+        if self.fraicheur is not None and mesure['date_update'] < datetime.now() - timedelta(seconds=self.fraicheur):
+            return None
+
+        salle_id = mesure['salle_id']
+        cle_capteur = (mesure['capteur_id'], parametre)
+        ancienne_salle = self._salles_capteurs.get(cle_capteur)
+        if ancienne_salle is not None and ancienne_salle != salle_id:
+            # Capteur déplacé : sa dernière valeur ne compte plus dans son ancienne salle
+            self._etat(ancienne_salle, parametre).retirer(mesure['capteur_id'])
+        self._salles_capteurs[cle_capteur] = salle_id
+
+        etat = self._etat(salle_id, parametre)
+        if self.fraicheur is not None:
+            etat.expirer(mesure['date_update'] - timedelta(seconds=self.fraicheur))
+        moyenne = etat.mettre_a_jour(mesure['capteur_id'], float(mesure['valeur']), mesure['date_update'])
+        return self._evaluer(salle_id, parametre, etat, moyenne, mesure['date_update'])
+
+    def _evaluer(self, salle_id, parametre, etat, moyenne, date):
+        seuils = self.get_seuils().get(salle_id)
+        basse = haute = None
+        if seuils is not None:
+            basse = float(seuils[f'{parametre}_basse']) if seuils[f'{parametre}_basse'] is not None else None
+            haute = float(seuils[f'{parametre}_haute']) if seuils[f'{parametre}_haute'] is not None else None
+
+        if not etat.alerte:
+            if haute is not None and moyenne > haute:
+                sens = 'haute'
+            elif basse is not None and moyenne < basse:
+                sens = 'basse'
+            else:
+                etat.debut_depassement = None
+                return None
+
+            if etat.debut_depassement is None or etat.sens != sens:
+                etat.debut_depassement = date
+                etat.sens = sens
+            if (date - etat.debut_depassement).total_seconds() < self.duree_min:
+                return None
+
+            etat.alerte = True
+            etat.date_debut = etat.debut_depassement
+            etat.debut_retour = None
+            return self._evenement('declenchement', salle_id, parametre, etat, moyenne,
+                                   haute if sens == 'haute' else basse, date)
+
+        seuil = haute if etat.sens == 'haute' else basse
+        if seuil is None:
+            revenu = True
+        elif etat.sens == 'haute':
+            revenu = moyenne <= seuil - HYSTERESIS[parametre]
+        else:
+            revenu = moyenne >= seuil + HYSTERESIS[parametre]
+
+        if not revenu:
+            etat.debut_retour = None
+            return None
+
+        if etat.debut_retour is None:
+            etat.debut_retour = date
+        if (date - etat.debut_retour).total_seconds() < self.duree_min:
+            return None
+
+        evenement = self._evenement('fin', salle_id, parametre, etat, moyenne, seuil, date)
+        etat.alerte = False
+        etat.debut_depassement = None
+        etat.debut_retour = None
+        return evenement
+
+    def _evenement(self, evenement, salle_id, parametre, etat, moyenne, seuil, date):
+        return {
+            'salle_id': salle_id,
+            'parametre': parametre,
+            'evenement': evenement,
+            'sens': etat.sens,
+            'valeur': round(moyenne, 2),
+            'seuil': seuil,
+            'date_debut': etat.date_debut,
+            'date_evenement': date
+        }
+
+    def changement_conformite(self, evenement):
+        """
+        Statut de la salle après un événement d'alerte : NON_CONFORME à sa première
+        alerte en cours, CONFORME quand la dernière prend fin
+
+        Returns:
+            dict: Changement de conformité de la salle, None si son statut ne change pas
+        """
+        salle_id = evenement['salle_id']
+        avant = self._nb_alertes.get(salle_id, 0)
+        apres = avant + (1 if evenement['evenement'] == 'declenchement' else -1)
+        self._nb_alertes[salle_id] = max(apres, 0)
+        if (avant == 0) == (apres <= 0):
+            return None
+
+        return {
+            'salle_id': salle_id,
+            'statut': 'NON_CONFORME' if apres > 0 else 'CONFORME',
+            'alertes': [
+                {'parametre': parametre, 'sens': etat.sens, 'date_debut': etat.date_debut}
+                for parametre in HYSTERESIS
+                for etat in (self._etats.get((salle_id, parametre)),)
+                if etat is not None and etat.alerte
+            ],
+            'evenement': evenement,
+            'date': evenement['date_evenement']
+        }
+
+    def executer(self):
+        """
+        Évaluer les mesures arrivées depuis la dernière exécution et enregistrer les
+        déclenchements et fins d'alertes, avec les notifications des salles dont la
+        conformité a changé (même transaction, une par lot de mesures lu)
+
+        Returns:
+            list: Événements d'alerte enregistrés
+        """
+        try:
+            evenements = []
+            self.rafraichir_capteurs()
+            while True:
+                evenements.extend(self._executer_lot())
+                if not self.suivi.en_retard:
+                    return evenements
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'évaluation des alertes: {str(e)}")
+
+    def _executer_lot(self):
+        """
+        Évaluer un lot de mesures. Si l'enregistrement échoue, l'état en mémoire et la
+        position de lecture reviennent à ceux d'avant le lot : ses mesures seront
+        réévaluées à l'exécution suivante, sans événement perdu ni état divergent.
+        """
+        sauvegarde = (
+            self.suivi.position(),
+            copy.deepcopy((self._etats, self._salles_capteurs, self._nb_alertes))
+        )
+        evenements = []
+        notifications = []
+        try:
+            for mesure in self.suivi.nouvelles_mesures():
+                evenement = self.traiter_mesure(mesure)
+                if evenement is None:
+                    continue
+                evenements.append(evenement)
+                changement = self.changement_conformite(evenement)
+                if changement is not None:
+                    notifications.extend(notification_service.lignes_outbox('conformite', changement))
+
+            if evenements:
+                execute_many([(INSERT_ALERTE_QUERY, evenements), (INSERT_NOTIFICATION_QUERY, notifications)])
+        except Exception:
+            position, (self._etats, self._salles_capteurs, self._nb_alertes) = sauvegarde
+            self.suivi.restaurer(position)
+            raise
+
+        if notifications:
+            notification_service.reveiller()
+        return evenements
+
+    def get_alertes(self, salle_id=None, parametre=None, actives=False, depuis=None, limit=100):
+        """
+        Récupérer les événements d'alerte, du plus récent au plus ancien
+
+        Args:
+            salle_id (int): Filtrer sur une salle
+            parametre (str): Filtrer sur 'temperature', 'humidite' ou 'pression'
+            actives (bool): Seulement les déclenchements sans fin enregistrée
+            depuis (datetime): Événements postérieurs à cette date
+            limit (int): Nombre maximum d'événements
+
+        Returns:
+            list: Événements d'alerte avec le nom de la salle
+        """
+        try:
+            conditions = []
+            params = []
+            if salle_id is not None:
+                conditions.append("a.salle_id = %s")
+                params.append(salle_id)
+            if parametre is not None:
+                conditions.append("a.parametre = %s")
+                params.append(parametre)
+            if actives:
+                conditions.append(CONDITION_ALERTE_ACTIVE)
+            if depuis is not None:
+                conditions.append("a.date_evenement >= %s")
+                params.append(depuis)
+
+            query = """
+                SELECT a.*, s.nom as salle_nom
+                FROM alerte a
+                LEFT JOIN salle s ON s.id = a.salle_id
+            """
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY a.id DESC LIMIT %s"
+            params.append(limit)
+
+            return execute_query(query, tuple(params))
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des alertes: {str(e)}")
+
+alerte_service = AlerteService(
+    duree_min=float(os.getenv('ALERTE_DUREE_MIN', 120)),
+    ttl_seuils=float(os.getenv('ALERTE_SEUILS_TTL', 60)),
+    fraicheur=float(os.getenv('ALERTE_FRAICHEUR', 900))
+)
+
+# Un seul processus à la fois : l'état des alertes est en mémoire, relu depuis la table
+# par le worker qui prend le verrou
+job = JobArrierePlan(
+    'alertes',
+    alerte_service.executer,
+    intervalle=lambda: float(os.getenv('ALERTES_INTERVAL', 5)),
+    activation='ALERTES_JOB_ENABLED',
+    verrou='climhetic_alertes',
+    initialiser=alerte_service.reinitialiser
+)
+
+
+if __name__ == '__main__':
+    alerte_service.installer()
+    print("Table des alertes créée")
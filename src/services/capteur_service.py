@@ -1,6 +1,71 @@
-from app.queries import execute_query, execute_single_query
+from app.cache import cache_service, enregistrer_prechauffage
+from app.queries import execute_query, execute_single_query, preparer_requete
+from app.database import stream_query
+from app.versions import data_versions
+from services.rollup_service import rollup_service
+from services.downsampling import moyenne_par_intervalle, lttb
 from typing import Dict, Any
 
+# Moyenne spatiale des dernières mesures, lue dans capteur_derniere_mesure
+# (une ligne par capteur) plutôt que dans l'historique complet des mesures
+MOYENNES_DERNIERES_DONNEES_QUERY = """
+                SELECT
+                    s.id as salle_id,
+                    s.nom as salle_nom,
+                    s.batiment,
+                    s.etage,
+                    AVG(CASE WHEN d.type = 'temperature' THEN d.valeur END) as moyenne_temperature,
+                    AVG(CASE WHEN d.type = 'humidite' THEN d.valeur END) as moyenne_humidite,
+                    AVG(CASE WHEN d.type = 'pression' THEN d.valeur END) as moyenne_pression,
+                    MAX(CASE WHEN d.type = 'temperature' THEN d.unite END) as unite_temperature,
+                    MAX(CASE WHEN d.type = 'humidite' THEN d.unite END) as unite_humidite,
+                    MAX(CASE WHEN d.type = 'pression' THEN d.unite END) as unite_pression,
+                    COUNT(DISTINCT CASE WHEN d.type = 'temperature' THEN d.capteur_id END) as nb_capteurs_temperature,
+                    COUNT(DISTINCT CASE WHEN d.type = 'humidite' THEN d.capteur_id END) as nb_capteurs_humidite,
+                    COUNT(DISTINCT CASE WHEN d.type = 'pression' THEN d.capteur_id END) as nb_capteurs_pression,
+                    GREATEST(
+                        COALESCE(MAX(CASE WHEN d.type = 'temperature' THEN d.date_update END), '1900-01-01'),
+                        COALESCE(MAX(CASE WHEN d.type = 'humidite' THEN d.date_update END), '1900-01-01'),
+                        COALESCE(MAX(CASE WHEN d.type = 'pression' THEN d.date_update END), '1900-01-01')
+                    ) as derniere_mesure_date
+                FROM salle s
+                LEFT JOIN capteur c ON c.id_salle = s.id AND c.is_active = TRUE
+                LEFT JOIN capteur_derniere_mesure d ON d.capteur_id = c.id
+                    AND d.type = c.type_capteur
+                    AND d.date_update >= c.date_installation
+"""
+
+# Dernières mesures de plusieurs capteurs en une requête par table : rang de chaque
+# mesure dans l'historique de son capteur (fonction de fenêtre), les limit premières gardées
+DERNIERES_DONNEES_CAPTEURS_QUERY = """
+                SELECT capteur_id, valeur, unite, date_update
+                FROM (
+                    SELECT
+                        m.capteur_id,
+                        m.valeur,
+                        m.unite,
+                        m.date_update,
+                        ROW_NUMBER() OVER (PARTITION BY m.capteur_id ORDER BY m.date_update DESC) as rang
+                    FROM {type_mesure} m
+                    JOIN capteur c ON c.id = m.capteur_id
+                    WHERE m.capteur_id IN ({ids}) AND m.date_update >= c.date_installation
+                ) derniers
+                WHERE rang <= %s
+                ORDER BY capteur_id, date_update DESC
+"""
+
+def liste_parametres(ids):
+    """
+    Marqueurs %s d'une clause IN et paramètres associés. La liste est complétée jusqu'à la
+    puissance de deux suivante (en répétant le dernier ID) : quelques formes de requête
+    seulement pour le cache des requêtes compilées, quel que soit le nombre d'IDs.
+    """
+    taille = 1
+    while taille < len(ids):
+        taille *= 2
+    params = list(ids) + [ids[-1]] * (taille - len(ids))
+    return ', '.join(['%s'] * taille), params
+
 class CapteurService:
     
     def get_moyennes_dernieres_donnees_by_salle(self, salle_id, limit=10):
@@ -17,63 +82,7 @@ class CapteurService:
             dict: Moyennes des données ou None si aucune donnée
         """
         try:
-            query = """
-                SELECT
-                    s.id as salle_id,
-                    s.nom as salle_nom,
-                    s.batiment,
-                    s.etage,
-                    AVG(derniere_temp.valeur) as moyenne_temperature,
-                    AVG(derniere_hum.valeur) as moyenne_humidite,
-                    AVG(derniere_press.valeur) as moyenne_pression,
-                    MAX(derniere_temp.unite) as unite_temperature,
-                    MAX(derniere_hum.unite) as unite_humidite,
-                    MAX(derniere_press.unite) as unite_pression,
-                    COUNT(DISTINCT derniere_temp.capteur_id) as nb_capteurs_temperature,
-                    COUNT(DISTINCT derniere_hum.capteur_id) as nb_capteurs_humidite,
-                    COUNT(DISTINCT derniere_press.capteur_id) as nb_capteurs_pression,
-                    GREATEST(
-                        COALESCE(MAX(derniere_temp.date_update), '1900-01-01'),
-                        COALESCE(MAX(derniere_hum.date_update), '1900-01-01'),
-                        COALESCE(MAX(derniere_press.date_update), '1900-01-01')
-                    ) as derniere_mesure_date
-                FROM salle s
-                LEFT JOIN (
-                    SELECT DISTINCT
-                        c.id as capteur_id,
-                        c.id_salle,
-                        FIRST_VALUE(t.valeur) OVER (PARTITION BY c.id ORDER BY t.date_update DESC) as valeur,
-                        FIRST_VALUE(t.unite) OVER (PARTITION BY c.id ORDER BY t.date_update DESC) as unite,
-                        FIRST_VALUE(t.date_update) OVER (PARTITION BY c.id ORDER BY t.date_update DESC) as date_update
-                    FROM capteur c
-                    JOIN temperature t ON c.id = t.capteur_id
-                    WHERE c.type_capteur = 'temperature' AND c.is_active = TRUE
-                        AND t.date_update >= c.date_installation
-                ) derniere_temp ON s.id = derniere_temp.id_salle
-                LEFT JOIN (
-                    SELECT DISTINCT
-                        c.id as capteur_id,
-                        c.id_salle,
-                        FIRST_VALUE(h.valeur) OVER (PARTITION BY c.id ORDER BY h.date_update DESC) as valeur,
-                        FIRST_VALUE(h.unite) OVER (PARTITION BY c.id ORDER BY h.date_update DESC) as unite,
-                        FIRST_VALUE(h.date_update) OVER (PARTITION BY c.id ORDER BY h.date_update DESC) as date_update
-                    FROM capteur c
-                    JOIN humidite h ON c.id = h.capteur_id
-                    WHERE c.type_capteur = 'humidite' AND c.is_active = TRUE
-                        AND h.date_update >= c.date_installation
-                ) derniere_hum ON s.id = derniere_hum.id_salle
-                LEFT JOIN (
-                    SELECT DISTINCT
-                        c.id as capteur_id,
-                        c.id_salle,
-                        FIRST_VALUE(p.valeur) OVER (PARTITION BY c.id ORDER BY p.date_update DESC) as valeur,
-                        FIRST_VALUE(p.unite) OVER (PARTITION BY c.id ORDER BY p.date_update DESC) as unite,
-                        FIRST_VALUE(p.date_update) OVER (PARTITION BY c.id ORDER BY p.date_update DESC) as date_update
-                    FROM capteur c
-                    JOIN pression p ON c.id = p.capteur_id
-                    WHERE c.type_capteur = 'pression' AND c.is_active = TRUE
-                        AND p.date_update >= c.date_installation
-                ) derniere_press ON s.id = derniere_press.id_salle
+            query = MOYENNES_DERNIERES_DONNEES_QUERY + """
                 WHERE s.id = %s AND s.etat = 'active'
                 GROUP BY s.id, s.nom, s.batiment, s.etage
             """
@@ -152,13 +161,74 @@ class CapteurService:
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération des données du capteur {capteur_id}: {str(e)}")
 
-    def get_temperature_by_salle(self, salle_id, limit=10):
+    def get_dernieres_donnees_by_capteurs(self, capteur_ids, limit=1):
+        """
+        Récupérer les dernières données de plusieurs capteurs : une requête pour les
+        capteurs, puis une seule requête pour les mesures (capteur_derniere_mesure) si
+        limit vaut 1, sinon une par table de mesures concernée
+
+        Args:
+            capteur_ids (list): IDs des capteurs
+            limit (int): Nombre de dernières mesures à récupérer par capteur
+
+        Returns:
+            list: Informations et données de chaque capteur actif trouvé, dans l'ordre des IDs
+        """
+        try:
+            if not capteur_ids:
+                return []
+
+            marqueurs, params = liste_parametres(capteur_ids)
+            capteur_query = f"""
+                SELECT c.*, s.nom as salle_nom, s.batiment, s.etage
+                FROM capteur c
+                LEFT JOIN salle s ON c.id_salle = s.id
+                WHERE c.id IN ({marqueurs}) AND c.is_active = TRUE
+            """
+            capteurs = {capteur['id']: capteur for capteur in execute_query(capteur_query, params)}
+            if not capteurs:
+                return []
+
+            donnees = {capteur_id: [] for capteur_id in capteurs}
+            if limit == 1:
+                marqueurs, params = liste_parametres(list(capteurs))
+                derniere_query = f"""
+                    SELECT d.capteur_id, d.valeur, d.unite, d.date_update
+                    FROM capteur_derniere_mesure d
+                    JOIN capteur c ON c.id = d.capteur_id AND d.type = c.type_capteur
+                    WHERE d.capteur_id IN ({marqueurs}) AND d.date_update >= c.date_installation
+                """
+                mesures = execute_query(derniere_query, params)
+            else:
+                mesures = []
+                for type_mesure in ('temperature', 'humidite', 'pression'):
+                    ids_type = [i for i, capteur in capteurs.items() if capteur.get('type_capteur') == type_mesure]
+                    if not ids_type:
+                        continue
+                    marqueurs, params = liste_parametres(ids_type)
+                    query = DERNIERES_DONNEES_CAPTEURS_QUERY.format(type_mesure=type_mesure, ids=marqueurs)
+                    mesures.extend(execute_query(query, params + [limit]))
+
+            for mesure in mesures:
+                donnees[mesure.pop('capteur_id')].append(mesure)
+
+            return [
+                {'capteur': capteurs[capteur_id], 'donnees': donnees[capteur_id]}
+                for capteur_id in dict.fromkeys(capteur_ids) if capteur_id in capteurs
+            ]
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des données des capteurs: {str(e)}")
+
+    def get_temperature_by_salle(self, salle_id, limit=10, tabulaire=False, flux=False):
         """
         Récupérer les données de température d'une salle
         
         Args:
             salle_id (int): ID de la salle
             limit (int): Nombre de mesures à récupérer
+            tabulaire (bool): Renvoyer un Resultat (colonnes + lignes) au lieu d'une liste de dicts
+            flux (bool): Renvoyer un générateur de Resultat lus par lots sur un curseur côté serveur
             
         Returns:
             list: Liste des températures
@@ -182,18 +252,22 @@ class CapteurService:
                 LIMIT %s
             """
             
-            return execute_query(query, (salle_id, limit))
+            if flux:
+                return stream_query(*preparer_requete(query, (salle_id, limit)))
+            return execute_query(query, (salle_id, limit), tabulaire=tabulaire)
             
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération de la température pour la salle {salle_id}: {str(e)}")
 
-    def get_humidite_by_salle(self, salle_id, limit=10):
+    def get_humidite_by_salle(self, salle_id, limit=10, tabulaire=False, flux=False):
         """
         Récupérer les données d'humidité d'une salle
         
         Args:
             salle_id (int): ID de la salle
             limit (int): Nombre de mesures à récupérer
+            tabulaire (bool): Renvoyer un Resultat (colonnes + lignes) au lieu d'une liste de dicts
+            flux (bool): Renvoyer un générateur de Resultat lus par lots sur un curseur côté serveur
             
         Returns:
             list: Liste des humidités
@@ -217,18 +291,22 @@ class CapteurService:
                 LIMIT %s
             """
             
-            return execute_query(query, (salle_id, limit))
+            if flux:
+                return stream_query(*preparer_requete(query, (salle_id, limit)))
+            return execute_query(query, (salle_id, limit), tabulaire=tabulaire)
             
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération de l'humidité pour la salle {salle_id}: {str(e)}")
 
-    def get_pression_by_salle(self, salle_id, limit=10):
+    def get_pression_by_salle(self, salle_id, limit=10, tabulaire=False, flux=False):
         """
         Récupérer les données de pression d'une salle
         
         Args:
             salle_id (int): ID de la salle
             limit (int): Nombre de mesures à récupérer
+            tabulaire (bool): Renvoyer un Resultat (colonnes + lignes) au lieu d'une liste de dicts
+            flux (bool): Renvoyer un générateur de Resultat lus par lots sur un curseur côté serveur
             
         Returns:
             list: Liste des pressions
@@ -252,18 +330,22 @@ class CapteurService:
                 LIMIT %s
             """
             
-            return execute_query(query, (salle_id, limit))
+            if flux:
+                return stream_query(*preparer_requete(query, (salle_id, limit)))
+            return execute_query(query, (salle_id, limit), tabulaire=tabulaire)
             
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération de la pression pour la salle {salle_id}: {str(e)}")
  
-    def get_temperature_by_capteur(self, capteur_id, limit=10):
+    def get_temperature_by_capteur(self, capteur_id, limit=10, tabulaire=False, flux=False):
         """
         Récupérer les données de température d'un capteur spécifique
         
         Args:
             capteur_id (int): ID du capteur
             limit (int): Nombre de mesures à récupérer
+            tabulaire (bool): Renvoyer un Resultat (colonnes + lignes) au lieu d'une liste de dicts
+            flux (bool): Renvoyer un générateur de Resultat lus par lots sur un curseur côté serveur
             
         Returns:
             list: Liste des températures
@@ -286,11 +368,46 @@ class CapteurService:
                 LIMIT %s
             """
             
-            return execute_query(query, (capteur_id, limit))
+            if flux:
+                return stream_query(*preparer_requete(query, (capteur_id, limit)))
+            return execute_query(query, (capteur_id, limit), tabulaire=tabulaire)
             
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération de la température pour le capteur {capteur_id}: {str(e)}")
 
+    def get_historique(self, type_mesure, debut, fin, max_points=500, methode='moyenne', salle_id=None, capteur_id=None):
+        """
+        Récupérer l'historique d'une salle ou d'un capteur sur une période,
+        réduit côté serveur à au plus max_points points
+        
+        Args:
+            type_mesure (str): 'temperature', 'humidite' ou 'pression'
+            debut (datetime): Début de la période
+            fin (datetime): Fin de la période
+            max_points (int): Nombre maximal de points renvoyés
+            methode (str): 'moyenne' (moyenne par intervalle) ou 'lttb'
+            salle_id (int): ID de la salle
+            capteur_id (int): ID du capteur (prioritaire sur salle_id)
+            
+        Returns:
+            list: Points (date_update, nb_mesures, valeur_min, valeur_max, valeur_moyenne)
+        """
+        try:
+            resolution = max(int((fin - debut).total_seconds() / max_points), 1)
+            
+            points = rollup_service.get_agregats(
+                type_mesure, debut, fin, resolution,
+                capteur_id=capteur_id, salle_id=salle_id
+            )
+            
+            if methode == 'lttb':
+                return lttb(points, max_points)
+            return list(moyenne_par_intervalle(points, debut, fin, max_points))
+            
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération de l'historique {type_mesure}: {str(e)}")
+
+    @cache_service(300, 'salle', obsolescence_max=300)
     def get_salles_actives(self):
         """
         Récupérer la liste des salles actives
@@ -340,13 +457,129 @@ class CapteurService:
         except Exception as e:
             raise Exception(f"Erreur lors de la récupération des capteurs pour la salle {salle_id}: {str(e)}")
 
+    def get_moyennes_salles(self, salle_ids=None, batiments=None):
+        """
+        Récupérer en une seule requête groupée les moyennes des dernières mesures de
+        plusieurs salles actives, au même format que get_moyennes_dernieres_donnees_by_salle
+
+        Args:
+            salle_ids (list): IDs des salles, None pour ne pas filtrer
+            batiments (list): Bâtiments des salles, None pour ne pas filtrer
+
+        Returns:
+            list: Moyennes de chaque salle trouvée, triées par ID de salle
+        """
+        try:
+            conditions = ["s.etat = 'active'"]
+            params = []
+            if salle_ids:
+                marqueurs, ids = liste_parametres(salle_ids)
+                conditions.append(f"s.id IN ({marqueurs})")
+                params.extend(ids)
+            if batiments:
+                marqueurs, valeurs = liste_parametres(batiments)
+                conditions.append(f"s.batiment IN ({marqueurs})")
+                params.extend(valeurs)
+
+            query = MOYENNES_DERNIERES_DONNEES_QUERY + f"""
+                WHERE {' AND '.join(conditions)}
+                GROUP BY s.id, s.nom, s.batiment, s.etage
+                ORDER BY s.id
+            """
+
+            return execute_query(query, params or None)
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des moyennes des salles: {str(e)}")
+
+    def _signaler_seuils(self, seuils):
+        """
+        Incrémenter la version 'conformite' quand les seuils lus diffèrent de la lecture précédente
+        Les seuils sont écrits hors de l'API : chaque lecture (moteur d'alertes, flux temps réel,
+        recalcul de la conformité) sert de détection et invalide les caches de tous les workers
+        """
+        empreinte = repr(sorted((salle_id, sorted(seuil.items())) for salle_id, seuil in seuils.items()))
+        precedente = getattr(self, '_empreinte_seuils', None)
+        self._empreinte_seuils = empreinte
+        if precedente is not None and precedente != empreinte:
+            data_versions.incrementer('conformite')
+
+    def get_seuils_conformite_salles(self):
+        """
+        Récupérer en une seule requête les seuils de conformité actifs de toutes les salles
+        Seul le seuil le plus récent (date_debut) est conservé pour chaque salle
+        
+        Returns:
+            dict: Seuils de conformité indexés par ID de salle
+        """
+        try:
+            query = """
+                SELECT 
+                    id,
+                    salle_id,
+                    temperature_haute,
+                    temperature_basse,
+                    humidite_haute,
+                    humidite_basse,
+                    pression_haute,
+                    pression_basse,
+                    date_debut,
+                    date_fin
+                FROM conformite
+                WHERE date_fin IS NULL OR date_fin > NOW()
+                ORDER BY salle_id, date_debut DESC
+            """
+            
+            seuils = {}
+            for conformite in execute_query(query):
+                seuils.setdefault(conformite['salle_id'], conformite)
+            self._signaler_seuils(seuils)
+            return seuils
+            
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des seuils de conformité: {str(e)}")
+
+    def get_capteurs_salles_actives(self):
+        """
+        Récupérer en une seule requête les capteurs actifs de toutes les salles actives
+        
+        Returns:
+            dict: Listes de capteurs indexées par ID de salle
+        """
+        try:
+            query = """
+                SELECT 
+                    c.id,
+                    c.nom,
+                    c.type_capteur,
+                    c.date_installation,
+                    s.nom as salle_nom,
+                    c.id_salle
+                FROM capteur c
+                JOIN salle s ON c.id_salle = s.id
+                WHERE c.is_active = TRUE AND s.etat = 'active'
+                ORDER BY c.id_salle, c.type_capteur, c.nom
+            """
+            
+            capteurs = {}
+            for capteur in execute_query(query):
+                salle_id = capteur.pop('id_salle')
+                capteurs.setdefault(salle_id, []).append(capteur)
+            return capteurs
+            
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des capteurs des salles: {str(e)}")
+
+    @cache_service(10, 'salle', 'capteur', 'conformite', obsolescence_max=60)
     def verifier_conformite_salles(self, limit=10):
         """
         Vérifier la conformité de toutes les salles actives
         Calcule les moyennes et compare avec les seuils de conformité
+        Les moyennes, seuils et capteurs sont chargés pour toutes les salles
+        en un nombre fixe de requêtes, quel que soit le nombre de salles
         
         Args:
-            limit (int): Nombre de dernières mesures pour calculer la moyenne
+            limit (int): Paramètre non utilisé (conservé pour compatibilité)
             
         Returns:
             list: Liste des salles avec leur statut de conformité
@@ -357,12 +590,16 @@ class CapteurService:
             if not salles:
                 return []
             
+            moyennes_par_salle = {moyennes['salle_id']: moyennes for moyennes in self.get_moyennes_salles()}
+            seuils_par_salle = self.get_seuils_conformite_salles()
+            capteurs_par_salle = self.get_capteurs_salles_actives()
+            
             resultats = []
             
             for salle in salles:
                 salle_id = salle['id']
                 
-                moyennes = self.get_moyennes_dernieres_donnees_by_salle(salle_id, limit)
+                moyennes = moyennes_par_salle.get(salle_id)
                 
                 if not moyennes:
                     resultats.append({
@@ -374,12 +611,10 @@ class CapteurService:
                     })
                     continue
                 
-                conformite = self.get_seuils_conformite_by_salle(salle_id)
+                conformite = seuils_par_salle.get(salle_id)
+                capteurs = capteurs_par_salle.get(salle_id, [])
                 
                 if not conformite:
-                    # Récupérer les capteurs même sans seuils
-                    capteurs = self.get_capteurs_by_salle(salle_id)
-                    
                     resultats.append({
                         'salle': salle,
                         'moyennes': moyennes,
@@ -392,9 +627,6 @@ class CapteurService:
                 
                 verification = self.verifier_seuils(moyennes, conformite)
                 
-                # Récupérer les capteurs de la salle
-                capteurs = self.get_capteurs_by_salle(salle_id)
-                
                 resultats.append({
                     'salle': salle,
                     'moyennes': moyennes,
@@ -564,4 +796,7 @@ class CapteurService:
         }
 
 
-capteur_service = CapteurService() 
\ No newline at end of file
+capteur_service = CapteurService() 
+
+enregistrer_prechauffage('conformite', capteur_service.verifier_conformite_salles)
+enregistrer_prechauffage('salles', capteur_service.get_salles_actives)
\ No newline at end of file
@@ -0,0 +1,157 @@
+from app.database import engine
+from sqlalchemy import text
+
+TYPES_MESURES = ['temperature', 'humidite', 'pression']
+
+CREATE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS capteur_derniere_mesure (
+        capteur_id INT NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        valeur DECIMAL(10, 2),
+        unite VARCHAR(16),
+        date_update DATETIME NOT NULL,
+        PRIMARY KEY (capteur_id, type)
+    )
+"""
+
+# Une mesure plus ancienne que celle déjà stockée ne doit jamais l'écraser.
+# date_update est assignée en dernier : MariaDB évalue les affectations dans l'ordre.
+UPSERT_QUERY = """
+    INSERT INTO capteur_derniere_mesure (capteur_id, type, valeur, unite, date_update)
+    VALUES ({capteur_id}, '{type_mesure}', {valeur}, {unite}, {date_update})
+    ON DUPLICATE KEY UPDATE
+        valeur = IF(VALUES(date_update) >= date_update, VALUES(valeur), valeur),
+        unite = IF(VALUES(date_update) >= date_update, VALUES(unite), unite),
+        date_update = GREATEST(date_update, VALUES(date_update))
+"""
+
+CREATE_TRIGGER_QUERY = """
+    CREATE TRIGGER IF NOT EXISTS trg_{type_mesure}_derniere_mesure
+    AFTER INSERT ON {type_mesure}
+    FOR EACH ROW
+""" + UPSERT_QUERY.format(
+    capteur_id='NEW.capteur_id',
+    type_mesure='{type_mesure}',
+    valeur='NEW.valeur',
+    unite='NEW.unite',
+    date_update='NEW.date_update'
+)
+
+# Journal de toutes les mesures insérées, dans l'ordre d'insertion (id), lu par les
+# consommateurs en continu (flux temps réel, moteur d'alertes) et purgé par ancienneté
+CREATE_FLUX_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS mesure_flux (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        capteur_id INT NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        valeur DECIMAL(10, 2),
+        unite VARCHAR(16),
+        date_update DATETIME NOT NULL,
+        date_creation TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_mesure_flux_date_creation (date_creation)
+    )
+"""
+
+CREATE_FLUX_TRIGGER_QUERY = """
+    CREATE TRIGGER IF NOT EXISTS trg_{type_mesure}_flux
+    AFTER INSERT ON {type_mesure}
+    FOR EACH ROW
+    INSERT INTO mesure_flux (capteur_id, type, valeur, unite, date_update)
+    VALUES (NEW.capteur_id, '{type_mesure}', NEW.valeur, NEW.unite, NEW.date_update)
+"""
+
+PURGE_FLUX_QUERY = """
+    DELETE FROM mesure_flux
+    WHERE date_creation < NOW() - INTERVAL :retention SECOND
+    LIMIT :limite
+"""
+
+RECONSTRUIRE_QUERY = """
+    INSERT INTO capteur_derniere_mesure (capteur_id, type, valeur, unite, date_update)
+    SELECT m.capteur_id, '{type_mesure}', m.valeur, m.unite, m.date_update
+    FROM {type_mesure} m
+    JOIN (
+        SELECT capteur_id, MAX(date_update) as date_update
+        FROM {type_mesure}
+        GROUP BY capteur_id
+    ) derniere ON derniere.capteur_id = m.capteur_id AND derniere.date_update = m.date_update
+    ON DUPLICATE KEY UPDATE
+        valeur = VALUES(valeur),
+        unite = VALUES(unite),
+        date_update = VALUES(date_update)
+"""
+
+
+class DerniereMesureService:
+    """
+    Table matérialisée capteur_derniere_mesure : dernière mesure de chaque capteur.
+    Elle est maintenue par des triggers AFTER INSERT sur les tables de mesures,
+    ce qui couvre aussi les écritures faites hors de l'API, et peut être
+    reconstruite à partir de l'historique.
+
+    Les mêmes tables alimentent par trigger le journal mesure_flux, qui garde chaque
+    mesure insérée (et non la seule dernière) pendant une durée de rétention.
+    """
+
+    def installer(self):
+        """
+        Créer les tables capteur_derniere_mesure et mesure_flux et les triggers qui les maintiennent
+
+        Returns:
+            bool: True si succès
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(CREATE_TABLE_QUERY))
+                conn.execute(text(CREATE_FLUX_TABLE_QUERY))
+                for type_mesure in TYPES_MESURES:
+                    conn.execute(text(CREATE_TRIGGER_QUERY.format(type_mesure=type_mesure)))
+                    conn.execute(text(CREATE_FLUX_TRIGGER_QUERY.format(type_mesure=type_mesure)))
+            return True
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'installation de capteur_derniere_mesure: {str(e)}")
+
+    def reconstruire(self):
+        """
+        Reconstruire capteur_derniere_mesure à partir de l'historique des mesures
+
+        Returns:
+            int: Nombre de capteurs présents dans la table après reconstruction
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM capteur_derniere_mesure"))
+                for type_mesure in TYPES_MESURES:
+                    conn.execute(text(RECONSTRUIRE_QUERY.format(type_mesure=type_mesure)))
+                return conn.execute(text("SELECT COUNT(*) FROM capteur_derniere_mesure")).scalar()
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la reconstruction de capteur_derniere_mesure: {str(e)}")
+
+    def purger_flux(self, retention=3600, limite=10000):
+        """
+        Supprimer du journal mesure_flux les mesures insérées depuis plus de retention secondes
+
+        Args:
+            retention (int): Âge minimal des lignes supprimées, en secondes
+            limite (int): Nombre maximal de lignes supprimées par appel
+
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        try:
+            with engine.begin() as conn:
+                return conn.execute(text(PURGE_FLUX_QUERY), {'retention': retention, 'limite': limite}).rowcount
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la purge de mesure_flux: {str(e)}")
+
+
+derniere_mesure_service = DerniereMesureService()
+
+
+if __name__ == '__main__':
+    derniere_mesure_service.installer()
+    nb_capteurs = derniere_mesure_service.reconstruire()
+    print(f"capteur_derniere_mesure reconstruite : {nb_capteurs} capteur(s)")
@@ -0,0 +1,117 @@
+"""
+Réduction du nombre de points d'un historique avant envoi au front.
+
+Les points sont des dicts avec date_update, nb_mesures, valeur_min,
+valeur_max et valeur_moyenne, tels que renvoyés par rollup_service.get_agregats.
+"""
+
+
+def _valeur(point):
+    valeur = point.get('valeur_moyenne')
+    return float(valeur) if valeur is not None else None
+
+
+def moyenne_par_intervalle(points, debut, fin, max_points):
+    """
+    Regrouper les points en au plus max_points intervalles de même durée.
+    Les points sont parcourus une seule fois, dans l'ordre chronologique,
+    et seul l'intervalle en cours est gardé en mémoire.
+
+    Args:
+        points (iterable): Points triés par date_update
+        debut (datetime): Début de la période
+        fin (datetime): Fin de la période
+        max_points (int): Nombre maximal de points renvoyés
+
+    Yields:
+        dict: Point moyen (pondéré par nb_mesures) de chaque intervalle non vide
+    """
+    duree = max((fin - debut).total_seconds() / max_points, 1)
+    courant = None
+    index_courant = None
+
+    for point in points:
+        valeur = _valeur(point)
+        if valeur is None:
+            continue
+
+        index = min(int((point['date_update'] - debut).total_seconds() // duree), max_points - 1)
+        nb = point.get('nb_mesures') or 1
+
+        if index != index_courant:
+            if courant is not None:
+                yield _finaliser(courant)
+            index_courant = index
+            courant = {
+                'date_update': point['date_update'],
+                'nb_mesures': 0,
+                'somme': 0.0,
+                'valeur_min': None,
+                'valeur_max': None
+            }
+
+        valeur_min = float(point['valeur_min']) if point.get('valeur_min') is not None else valeur
+        valeur_max = float(point['valeur_max']) if point.get('valeur_max') is not None else valeur
+        courant['nb_mesures'] += nb
+        courant['somme'] += valeur * nb
+        courant['valeur_min'] = valeur_min if courant['valeur_min'] is None else min(courant['valeur_min'], valeur_min)
+        courant['valeur_max'] = valeur_max if courant['valeur_max'] is None else max(courant['valeur_max'], valeur_max)
+
+    if courant is not None:
+        yield _finaliser(courant)
+
+
+def _finaliser(intervalle):
+    somme = intervalle.pop('somme')
+    intervalle['valeur_moyenne'] = somme / intervalle['nb_mesures']
+    return intervalle
+
+
+def lttb(points, max_points):
+    """
+    Largest-Triangle-Three-Buckets : conserver max_points points qui préservent
+    la forme visuelle de la courbe (pics et creux compris).
+
+    Args:
+        points (list): Points triés par date_update
+        max_points (int): Nombre maximal de points renvoyés (au moins 3)
+
+    Returns:
+        list: Points sélectionnés, premier et dernier point inclus
+    """
+    points = [p for p in points if _valeur(p) is not None]
+    total = len(points)
+
+    if max_points >= total or max_points < 3:
+        return points
+
+    x = [p['date_update'].timestamp() for p in points]
+    y = [_valeur(p) for p in points]
+
+    selection = [points[0]]
+    taille_bucket = (total - 2) / (max_points - 2)
+    a = 0
+
+    for i in range(max_points - 2):
+        debut_bucket = int(i * taille_bucket) + 1
+        fin_bucket = int((i + 1) * taille_bucket) + 1
+
+        debut_suivant = fin_bucket
+        fin_suivant = min(int((i + 2) * taille_bucket) + 1, total)
+        nb_suivant = fin_suivant - debut_suivant
+        x_moyen = sum(x[debut_suivant:fin_suivant]) / nb_suivant
+        y_moyen = sum(y[debut_suivant:fin_suivant]) / nb_suivant
+
+        aire_max = -1
+        choisi = debut_bucket
+        for j in range(debut_bucket, fin_bucket):
+            aire = abs((x[a] - x_moyen) * (y[j] - y[a]) - (x[a] - x[j]) * (y_moyen - y[a]))
+            if aire > aire_max:
+                aire_max = aire
+                choisi = j
+
+        selection.append(points[choisi])
+        a = choisi
+
+    selection.append(points[-1])
+    return selection
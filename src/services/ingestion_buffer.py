@@ -0,0 +1,226 @@
+import threading
+import time
+from sqlalchemy import exc
+
+# Erreurs qui ne dépendent pas des lignes écrites (connexion perdue, verrou, pool épuisé) :
+# le même lot est réessayé au flush suivant
+ERREURS_TRANSITOIRES = (exc.OperationalError, exc.TimeoutError)
+
+
+class BufferPleinError(Exception):
+    """Le buffer d'ingestion a atteint sa capacité : le client doit réessayer plus tard"""
+
+
+class IngestionBuffer:
+    """
+    Buffer d'écriture différée (write-behind) des mesures.
+    Les lignes sont accumulées par table puis écrites ensemble (group commit)
+    dès que taille_flush lignes sont en attente ou que delai_flush secondes
+    se sont écoulées depuis la première ligne en attente.
+    La mémoire est bornée par capacite : au-delà, ajouter() lève BufferPleinError.
+
+    Un lot en échec sur une erreur transitoire est remis en attente, au plus
+    max_tentatives fois. Sur toute autre erreur, il est réécrit par moitiés pour
+    isoler les lignes fautives, qui sont écartées (journalisées) avec les lots
+    qui ont épuisé leurs tentatives : une ligne invalide ne bloque pas le buffer.
+    """
+
+    def __init__(self, ecrire, taille_flush=5000, delai_flush=0.2, capacite=50000, max_tentatives=5):
+        """
+        Args:
+            ecrire (callable): Reçoit {type de mesure: [lignes]} et les écrit en une transaction
+            taille_flush (int): Nombre de lignes en attente qui déclenche un flush
+            delai_flush (float): Attente maximale d'une ligne avant flush, en secondes
+            capacite (int): Nombre maximal de lignes en attente ou en cours d'écriture
+            max_tentatives (int): Nombre d'échecs transitoires consécutifs avant d'écarter un lot
+        """
+        self.ecrire = ecrire
+        self.taille_flush = taille_flush
+        self.delai_flush = delai_flush
+        self.capacite = capacite
+        self.max_tentatives = max_tentatives
+
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._lignes = {}
+        self._nb_en_attente = 0
+        self._nb_en_cours = 0
+        self._premiere_ligne = None
+        self._tentatives = 0
+        self._nb_ecartees = 0
+        self._thread = None
+        self._arret = False
+
+    def ajouter(self, lignes):
+        """
+        Mettre des lignes en attente d'écriture
+
+        Args:
+            lignes (dict): Lignes à insérer indexées par type de mesure
+        """
+        nb = sum(len(l) for l in lignes.values())
+        if nb == 0:
+            return
+
+        with self._condition:
+            if self._nb_en_attente + self._nb_en_cours + nb > self.capacite:
+                raise BufferPleinError("Buffer d'ingestion plein, réessayez plus tard")
+
+            for type_mesure, lignes_type in lignes.items():
+                if lignes_type:
+                    self._lignes.setdefault(type_mesure, []).extend(lignes_type)
+            self._nb_en_attente += nb
+            if self._premiere_ligne is None:
+                self._premiere_ligne = time.monotonic()
+
+            self._demarrer()
+            self._condition.notify()
+
+    def flush(self):
+        """
+        Écrire immédiatement toutes les lignes en attente
+
+        Returns:
+            int: Nombre de lignes écrites
+        """
+        with self._flush_lock:
+            with self._condition:
+                lignes = self._lignes
+                nb = self._nb_en_attente
+                self._lignes = {}
+                self._nb_en_attente = 0
+                self._nb_en_cours = nb
+                self._premiere_ligne = None
+
+            if nb == 0:
+                return 0
+
+            try:
+                self.ecrire(lignes)
+                self._tentatives = 0
+                return nb
+            except ERREURS_TRANSITOIRES as e:
+                self._echec_transitoire(lignes, e)
+                raise
+            except Exception as e:
+                print(f"Erreur lors de l'écriture du buffer d'ingestion ({nb} mesures), isolement des lignes en erreur : {e}")
+                return self._ecrire_par_moities(lignes)
+            finally:
+                with self._condition:
+                    self._nb_en_cours = 0
+
+    def _ecrire_par_moities(self, lignes):
+        """
+        Écrire les lignes table par table, en coupant en deux chaque lot en erreur
+        jusqu'à isoler les lignes qui échouent seules, qui sont écartées.
+        Une erreur transitoire remet les lots restants en attente, avec la même
+        limite de tentatives qu'un flush.
+        """
+        a_ecrire = [(type_mesure, lignes_type) for type_mesure, lignes_type in lignes.items() if lignes_type]
+        ecrites = 0
+        while a_ecrire:
+            type_mesure, lot = a_ecrire.pop()
+            try:
+                self.ecrire({type_mesure: lot})
+                ecrites += len(lot)
+            except ERREURS_TRANSITOIRES as e:
+                a_ecrire.append((type_mesure, lot))
+                restantes = {}
+                for type_restant, lot_restant in a_ecrire:
+                    restantes.setdefault(type_restant, []).extend(lot_restant)
+                self._echec_transitoire(restantes, e)
+                raise
+            except Exception as e:
+                if len(lot) == 1:
+                    self._ecarter({type_mesure: lot}, e)
+                else:
+                    milieu = len(lot) // 2
+                    a_ecrire += [(type_mesure, lot[milieu:]), (type_mesure, lot[:milieu])]
+        self._tentatives = 0
+        return ecrites
+
+    def _echec_transitoire(self, lignes, erreur):
+        """Remettre les lignes en attente, ou les écarter après max_tentatives échecs consécutifs"""
+        nb = sum(len(l) for l in lignes.values())
+        self._tentatives += 1
+        print(f"Erreur lors de l'écriture du buffer d'ingestion ({nb} mesures, "
+              f"tentative {self._tentatives}/{self.max_tentatives}) : {erreur}")
+        if self._tentatives >= self.max_tentatives:
+            self._tentatives = 0
+            self._ecarter(lignes, erreur)
+        else:
+            self._remettre_en_attente(lignes)
+
+    def _ecarter(self, lignes, erreur):
+        nb = sum(len(l) for l in lignes.values())
+        with self._condition:
+            self._nb_ecartees += nb
+        detail = f" : {lignes}" if nb == 1 else ""
+        print(f"Buffer d'ingestion : {nb} mesure(s) écartée(s) ({erreur}){detail}")
+
+    def _remettre_en_attente(self, lignes):
+        with self._condition:
+            for type_mesure, lignes_type in lignes.items():
+                self._lignes[type_mesure] = lignes_type + self._lignes.get(type_mesure, [])
+            self._nb_en_attente += sum(len(l) for l in lignes.values())
+            if self._premiere_ligne is None:
+                self._premiere_ligne = time.monotonic()
+
+    def get_statut(self):
+        with self._condition:
+            return {
+                'en_attente': self._nb_en_attente,
+                'en_cours': self._nb_en_cours,
+                'capacite': self.capacite,
+                'ecartees': self._nb_ecartees,
+                'actif': self._thread is not None and self._thread.is_alive()
+            }
+
+    def _demarrer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._arret = False
+            self._thread = threading.Thread(target=self._boucle, name='ingestion-buffer', daemon=True)
+            self._thread.start()
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                while not self._arret and not self._doit_flusher():
+                    self._condition.wait(self._attente_restante())
+                if self._arret:
+                    return
+
+            try:
+                self.flush()
+            except Exception:
+                # Erreur transitoire : on laisse passer un délai avant de réessayer
+                time.sleep(self.delai_flush)
+
+    def _doit_flusher(self):
+        if self._nb_en_attente == 0:
+            return False
+        if self._nb_en_attente >= self.taille_flush:
+            return True
+        return time.monotonic() - self._premiere_ligne >= self.delai_flush
+
+    def _attente_restante(self):
+        if self._premiere_ligne is None:
+            return None
+        return max(self.delai_flush - (time.monotonic() - self._premiere_ligne), 0)
+
+    def arreter(self):
+        """Arrêter le thread d'écriture et écrire les lignes restantes"""
+        with self._condition:
+            self._arret = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+        try:
+            nb = self.flush()
+            if nb:
+                print(f"Buffer d'ingestion vidé : {nb} mesure(s) écrite(s)")
+        except Exception:
+            pass
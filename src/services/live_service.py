@@ -0,0 +1,405 @@
+import os
+import queue
+import threading
+import time
+from app.queries import execute_query, execute_single_query
+from services.capteur_service import capteur_service
+from services.derniere_mesure_service import derniere_mesure_service
+
+# Mesures du journal au-delà du watermark (et ids en attente), avec le capteur pour les filtrer
+# en Python : une mesure écartée (capteur inactif ou sans salle) fait quand même avancer le watermark
+NOUVELLES_MESURES_QUERY = """
+    SELECT
+        f.id,
+        f.capteur_id,
+        c.id_salle as salle_id,
+        c.is_active,
+        c.type_capteur,
+        f.type,
+        f.valeur,
+        f.unite,
+        f.date_update
+    FROM mesure_flux f
+    LEFT JOIN capteur c ON c.id = f.capteur_id
+    WHERE f.id > %s{trous}
+    ORDER BY f.id
+    LIMIT %s
+"""
+
+ID_INITIAL_QUERY = """
+    SELECT MAX(id) as id_max FROM mesure_flux
+"""
+
+# Dernière mesure de chaque capteur actif, renvoyée au premier appel avec depuis_debut
+DERNIERES_MESURES_QUERY = """
+    SELECT
+        d.capteur_id,
+        c.id_salle as salle_id,
+        d.type,
+        d.valeur,
+        d.unite,
+        d.date_update
+    FROM capteur_derniere_mesure d
+    JOIN capteur c ON c.id = d.capteur_id
+        AND c.is_active = TRUE
+        AND d.type = c.type_capteur
+    WHERE c.id_salle IS NOT NULL
+    ORDER BY d.date_update
+"""
+
+CHAMPS_MESURE = ('capteur_id', 'salle_id', 'type', 'valeur', 'unite', 'date_update')
+
+class SuiviMesures:
+    """
+    Suivi de chaque mesure insérée, lue dans le journal mesure_flux avec un watermark sur id.
+
+    Les ids sont attribués à l'insertion mais validés dans un ordre quelconque : un id
+    sauté par la lecture (transaction encore ouverte) est gardé comme trou et relu aux
+    appels suivants, jusqu'à son arrivée ou pendant delai_trous secondes (transaction
+    annulée). Le journal est purgé des mesures de plus de retention secondes.
+    """
+
+    def __init__(self, depuis_debut=False, taille_lot=5000, delai_trous=30, max_trous=1000,
+                 retention=3600, intervalle_purge=300):
+        """
+        Args:
+            depuis_debut (bool): Premier appel renvoyant la dernière mesure de chaque capteur,
+                au lieu de partir de la fin du journal sans rien renvoyer
+            taille_lot (int): Nombre maximal de lignes du journal lues par appel
+            delai_trous (float): Durée d'attente d'un id sauté, en secondes
+            max_trous (int): Nombre maximal d'ids sautés attendus (les plus anciens sont abandonnés)
+            retention (int): Âge des mesures purgées du journal, en secondes
+            intervalle_purge (float): Délai entre deux purges du journal, en secondes
+        """
+        self.depuis_debut = depuis_debut
+        self.taille_lot = taille_lot
+        self.delai_trous = delai_trous
+        self.max_trous = max_trous
+        self.retention = retention
+        self.intervalle_purge = intervalle_purge
+        self.watermark = None
+        self.en_retard = False
+        self._trous = {}
+        self._prochaine_purge = 0
+
+    def reinitialiser(self):
+        self.watermark = None
+        self.en_retard = False
+        self._trous = {}
+
+    def position(self):
+        """Position de lecture, à restaurer si les mesures lues n'ont pas pu être traitées"""
+        return self.watermark, self.en_retard, dict(self._trous)
+
+    def restaurer(self, position):
+        self.watermark, self.en_retard, trous = position
+        self._trous = dict(trous)
+
+    def _purger(self):
+        if time.monotonic() < self._prochaine_purge:
+            return
+        self._prochaine_purge = time.monotonic() + self.intervalle_purge
+        try:
+            derniere_mesure_service.purger_flux(self.retention)
+        except Exception as e:
+            print(f"Erreur lors de la purge du journal des mesures: {str(e)}")
+
+    def _noter_trous(self, identifiant, maintenant):
+        """Ids entre le watermark et identifiant non encore lus"""
+        for manquant in range(max(self.watermark + 1, identifiant - self.max_trous), identifiant):
+            self._trous[manquant] = maintenant
+
+    def _expirer_trous(self, maintenant):
+        limite = maintenant - self.delai_trous
+        for identifiant, vu in list(self._trous.items()):
+            if vu < limite:
+                del self._trous[identifiant]
+        if len(self._trous) > self.max_trous:
+            for identifiant in sorted(self._trous)[:len(self._trous) - self.max_trous]:
+                del self._trous[identifiant]
+
+    def nouvelles_mesures(self):
+        """
+        Mesures insérées depuis le dernier appel, en avançant le watermark.
+        Au plus taille_lot lignes sont lues : en_retard indique qu'il en reste.
+
+        Returns:
+            list: Nouvelles mesures (capteur_id, salle_id, type, valeur, unite, date_update)
+        """
+        if self.watermark is None:
+            initial = execute_single_query(ID_INITIAL_QUERY)
+            self.watermark = (initial or {}).get('id_max') or 0
+            self.en_retard = False
+            self._trous = {}
+            return execute_query(DERNIERES_MESURES_QUERY) if self.depuis_debut else []
+
+        self._purger()
+        maintenant = time.monotonic()
+        self._expirer_trous(maintenant)
+        trous = sorted(self._trous)
+        condition = f" OR f.id IN ({', '.join(['%s'] * len(trous))})" if trous else ''
+        lignes = execute_query(NOUVELLES_MESURES_QUERY.format(trous=condition),
+                               (self.watermark, *trous, self.taille_lot))
+
+        nouvelles = []
+        for ligne in lignes:
+            identifiant = ligne['id']
+            if identifiant > self.watermark:
+                self._noter_trous(identifiant, maintenant)
+                self.watermark = identifiant
+            elif self._trous.pop(identifiant, None) is None:
+                continue
+            if ligne['is_active'] and ligne['salle_id'] is not None and ligne['type'] == ligne['type_capteur']:
+                nouvelles.append({champ: ligne[champ] for champ in CHAMPS_MESURE})
+        self.en_retard = len(lignes) >= self.taille_lot
+        return nouvelles
+
+class Evenement:
+    """
+    Événement diffusé (nom, données). Le message JSON envoyé aux WebSockets est
+    sérialisé une seule fois, quel que soit le nombre d'abonnés qui le reçoivent.
+    """
+
+    __slots__ = ('nom', 'donnees', '_message')
+
+    def __init__(self, nom, donnees):
+        self.nom = nom
+        self.donnees = donnees
+        self._message = None
+
+    def __iter__(self):
+        # Dépaquetage comme un tuple : nom, donnees = evenement
+        yield self.nom
+        yield self.donnees
+
+    def message(self, json):
+        """Message {"event": nom, "data": données} sérialisé avec le provider JSON de l'application"""
+        if self._message is None:
+            self._message = json.dumps({'event': self.nom, 'data': self.donnees})
+        return self._message
+
+class Abonnement:
+    """
+    Abonnement d'un client aux événements de salles. Les événements sont déposés
+    dans une file bornée : si le client ne la vide pas assez vite, les nouveaux
+    événements sont perdus pour lui seul, sans ralentir la diffusion aux autres.
+    """
+
+    def __init__(self, service, salle_ids=None, taille_file=100):
+        """
+        Args:
+            service (LiveService): Service de diffusion
+            salle_ids (set): Salles suivies, None pour toutes les salles
+            taille_file (int): Nombre d'événements en attente au-delà duquel on en perd
+        """
+        self.service = service
+        self.salle_ids = set(salle_ids) if salle_ids is not None else None
+        self.file = queue.Queue(maxsize=taille_file)
+        self.perdus = 0
+
+    def publier(self, evenement):
+        try:
+            self.file.put_nowait(evenement)
+        except queue.Full:
+            self.perdus += 1
+
+    def reveiller(self):
+        """Débloquer le lecteur de la file (None), par exemple à la déconnexion du client"""
+        try:
+            self.file.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def ajouter_salles(self, salle_ids):
+        self.service.modifier_salles(self, ajout=salle_ids)
+
+    def retirer_salles(self, salle_ids):
+        self.service.modifier_salles(self, retrait=salle_ids)
+
+    def fermer(self):
+        self.service.desabonner(self)
+
+# Durée de conservation du journal mesure_flux, en secondes
+RETENTION_FLUX = int(os.getenv('MESURE_FLUX_RETENTION', 3600))
+
+class LiveService:
+    """
+    Diffusion en temps réel des nouvelles mesures, des moyennes et des changements de
+    conformité par salle (hub publication/abonnement des flux SSE et WebSocket).
+
+    Une seule boucle par processus lit le journal mesure_flux avec un watermark sur id,
+    puis distribue chaque mesure insérée aux abonnés des salles concernées : le coût en
+    base (une requête par intervalle, plus deux pour les moyennes et les seuils quand
+    une salle suivie a changé) ne dépend pas du nombre de clients. Les abonnés sont
+    indexés par salle. La boucle ne tourne que tant qu'il y a des abonnés.
+    """
+
+    def __init__(self, intervalle=1.0, taille_file=100):
+        """
+        Args:
+            intervalle (float): Délai entre deux vérifications, en secondes
+            taille_file (int): Taille de la file d'événements de chaque abonné
+        """
+        self.intervalle = intervalle
+        self.taille_file = taille_file
+        self._lock = threading.Lock()
+        self._abonnements = set()
+        self._par_salle = {}
+        self._toutes_salles = set()
+        self._thread = None
+        self._arret = threading.Event()
+        self.suivi = SuiviMesures(retention=RETENTION_FLUX)
+        self._statuts = {}
+
+    def abonner(self, salle_ids=None):
+        """
+        Args:
+            salle_ids (iterable): Salles à suivre, None pour toutes
+
+        Returns:
+            Abonnement: À fermer quand le client se déconnecte
+        """
+        abonnement = Abonnement(self, salle_ids, self.taille_file)
+        with self._lock:
+            self._abonnements.add(abonnement)
+            self._indexer(abonnement, abonnement.salle_ids)
+            if self._thread is None:
+                self._arret.clear()
+                self._thread = threading.Thread(target=self._boucle, name='live-mesures', daemon=True)
+                self._thread.start()
+        return abonnement
+
+    def _indexer(self, abonnement, salle_ids):
+        if salle_ids is None:
+            self._toutes_salles.add(abonnement)
+            return
+        for salle_id in salle_ids:
+            self._par_salle.setdefault(salle_id, set()).add(abonnement)
+
+    def _desindexer(self, abonnement, salle_ids):
+        if salle_ids is None:
+            self._toutes_salles.discard(abonnement)
+            return
+        for salle_id in salle_ids:
+            abonnes = self._par_salle.get(salle_id)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self._par_salle[salle_id]
+
+    def modifier_salles(self, abonnement, ajout=(), retrait=()):
+        """Ajouter ou retirer des salles suivies par un abonnement (abonnement à toutes exclu)"""
+        with self._lock:
+            if abonnement.salle_ids is None or abonnement not in self._abonnements:
+                return
+            ajout = set(ajout) - abonnement.salle_ids
+            retrait = set(retrait) & abonnement.salle_ids
+            abonnement.salle_ids |= ajout
+            abonnement.salle_ids -= retrait
+            self._indexer(abonnement, ajout)
+            self._desindexer(abonnement, retrait)
+
+    def desabonner(self, abonnement):
+        with self._lock:
+            if abonnement in self._abonnements:
+                self._abonnements.discard(abonnement)
+                self._desindexer(abonnement, abonnement.salle_ids)
+
+    def nb_abonnements(self):
+        with self._lock:
+            return len(self._abonnements)
+
+    def arreter(self):
+        """Arrêter la boucle de détection"""
+        self._arret.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            with self._lock:
+                if not self._abonnements:
+                    # Sans abonné, les mesures ne sont plus suivies : repartir de la
+                    # date courante au prochain abonnement plutôt que tout rediffuser
+                    self._thread = None
+                    self.suivi.reinitialiser()
+                    return
+            try:
+                self.verifier()
+            except Exception as e:
+                print(f"Erreur lors de la détection des nouvelles mesures: {str(e)}")
+            # Journal pas entièrement lu : lot suivant sans attendre
+            self._arret.wait(0 if self.suivi.en_retard else self.intervalle)
+        with self._lock:
+            self._thread = None
+
+    def _abonnes(self, salle_id):
+        with self._lock:
+            return list(self._par_salle.get(salle_id, ())) + list(self._toutes_salles)
+
+    def publier(self, salle_id, nom, donnees):
+        """
+        Déposer un événement dans la file de chaque abonné de la salle
+
+        Returns:
+            int: Nombre d'abonnés destinataires
+        """
+        abonnes = self._abonnes(salle_id)
+        if abonnes:
+            evenement = Evenement(nom, donnees)
+            for abonnement in abonnes:
+                abonnement.publier(evenement)
+        return len(abonnes)
+
+    def nouvelles_mesures(self):
+        return self.suivi.nouvelles_mesures()
+
+    def verifier(self):
+        """
+        Une itération de la boucle : diffuser les mesures insérées depuis la
+        vérification précédente, puis les moyennes recalculées des salles
+        suivies qui ont changé et leur conformité si son statut a changé
+
+        Returns:
+            int: Nombre de nouvelles mesures
+        """
+        nouvelles = self.nouvelles_mesures()
+        if not nouvelles:
+            return 0
+
+        salles_modifiees = set()
+        for mesure in nouvelles:
+            if self.publier(mesure['salle_id'], 'mesure', mesure):
+                salles_modifiees.add(mesure['salle_id'])
+
+        if salles_modifiees:
+            seuils_par_salle = capteur_service.get_seuils_conformite_salles()
+            for moyennes in capteur_service.get_moyennes_salles(salle_ids=sorted(salles_modifiees)):
+                salle_id = moyennes['salle_id']
+                self.publier(salle_id, 'moyennes', moyennes)
+                seuils = seuils_par_salle.get(salle_id)
+                if seuils is not None:
+                    self._publier_conformite(salle_id, capteur_service.verifier_seuils(moyennes, seuils))
+        return len(nouvelles)
+
+    def _publier_conformite(self, salle_id, verification):
+        statut = (verification['statut'], verification.get('niveau_conformite'))
+        if self._statuts.get(salle_id) == statut:
+            return
+        self._statuts[salle_id] = statut
+        self.publier(salle_id, 'conformite', {
+            'salle_id': salle_id,
+            'statut': verification['statut'],
+            'niveau_conformite': verification.get('niveau_conformite'),
+            'score_conformite': verification.get('score_conformite'),
+            'alertes': verification['alertes']
+        })
+
+live_service = LiveService(
+    intervalle=float(os.getenv('LIVE_POLL_INTERVAL', 1.0)),
+    taille_file=int(os.getenv('LIVE_QUEUE_SIZE', 100))
+)
+
+import atexit
+atexit.register(live_service.arreter)
@@ -0,0 +1,207 @@
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from app.database import connexion, execute_many
+from sqlalchemy import text, bindparam
+from services.ingestion_buffer import IngestionBuffer, BufferPleinError
+
+TYPES_MESURES = ['temperature', 'humidite', 'pression']
+
+UNITES_PAR_DEFAUT = {
+    'temperature': '°C',
+    'humidite': '%',
+    'pression': 'hPa'
+}
+
+# Colonnes valeur en DECIMAL(10, 2) : 2 décimales, 8 chiffres avant la virgule
+PRECISION_VALEUR = Decimal('0.01')
+VALEUR_MAX = Decimal('99999999.99')
+
+MAX_MESURES_PAR_REQUETE = 10000
+MAX_ERREURS_RETOURNEES = 100
+
+INSERT_MESURE_QUERY = """
+    INSERT INTO {type_mesure} (capteur_id, valeur, unite, date_update)
+    VALUES (:capteur_id, :valeur, :unite, :date_update)
+"""
+
+
+def ecrire_lignes(lignes):
+    """Insérer les lignes de chaque table avec une requête multi-lignes, dans une seule transaction"""
+    return execute_many([
+        (INSERT_MESURE_QUERY.format(type_mesure=type_mesure), lignes.get(type_mesure))
+        for type_mesure in TYPES_MESURES
+    ])
+
+
+class MesureService:
+
+    def get_types_capteurs(self, capteur_ids):
+        """
+        Récupérer en une requête le type des capteurs actifs
+
+        Args:
+            capteur_ids (iterable): IDs des capteurs
+
+        Returns:
+            dict: type_capteur indexé par ID de capteur actif
+        """
+        if not capteur_ids:
+            return {}
+
+        query = text("""
+            SELECT id, type_capteur
+            FROM capteur
+            WHERE id IN :capteur_ids AND is_active = TRUE
+        """).bindparams(bindparam('capteur_ids', expanding=True))
+
+        with connexion() as conn:
+            rows = conn.execute(query, {'capteur_ids': list(capteur_ids)}).fetchall()
+        return {row.id: row.type_capteur for row in rows}
+
+    def valider_mesure(self, mesure, types_capteurs):
+        """
+        Valider une mesure et la convertir en ligne à insérer
+
+        Args:
+            mesure (dict): {capteur_id, valeur, unite?, date_update?, type?}
+            types_capteurs (dict): type_capteur indexé par ID de capteur actif
+
+        Returns:
+            tuple: (type de mesure, paramètres d'insertion)
+        """
+        if not isinstance(mesure, dict):
+            raise ValueError("La mesure doit être un objet JSON")
+
+        capteur_id = mesure.get('capteur_id')
+        if not isinstance(capteur_id, int) or isinstance(capteur_id, bool):
+            raise ValueError("capteur_id doit être un entier")
+
+        type_capteur = types_capteurs.get(capteur_id)
+        if type_capteur is None:
+            raise ValueError(f"Capteur {capteur_id} introuvable ou inactif")
+        if type_capteur not in TYPES_MESURES:
+            raise ValueError(f"Le capteur {capteur_id} est de type '{type_capteur}', sans table de mesures")
+
+        type_mesure = mesure.get('type', type_capteur)
+        if type_mesure != type_capteur:
+            raise ValueError(f"Le capteur {capteur_id} mesure '{type_capteur}', pas '{type_mesure}'")
+
+        try:
+            valeur = Decimal(str(mesure.get('valeur')))
+        except InvalidOperation:
+            raise ValueError("valeur doit être un nombre")
+        if not valeur.is_finite():
+            raise ValueError("valeur doit être un nombre")
+        # Arrondi comme le ferait MariaDB ; une valeur hors limites ferait échouer tout le lot
+        try:
+            valeur = valeur.quantize(PRECISION_VALEUR, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            valeur = None
+        if valeur is None or abs(valeur) > VALEUR_MAX:
+            raise ValueError(f"valeur doit être comprise entre -{VALEUR_MAX} et {VALEUR_MAX}")
+
+        date_update = mesure.get('date_update')
+        if date_update is None:
+            date_update = datetime.now()
+        else:
+            try:
+                date_update = datetime.fromisoformat(str(date_update))
+            except ValueError:
+                raise ValueError("date_update doit être une date ISO 8601")
+            if date_update.tzinfo is not None:
+                date_update = date_update.astimezone().replace(tzinfo=None)
+
+        return type_mesure, {
+            'capteur_id': capteur_id,
+            'valeur': valeur,
+            'unite': mesure.get('unite') or UNITES_PAR_DEFAUT[type_mesure],
+            'date_update': date_update
+        }
+
+    def preparer_mesures(self, mesures):
+        """
+        Valider un lot de mesures et les regrouper par table
+
+        Args:
+            mesures (list): Liste de mesures {capteur_id, valeur, unite?, date_update?, type?}
+
+        Returns:
+            tuple: (lignes à insérer indexées par type de mesure, mesures rejetées)
+        """
+        if len(mesures) > MAX_MESURES_PAR_REQUETE:
+            raise ValueError(f"Au plus {MAX_MESURES_PAR_REQUETE} mesures par requête")
+
+        capteur_ids = {
+            m.get('capteur_id') for m in mesures
+            if isinstance(m, dict) and isinstance(m.get('capteur_id'), int)
+        }
+        types_capteurs = self.get_types_capteurs(capteur_ids)
+
+        lignes = {type_mesure: [] for type_mesure in TYPES_MESURES}
+        rejetees = []
+
+        for index, mesure in enumerate(mesures):
+            try:
+                type_mesure, ligne = self.valider_mesure(mesure, types_capteurs)
+                lignes[type_mesure].append(ligne)
+            except ValueError as e:
+                rejetees.append({'index': index, 'erreur': str(e)})
+
+        return lignes, rejetees
+
+    def enregistrer_mesures(self, mesures, buffer=None):
+        """
+        Valider un lot de mesures et les insérer dans temperature, humidite
+        et pression avec une requête multi-lignes par table, dans une seule transaction.
+        Si un buffer d'ingestion est fourni, les lignes y sont mises en attente
+        et seront écrites lors de son prochain flush.
+        Les mesures invalides sont rejetées, les autres sont insérées.
+
+        Args:
+            mesures (list): Liste de mesures {capteur_id, valeur, unite?, date_update?, type?}
+            buffer (IngestionBuffer): Buffer d'écriture différée (optionnel)
+
+        Returns:
+            dict: Nombre de mesures insérées par type et mesures rejetées
+        """
+        try:
+            lignes, rejetees = self.preparer_mesures(mesures)
+
+            if buffer is not None:
+                buffer.ajouter(lignes)
+            else:
+                ecrire_lignes(lignes)
+
+            return {
+                'inserees': sum(len(l) for l in lignes.values()),
+                'par_type': {type_mesure: len(l) for type_mesure, l in lignes.items()},
+                'rejetees': len(rejetees),
+                'erreurs': rejetees[:MAX_ERREURS_RETOURNEES],
+                'differee': buffer is not None
+            }
+
+        except (ValueError, BufferPleinError):
+            raise
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'enregistrement des mesures: {str(e)}")
+
+
+mesure_service = MesureService()
+
+
+def should_use_ingestion_buffer():
+
+    return os.getenv('INGESTION_BUFFER_ENABLED', 'false').lower() == 'true'
+
+
+ingestion_buffer = IngestionBuffer(
+    ecrire_lignes,
+    taille_flush=int(os.getenv('INGESTION_FLUSH_SIZE', 5000)),
+    delai_flush=int(os.getenv('INGESTION_FLUSH_MS', 200)) / 1000,
+    capacite=int(os.getenv('INGESTION_BUFFER_CAPACITY', 50000)),
+    max_tentatives=int(os.getenv('INGESTION_MAX_TENTATIVES', 5))
+)
+
+import atexit
+atexit.register(ingestion_buffer.arreter)
@@ -0,0 +1,277 @@
+import os
+import random
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import orjson
+from app.database import engine, execute_write
+from app.jobs import JobArrierePlan
+from app.json_provider import _default
+from app.queries import execute_query
+from sqlalchemy import text
+
+CREATE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS notification (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        url VARCHAR(512) NOT NULL,
+        evenement VARCHAR(32) NOT NULL,
+        payload TEXT NOT NULL,
+        statut VARCHAR(16) NOT NULL DEFAULT 'en_attente',
+        tentatives INT NOT NULL DEFAULT 0,
+        prochaine_tentative DATETIME NOT NULL,
+        derniere_erreur VARCHAR(512),
+        date_creation DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        date_envoi DATETIME,
+        INDEX idx_notification_attente (statut, prochaine_tentative)
+    )
+"""
+
+INSERT_NOTIFICATION_QUERY = """
+    INSERT INTO notification (url, evenement, payload, prochaine_tentative)
+    VALUES (:url, :evenement, :payload, :prochaine_tentative)
+"""
+
+NOTIFICATIONS_DUES_QUERY = """
+    SELECT id, url, evenement, payload, tentatives
+    FROM notification
+    WHERE statut = 'en_attente' AND prochaine_tentative <= %s
+    ORDER BY id
+    LIMIT %s
+"""
+
+def get_webhook_urls():
+    """URLs des webhooks à notifier (WEBHOOK_URLS, séparées par des virgules)"""
+    return [url.strip() for url in os.getenv('WEBHOOK_URLS', '').split(',') if url.strip()]
+
+class NotificationService:
+    """
+    Envoi des notifications aux webhooks, sans bloquer les requêtes HTTP de l'API.
+
+    Les notifications sont d'abord écrites dans la table notification (outbox), dans la
+    transaction qui enregistre l'événement : rien n'est perdu si le processus s'arrête.
+    Une boucle relit les notifications dues et les envoie via un pool de threads borné,
+    avec au plus max_par_cible envois simultanés vers une même URL : une cible lente ou
+    en panne n'occupe pas tout le pool. Un échec est retenté avec un délai exponentiel
+    (delai_base * 2^tentatives, plafonné à delai_max), jusqu'à max_tentatives.
+    L'envoi est « au moins une fois » : une notification en cours d'envoi à l'arrêt du
+    processus est renvoyée au redémarrage.
+    """
+
+    def __init__(self, taille_pool=4, max_par_cible=2, max_tentatives=8, delai_base=5,
+                 delai_max=3600, timeout=5, intervalle=2.0):
+        """
+        Args:
+            taille_pool (int): Nombre de threads d'envoi
+            max_par_cible (int): Envois simultanés au plus vers une même URL
+            max_tentatives (int): Tentatives avant d'abandonner une notification
+            delai_base (float): Délai avant la première nouvelle tentative, en secondes
+            delai_max (float): Délai maximal entre deux tentatives, en secondes
+            timeout (float): Délai d'attente d'une réponse du webhook, en secondes
+            intervalle (float): Délai entre deux lectures de l'outbox, en secondes
+        """
+        self.taille_pool = taille_pool
+        self.max_par_cible = max_par_cible
+        self.max_tentatives = max_tentatives
+        self.delai_base = delai_base
+        self.delai_max = delai_max
+        self.timeout = timeout
+        self.intervalle = intervalle
+        self._pool = None
+        self._lock = threading.Lock()
+        self._en_cours = set()
+        self._par_cible = {}
+        self._reveil = threading.Event()
+
+    def installer(self):
+        """
+        Créer la table des notifications
+
+        Returns:
+            bool: True si succès
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(CREATE_TABLE_QUERY))
+            return True
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'installation des notifications: {str(e)}")
+
+    def lignes_outbox(self, evenement, donnees, urls=None):
+        """
+        Notifications à insérer (INSERT_NOTIFICATION_QUERY), une par webhook configuré,
+        à écrire dans la même transaction que l'événement qui les produit
+
+        Args:
+            evenement (str): Type d'événement (par exemple 'conformite')
+            donnees (dict): Contenu envoyé en JSON
+
+        Returns:
+            list: Paramètres des lignes à insérer (vide sans webhook configuré)
+        """
+        payload = orjson.dumps({'evenement': evenement, 'data': donnees}, default=_default).decode()
+        maintenant = datetime.now()
+        return [
+            {'url': url, 'evenement': evenement, 'payload': payload, 'prochaine_tentative': maintenant}
+            for url in (get_webhook_urls() if urls is None else urls)
+        ]
+
+    def reveiller(self):
+        """Lire l'outbox sans attendre la fin de l'intervalle (nouvelles notifications)"""
+        self._reveil.set()
+
+    def delai(self, tentatives):
+        """Délai avant la tentative suivante : exponentiel, plafonné, avec une gigue de ±10 %"""
+        delai = min(self.delai_max, self.delai_base * 2 ** (tentatives - 1))
+        return delai * random.uniform(0.9, 1.1)
+
+    def envoyer(self, url, payload):
+        """
+        Envoyer une notification (POST JSON)
+
+        Returns:
+            str: Erreur, None si le webhook a répondu 2xx
+        """
+        requete = urllib.request.Request(
+            url, data=payload.encode(), method='POST',
+            headers={'Content-Type': 'application/json', 'User-Agent': 'ClimHetic-Notifications'}
+        )
+        try:
+            with urllib.request.urlopen(requete, timeout=self.timeout) as reponse:
+                reponse.read()
+            return None
+        except urllib.error.HTTPError as e:
+            return f"HTTP {e.code}"
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    def _livrer(self, notification):
+        try:
+            erreur = self.envoyer(notification['url'], notification['payload'])
+            self._enregistrer_resultat(notification, erreur)
+        except Exception as e:
+            print(f"Erreur lors de l'envoi de la notification {notification['id']}: {str(e)}")
+        finally:
+            with self._lock:
+                self._en_cours.discard(notification['id'])
+                self._par_cible[notification['url']] -= 1
+                if not self._par_cible[notification['url']]:
+                    del self._par_cible[notification['url']]
+            self._reveil.set()
+
+    def _enregistrer_resultat(self, notification, erreur):
+        if erreur is None:
+            execute_write(
+                "UPDATE notification SET statut = 'envoyee', tentatives = tentatives + 1,"
+                " date_envoi = :maintenant, derniere_erreur = NULL WHERE id = :id",
+                {'id': notification['id'], 'maintenant': datetime.now()}
+            )
+            return
+
+        tentatives = notification['tentatives'] + 1
+        execute_write(
+            "UPDATE notification SET statut = :statut, tentatives = :tentatives,"
+            " prochaine_tentative = :prochaine, derniere_erreur = :erreur WHERE id = :id",
+            {
+                'id': notification['id'],
+                'statut': 'echec' if tentatives >= self.max_tentatives else 'en_attente',
+                'tentatives': tentatives,
+                'prochaine': datetime.now() + timedelta(seconds=self.delai(tentatives)),
+                'erreur': erreur[:512]
+            }
+        )
+
+    def distribuer(self):
+        """
+        Confier au pool les notifications dues, dans la limite des threads libres
+        et des envois simultanés par URL
+
+        Returns:
+            int: Nombre de notifications confiées au pool
+        """
+        with self._lock:
+            places = self.taille_pool - len(self._en_cours)
+            if places <= 0:
+                return 0
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.taille_pool, thread_name_prefix='notification')
+
+        dues = execute_query(NOTIFICATIONS_DUES_QUERY, (datetime.now(), places + len(self._en_cours) + 100))
+
+        confiees = 0
+        with self._lock:
+            for notification in dues:
+                if confiees >= places:
+                    break
+                if notification['id'] in self._en_cours:
+                    continue
+                if self._par_cible.get(notification['url'], 0) >= self.max_par_cible:
+                    continue
+                self._en_cours.add(notification['id'])
+                self._par_cible[notification['url']] = self._par_cible.get(notification['url'], 0) + 1
+                self._pool.submit(self._livrer, notification)
+                confiees += 1
+        return confiees
+
+    def attendre(self, delai):
+        """Attendre l'intervalle suivant ou un réveil (nouvelle notification, envoi terminé)"""
+        self._reveil.wait(delai)
+        self._reveil.clear()
+
+    def arreter(self):
+        """Attendre la fin des envois en cours et libérer le pool"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def get_notifications(self, statut=None, limit=100):
+        """
+        Récupérer les notifications de l'outbox, des plus récentes aux plus anciennes
+
+        Args:
+            statut (str): 'en_attente', 'envoyee' ou 'echec'
+            limit (int): Nombre maximum de notifications
+
+        Returns:
+            list: Notifications avec leur nombre de tentatives et leur dernière erreur
+        """
+        try:
+            if statut is None:
+                return execute_query("SELECT * FROM notification ORDER BY id DESC LIMIT %s", (limit,))
+            return execute_query(
+                "SELECT * FROM notification WHERE statut = %s ORDER BY id DESC LIMIT %s", (statut, limit)
+            )
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des notifications: {str(e)}")
+
+notification_service = NotificationService(
+    taille_pool=int(os.getenv('WEBHOOK_POOL_SIZE', 4)),
+    max_par_cible=int(os.getenv('WEBHOOK_MAX_PAR_CIBLE', 2)),
+    max_tentatives=int(os.getenv('WEBHOOK_MAX_TENTATIVES', 8)),
+    delai_base=float(os.getenv('WEBHOOK_DELAI_BASE', 5)),
+    delai_max=float(os.getenv('WEBHOOK_DELAI_MAX', 3600)),
+    timeout=float(os.getenv('WEBHOOK_TIMEOUT', 5)),
+    intervalle=float(os.getenv('NOTIFICATIONS_INTERVAL', 2))
+)
+
+# Boucle d'envoi en arrière-plan, un seul processus à la fois : les notifications
+# en cours d'envoi sont suivies en mémoire
+job = JobArrierePlan(
+    'notifications',
+    notification_service.distribuer,
+    intervalle=lambda: notification_service.intervalle,
+    activation='NOTIFICATIONS_JOB_ENABLED',
+    verrou='climhetic_notifications',
+    attendre=notification_service.attendre,
+    reveiller=notification_service.reveiller,
+    apres_arret=notification_service.arreter
+)
+
+
+if __name__ == '__main__':
+    notification_service.installer()
+    print("Table des notifications créée")
@@ -0,0 +1,410 @@
+import os
+from datetime import datetime, timedelta
+from app.database import engine
+from app.jobs import JobArrierePlan
+from app.queries import execute_query
+from sqlalchemy import text
+
+TYPES_MESURES = ['temperature', 'humidite', 'pression']
+
+# Granularités disponibles, de la plus fine à la plus grossière (durée en secondes)
+GRANULARITES = {
+    'minute': 60,
+    'heure': 3600,
+    'jour': 86400
+}
+
+FORMAT_BUCKET = {
+    'minute': '%Y-%m-%d %H:%i:00',
+    'heure': '%Y-%m-%d %H:00:00',
+    'jour': '%Y-%m-%d 00:00:00'
+}
+
+# Chaque granularité est calculée à partir de la précédente (None : mesures brutes)
+GRANULARITE_SOURCE = {
+    'minute': None,
+    'heure': 'minute',
+    'jour': 'heure'
+}
+
+CREATE_TABLES_QUERIES = [
+    """
+    CREATE TABLE IF NOT EXISTS mesure_rollup_capteur (
+        capteur_id INT NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        granularite VARCHAR(16) NOT NULL,
+        debut DATETIME NOT NULL,
+        nb_mesures INT NOT NULL,
+        valeur_somme DOUBLE NOT NULL,
+        valeur_min DECIMAL(10, 2),
+        valeur_max DECIMAL(10, 2),
+        PRIMARY KEY (capteur_id, type, granularite, debut)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS mesure_rollup_salle (
+        salle_id INT NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        granularite VARCHAR(16) NOT NULL,
+        debut DATETIME NOT NULL,
+        nb_mesures INT NOT NULL,
+        valeur_somme DOUBLE NOT NULL,
+        valeur_min DECIMAL(10, 2),
+        valeur_max DECIMAL(10, 2),
+        PRIMARY KEY (salle_id, type, granularite, debut)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_watermark (
+        type VARCHAR(32) NOT NULL PRIMARY KEY,
+        derniere_date DATETIME NOT NULL
+    )
+    """
+]
+
+# Les intervalles sont recalculés en entier : leurs agrégats remplacent ceux déjà présents,
+# ce qui rend le recalcul d'un intervalle idempotent
+REMPLACEMENT_ROLLUP = """
+    ON DUPLICATE KEY UPDATE
+        nb_mesures = VALUES(nb_mesures),
+        valeur_somme = VALUES(valeur_somme),
+        valeur_min = VALUES(valeur_min),
+        valeur_max = VALUES(valeur_max)
+"""
+
+ROLLUP_CAPTEUR_QUERY = """
+    INSERT INTO mesure_rollup_capteur
+        (capteur_id, type, granularite, debut, nb_mesures, valeur_somme, valeur_min, valeur_max)
+    SELECT
+        m.capteur_id,
+        '{type_mesure}',
+        'minute',
+        DATE_FORMAT(m.date_update, '{format_bucket}') as debut,
+        COUNT(*),
+        SUM(m.valeur),
+        MIN(m.valeur),
+        MAX(m.valeur)
+    FROM {type_mesure} m
+    WHERE m.date_update >= :depuis AND m.date_update <= :jusqua
+    GROUP BY m.capteur_id, debut
+""" + REMPLACEMENT_ROLLUP
+
+ROLLUP_SALLE_QUERY = """
+    INSERT INTO mesure_rollup_salle
+        (salle_id, type, granularite, debut, nb_mesures, valeur_somme, valeur_min, valeur_max)
+    SELECT
+        c.id_salle,
+        '{type_mesure}',
+        'minute',
+        DATE_FORMAT(m.date_update, '{format_bucket}') as debut,
+        COUNT(*),
+        SUM(m.valeur),
+        MIN(m.valeur),
+        MAX(m.valeur)
+    FROM {type_mesure} m
+    JOIN capteur c ON c.id = m.capteur_id
+    WHERE c.id_salle IS NOT NULL
+        AND m.date_update >= c.date_installation
+        AND m.date_update >= :depuis AND m.date_update <= :jusqua
+    GROUP BY c.id_salle, debut
+""" + REMPLACEMENT_ROLLUP
+
+# Les agrégats de salle d'un intervalle recalculé sont supprimés avant d'être réinsérés :
+# un capteur changé de salle ne laisse pas de ligne périmée dans son ancienne salle.
+# Avant la fenêtre recalculée, les agrégats gardent la salle du capteur à leur calcul.
+PURGE_ROLLUP_SALLE_QUERY = """
+    DELETE FROM mesure_rollup_salle
+    WHERE type = '{type_mesure}' AND granularite = '{granularite}'
+        AND debut >= :depuis AND debut <= :jusqua
+"""
+
+# Heures à partir des minutes, jours à partir des heures (même table, capteur ou salle)
+ROLLUP_CONSOLIDATION_QUERY = """
+    INSERT INTO {table}
+        ({colonne}, type, granularite, debut, nb_mesures, valeur_somme, valeur_min, valeur_max)
+    SELECT
+        r.{colonne},
+        r.type,
+        '{granularite}',
+        DATE_FORMAT(r.debut, '{format_bucket}') as debut_bucket,
+        SUM(r.nb_mesures),
+        SUM(r.valeur_somme),
+        MIN(r.valeur_min),
+        MAX(r.valeur_max)
+    FROM {table} r
+    WHERE r.type = '{type_mesure}' AND r.granularite = '{source}'
+        AND r.debut >= :depuis AND r.debut <= :jusqua
+    GROUP BY r.{colonne}, r.type, debut_bucket
+""" + REMPLACEMENT_ROLLUP
+
+
+def debut_bucket(date, granularite):
+    """Début de l'intervalle de la granularité qui contient la date"""
+    if granularite == 'minute':
+        return date.replace(second=0, microsecond=0)
+    if granularite == 'heure':
+        return date.replace(minute=0, second=0, microsecond=0)
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def choisir_granularite(resolution):
+    """
+    Choisir la granularité la plus grossière qui respecte la résolution demandée
+
+    Args:
+        resolution (int): Intervalle maximal souhaité entre deux points, en secondes
+
+    Returns:
+        str: Granularité ('minute', 'heure', 'jour') ou None pour les mesures brutes
+    """
+    granularite_choisie = None
+    for granularite, duree in GRANULARITES.items():
+        if duree <= resolution:
+            granularite_choisie = granularite
+    return granularite_choisie
+
+
+class RollupService:
+    """
+    Agrégats (nombre, somme, min, max, moyenne) par minute, heure et jour,
+    par capteur et par salle. Un job incrémental recalcule les intervalles qui
+    commencent après le dernier watermark de chaque table, diminué de
+    fenetre_recalcul : les mesures arrivées en retard (lots différés, dates des
+    appareils) dans cette fenêtre sont prises en compte au passage suivant.
+    Au-delà, executer(depuis=...) recalcule une période donnée.
+    """
+
+    def __init__(self, fenetre_recalcul=3600):
+        """
+        Args:
+            fenetre_recalcul (int): Retard maximal, en secondes, d'une mesure prise en
+                compte par le job (intervalles recalculés avant le watermark)
+        """
+        self.fenetre_recalcul = fenetre_recalcul
+
+    def installer(self):
+        """
+        Créer les tables d'agrégats et de watermark
+
+        Returns:
+            bool: True si succès
+        """
+        try:
+            with engine.begin() as conn:
+                for query in CREATE_TABLES_QUERIES:
+                    conn.execute(text(query))
+            return True
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'installation des agrégats: {str(e)}")
+
+    def executer(self, depuis=None):
+        """
+        Agréger les nouvelles mesures depuis le dernier watermark de chaque table.
+        Un verrou MariaDB garantit qu'un seul processus exécute le job à la fois.
+        Chaque table est traitée dans une transaction (agrégats et watermark) :
+        une erreur n'en laisse aucune partie enregistrée.
+
+        Args:
+            depuis (datetime): Recalculer à partir de cette date plutôt que du watermark
+
+        Returns:
+            dict: Intervalle traité par type de mesure, ou None si le job tourne ailleurs
+        """
+        try:
+            with engine.connect() as conn:
+                verrou = conn.execute(text("SELECT GET_LOCK('climhetic_rollup', 0)")).scalar()
+                if not verrou:
+                    return None
+
+                try:
+                    # Le verrou est lié à la session : terminer la transaction ouverte par sa lecture
+                    conn.rollback()
+                    traites = {}
+                    for type_mesure in TYPES_MESURES:
+                        with conn.begin():
+                            traites[type_mesure] = self._executer_type(conn, type_mesure, depuis)
+                    return traites
+                finally:
+                    if conn.in_transaction():
+                        conn.rollback()
+                    conn.execute(text("SELECT RELEASE_LOCK('climhetic_rollup')"))
+                    conn.rollback()
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'agrégation des mesures: {str(e)}")
+
+    def _executer_type(self, conn, type_mesure, depuis=None):
+        watermark = conn.execute(
+            text("SELECT derniere_date FROM rollup_watermark WHERE type = :type_mesure"),
+            {'type_mesure': type_mesure}
+        ).scalar()
+
+        jusqua = conn.execute(text(f"SELECT MAX(date_update) FROM {type_mesure}")).scalar()
+
+        if jusqua is None:
+            return None
+        if depuis is None:
+            if watermark is not None and jusqua <= watermark:
+                return None
+            depuis = watermark - timedelta(seconds=self.fenetre_recalcul) if watermark else datetime(1900, 1, 1)
+
+        for granularite, source in GRANULARITE_SOURCE.items():
+            params = {'depuis': debut_bucket(depuis, granularite), 'jusqua': jusqua}
+            format_bucket = FORMAT_BUCKET[granularite]
+            conn.execute(text(PURGE_ROLLUP_SALLE_QUERY.format(type_mesure=type_mesure, granularite=granularite)), params)
+            if source is None:
+                queries = [
+                    query.format(type_mesure=type_mesure, format_bucket=format_bucket)
+                    for query in (ROLLUP_CAPTEUR_QUERY, ROLLUP_SALLE_QUERY)
+                ]
+            else:
+                queries = [
+                    ROLLUP_CONSOLIDATION_QUERY.format(
+                        table=table, colonne=colonne, granularite=granularite, source=source,
+                        type_mesure=type_mesure, format_bucket=format_bucket
+                    )
+                    for table, colonne in (('mesure_rollup_capteur', 'capteur_id'), ('mesure_rollup_salle', 'salle_id'))
+                ]
+            for query in queries:
+                conn.execute(text(query), params)
+
+        conn.execute(text("""
+            INSERT INTO rollup_watermark (type, derniere_date)
+            VALUES (:type_mesure, :jusqua)
+            ON DUPLICATE KEY UPDATE derniere_date = GREATEST(derniere_date, VALUES(derniere_date))
+        """), {'type_mesure': type_mesure, 'jusqua': jusqua})
+
+        return {'depuis': depuis, 'jusqua': jusqua}
+
+    def get_agregats(self, type_mesure, debut, fin, resolution, capteur_id=None, salle_id=None):
+        """
+        Récupérer l'historique agrégé d'un capteur ou d'une salle sur un intervalle.
+        L'agrégat le plus grossier qui respecte la résolution est utilisé ;
+        en dessous d'une minute, les mesures brutes sont renvoyées.
+        Les intervalles postérieurs au watermark du job (intervalle en cours, job
+        en retard ou jamais exécuté) sont agrégés à la volée sur les mesures brutes,
+        à la même granularité, et ajoutés aux agrégats.
+
+        Args:
+            type_mesure (str): 'temperature', 'humidite' ou 'pression'
+            debut (datetime): Début de l'intervalle
+            fin (datetime): Fin de l'intervalle
+            resolution (int): Intervalle maximal souhaité entre deux points, en secondes
+            capteur_id (int): ID du capteur
+            salle_id (int): ID de la salle (si capteur_id n'est pas fourni)
+
+        Returns:
+            list: Points (date_update, nb_mesures, valeur_min, valeur_max, valeur_moyenne)
+        """
+        try:
+            if type_mesure not in TYPES_MESURES:
+                raise Exception(f"Type de mesure invalide. Types autorisés: {', '.join(TYPES_MESURES)}")
+            if capteur_id is None and salle_id is None:
+                raise Exception("Un capteur ou une salle est obligatoire")
+
+            granularite = choisir_granularite(resolution)
+
+            if granularite is None:
+                return self._get_mesures_brutes(type_mesure, debut, fin, capteur_id, salle_id)
+
+            if capteur_id is not None:
+                table, colonne, identifiant = 'mesure_rollup_capteur', 'capteur_id', capteur_id
+            else:
+                table, colonne, identifiant = 'mesure_rollup_salle', 'salle_id', salle_id
+
+            watermark = self._get_watermark(type_mesure)
+            if watermark is not None and watermark >= fin:
+                couverture = None
+            else:
+                # L'intervalle du watermark peut être incomplet : il est recalculé sur les mesures brutes
+                couverture = debut_bucket(watermark, granularite) if watermark is not None else debut
+                if couverture <= debut:
+                    return self._get_agregats_bruts(type_mesure, granularite, debut, fin, capteur_id, salle_id)
+
+            query = f"""
+                SELECT
+                    debut as date_update,
+                    nb_mesures,
+                    valeur_min,
+                    valeur_max,
+                    valeur_somme / nb_mesures as valeur_moyenne
+                FROM {table}
+                WHERE {colonne} = %s AND type = %s AND granularite = %s
+                    AND debut >= %s AND debut {'<' if couverture else '<='} %s
+                ORDER BY debut
+            """
+
+            points = execute_query(query, (identifiant, type_mesure, granularite, debut, couverture or fin))
+            if couverture:
+                points += self._get_agregats_bruts(type_mesure, granularite, couverture, fin, capteur_id, salle_id)
+            return points
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de la récupération des agrégats: {str(e)}")
+
+    def _get_watermark(self, type_mesure):
+        resultat = execute_query("SELECT derniere_date FROM rollup_watermark WHERE type = %s", (type_mesure,))
+        return resultat[0]['derniere_date'] if resultat else None
+
+    def _get_agregats_bruts(self, type_mesure, granularite, debut, fin, capteur_id, salle_id):
+        if capteur_id is not None:
+            filtre, identifiant = "m.capteur_id = %s", capteur_id
+        else:
+            filtre, identifiant = "c.id_salle = %s AND m.date_update >= c.date_installation", salle_id
+
+        query = f"""
+            SELECT
+                CAST(DATE_FORMAT(m.date_update, '{FORMAT_BUCKET[granularite]}') AS DATETIME) as date_update,
+                COUNT(*) as nb_mesures,
+                MIN(m.valeur) as valeur_min,
+                MAX(m.valeur) as valeur_max,
+                AVG(m.valeur) as valeur_moyenne
+            FROM {type_mesure} m
+            JOIN capteur c ON c.id = m.capteur_id
+            WHERE {filtre} AND m.date_update >= %s AND m.date_update <= %s
+            GROUP BY 1
+            ORDER BY 1
+        """
+
+        return execute_query(query, (identifiant, debut, fin))
+
+    def _get_mesures_brutes(self, type_mesure, debut, fin, capteur_id, salle_id):
+        if capteur_id is not None:
+            filtre, identifiant = "m.capteur_id = %s", capteur_id
+        else:
+            filtre, identifiant = "c.id_salle = %s AND m.date_update >= c.date_installation", salle_id
+
+        query = f"""
+            SELECT
+                m.date_update,
+                1 as nb_mesures,
+                m.valeur as valeur_min,
+                m.valeur as valeur_max,
+                m.valeur as valeur_moyenne
+            FROM {type_mesure} m
+            JOIN capteur c ON c.id = m.capteur_id
+            WHERE {filtre} AND m.date_update >= %s AND m.date_update <= %s
+            ORDER BY m.date_update
+        """
+
+        return execute_query(query, (identifiant, debut, fin))
+
+
+rollup_service = RollupService(fenetre_recalcul=int(os.getenv('ROLLUP_RECALCUL', 3600)))
+
+job = JobArrierePlan(
+    'rollup',
+    rollup_service.executer,
+    intervalle=lambda: int(os.getenv('ROLLUP_INTERVAL', 60)),
+    activation='ROLLUP_JOB_ENABLED'
+)
+
+
+if __name__ == '__main__':
+    import sys
+
+    # python -m services.rollup_service [2025-01-01T00:00:00] : recalcul depuis une date
+    depuis = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    rollup_service.installer()
+    print(f"Agrégation effectuée : {rollup_service.executer(depuis)}")
@@ -0,0 +1,9 @@
+"""
+Point d'entrée WSGI pour les serveurs de production :
+    gunicorn --config src/gunicorn.conf.py wsgi:app
+
+`python src/main.py` reste réservé au développement (serveur Flask mono-processus).
+"""
+from main import create_app
+
+app = create_app()
@@ -0,0 +1,15 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from app.cache import cache_reponses
+
+
+@pytest.fixture(autouse=True)
+def vider_cache_reponses():
+    """Chaque test part d'un cache des réponses vide (les services mockés changent d'un test à l'autre)"""
+    cache_reponses.vider()
+    yield
+    cache_reponses.vider()
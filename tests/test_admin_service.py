@@ -91,13 +91,13 @@ class TestAdminService:
 
     
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_ajouter_capteur_success(self, mock_engine, mock_execute_single_query):
+    @patch('services.admin_service.connexion')
+    def test_ajouter_capteur_success(self, mock_connexion, mock_execute_single_query):
         """Test ajout de capteur - succès"""
         print("TEST: Ajout capteur - DÉBUT")
         # Arrange
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         mock_result = MagicMock()
         mock_result.lastrowid = 4
         mock_conn.execute.return_value = mock_result
@@ -160,10 +160,10 @@ class TestAdminService:
         
         for type_capteur in types_valides:
             with patch('services.admin_service.execute_single_query') as mock_single:
-                with patch('services.admin_service.engine') as mock_engine:
+                with patch('services.admin_service.connexion') as mock_connexion:
                     # Arrange
                     mock_conn = MagicMock()
-                    mock_engine.connect.return_value.__enter__.return_value = mock_conn
+                    mock_connexion.return_value.__enter__.return_value = mock_conn
                     mock_result = MagicMock()
                     mock_result.lastrowid = 1
                     mock_conn.execute.return_value = mock_result
@@ -178,13 +178,14 @@ class TestAdminService:
                     assert result is not None
 
     
+    @patch('services.admin_service.data_versions')
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_desactiver_capteur_success(self, mock_engine, mock_execute_single_query):
-        """Test désactivation de capteur - succès"""
+    @patch('services.admin_service.connexion')
+    def test_desactiver_capteur_success(self, mock_connexion, mock_execute_single_query, mock_versions):
+        """Test désactivation de capteur - succès, version de la table capteur incrémentée"""
         # Arrange
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         
         capteur_actif = self.mock_capteur_complet.copy()
         mock_execute_single_query.return_value = capteur_actif
@@ -197,6 +198,7 @@ class TestAdminService:
         assert result['id'] == 1
         mock_conn.execute.assert_called_once()
         mock_conn.commit.assert_called_once()
+        mock_versions.incrementer.assert_called_once_with('capteur')
 
     @patch('services.admin_service.execute_single_query')
     def test_desactiver_capteur_inexistant(self, mock_execute_single_query):
@@ -224,12 +226,12 @@ class TestAdminService:
 
     
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_reactiver_capteur_success(self, mock_engine, mock_execute_single_query):
+    @patch('services.admin_service.connexion')
+    def test_reactiver_capteur_success(self, mock_connexion, mock_execute_single_query):
         """Test réactivation de capteur - succès"""
         # Arrange
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         
         capteur_inactif = self.mock_capteur_complet.copy()
         capteur_inactif['is_active'] = False
@@ -288,12 +290,12 @@ class TestAdminService:
         assert "Un capteur de type 'temperature' est déjà actif" in str(exc_info.value)
 
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_reactiver_capteur_sans_salle(self, mock_engine, mock_execute_single_query):
+    @patch('services.admin_service.connexion')
+    def test_reactiver_capteur_sans_salle(self, mock_connexion, mock_execute_single_query):
         """Test réactivation de capteur - capteur sans salle assignée"""
         # Arrange
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         
         capteur_sans_salle = self.mock_capteur_complet.copy()
         capteur_sans_salle['is_active'] = False
@@ -310,12 +312,12 @@ class TestAdminService:
 
     
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_supprimer_capteur_success(self, mock_engine, mock_execute_single_query):
+    @patch('services.admin_service.connexion')
+    def test_supprimer_capteur_success(self, mock_connexion, mock_execute_single_query):
         """Test suppression de capteur - succès"""
         # Arrange
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         
         mock_execute_single_query.return_value = self.mock_capteur_complet
         
@@ -324,7 +326,7 @@ class TestAdminService:
         
         # Assert
         assert result is True
-        assert mock_conn.execute.call_count == 4
+        assert mock_conn.execute.call_count == 5
         mock_conn.commit.assert_called_once()
 
     @patch('services.admin_service.execute_single_query')
@@ -339,13 +341,13 @@ class TestAdminService:
         assert "Capteur 999 introuvable" in str(exc_info.value)
 
     @patch('services.admin_service.execute_single_query')
-    @patch('services.admin_service.engine')
-    def test_supprimer_capteur_exception_db(self, mock_engine, mock_execute_single_query):
+    @patch('services.admin_service.connexion')
+    def test_supprimer_capteur_exception_db(self, mock_connexion, mock_execute_single_query):
         """Test suppression de capteur - exception base de données"""
         # Arrange
         mock_execute_single_query.return_value = self.mock_capteur_complet
         mock_conn = MagicMock()
-        mock_engine.connect.return_value.__enter__.return_value = mock_conn
+        mock_connexion.return_value.__enter__.return_value = mock_conn
         mock_conn.execute.side_effect = Exception("Erreur DB")
         
         # Act & Assert
@@ -357,9 +359,9 @@ class TestAdminService:
     def test_workflow_complet_capteur(self):
         """Test du workflow complet : ajouter -> désactiver -> réactiver -> supprimer"""
         with patch('services.admin_service.execute_single_query') as mock_single:
-            with patch('services.admin_service.engine') as mock_engine:
+            with patch('services.admin_service.connexion') as mock_connexion:
                 mock_conn = MagicMock()
-                mock_engine.connect.return_value.__enter__.return_value = mock_conn
+                mock_connexion.return_value.__enter__.return_value = mock_conn
                 mock_result = MagicMock()
                 mock_result.lastrowid = 1
                 mock_conn.execute.return_value = mock_result
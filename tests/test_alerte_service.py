@@ -0,0 +1,304 @@
+import sys
+import os
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask
+from routes.alertes import alertes_bp
+from services.alerte_service import AlerteService
+
+DEBUT = datetime(2025, 1, 15, 10, 0, 0)
+
+SEUILS = {
+    1: {
+        'salle_id': 1,
+        'temperature_basse': 18, 'temperature_haute': 26,
+        'humidite_basse': 30, 'humidite_haute': 70,
+        'pression_basse': None, 'pression_haute': None
+    }
+}
+
+
+def mesure(seconde, valeur, capteur_id=1, salle_id=1, type_mesure='temperature'):
+    return {
+        'capteur_id': capteur_id,
+        'salle_id': salle_id,
+        'type': type_mesure,
+        'valeur': valeur,
+        'date_update': DEBUT + timedelta(seconds=seconde)
+    }
+
+
+class TestAlerteService:
+    """Tests pour le moteur d'alertes de seuils"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = AlerteService(duree_min=120, fraicheur=None)
+        self.service._seuils = SEUILS
+        self.service._expiration_seuils = float('inf')
+
+    def traiter(self, mesures):
+        return [e for e in (self.service.traiter_mesure(m) for m in mesures) if e is not None]
+
+    def test_declenchement_apres_duree_minimale(self):
+        """Test qu'une alerte n'est déclenchée qu'après un dépassement continu de duree_min"""
+        # Act
+        avant = self.traiter([mesure(0, 27), mesure(60, 27.5)])
+        apres = self.traiter([mesure(120, 28)])
+
+        # Assert
+        assert avant == []
+        assert len(apres) == 1
+        assert apres[0]['evenement'] == 'declenchement'
+        assert apres[0]['sens'] == 'haute'
+        assert apres[0]['seuil'] == 26
+        assert apres[0]['date_debut'] == DEBUT
+        assert apres[0]['date_evenement'] == DEBUT + timedelta(seconds=120)
+
+    def test_depassement_interrompu(self):
+        """Test qu'un retour sous le seuil avant duree_min remet le dépassement à zéro"""
+        # Act
+        evenements = self.traiter([mesure(0, 27), mesure(60, 25), mesure(90, 27), mesure(180, 27)])
+
+        # Assert
+        assert evenements == []
+
+    def test_hysteresis(self):
+        """Test que la fin d'alerte exige de repasser sous le seuil moins l'hystérésis"""
+        # Arrange
+        self.traiter([mesure(0, 27), mesure(120, 27)])
+
+        # Act
+        sous_le_seuil = self.traiter([mesure(200, 25.8), mesure(400, 25.8)])
+        fin = self.traiter([mesure(500, 25.4), mesure(620, 25.2)])
+
+        # Assert
+        assert sous_le_seuil == []
+        assert [e['evenement'] for e in fin] == ['fin']
+        assert fin[0]['date_debut'] == DEBUT
+        assert not self.service._etats[(1, 'temperature')].alerte
+
+    def test_oscillation_sans_alerte_repetee(self):
+        """Test qu'une valeur qui oscille autour du seuil ne produit qu'une alerte"""
+        # Arrange
+        self.traiter([mesure(0, 27), mesure(120, 27)])
+
+        # Act
+        evenements = self.traiter([mesure(s, 25.4 if (s // 60) % 2 else 26.3) for s in range(180, 1800, 60)])
+
+        # Assert
+        assert evenements == []
+        assert self.service._etats[(1, 'temperature')].alerte
+
+    def test_moyenne_des_capteurs(self):
+        """Test que l'alerte porte sur la moyenne des dernières valeurs des capteurs de la salle"""
+        # Act
+        evenements = self.traiter([
+            mesure(0, 27, capteur_id=1), mesure(0, 24, capteur_id=2),
+            mesure(130, 27, capteur_id=1),
+            mesure(140, 29, capteur_id=2), mesure(260, 29, capteur_id=2)
+        ])
+
+        # Assert
+        assert len(evenements) == 1
+        assert evenements[0]['valeur'] == 28
+        assert evenements[0]['date_debut'] == DEBUT + timedelta(seconds=140)
+
+    def test_capteur_deplace(self):
+        """Test qu'un capteur changé de salle ne compte plus dans la moyenne de l'ancienne"""
+        # Act
+        self.traiter([mesure(0, 10, capteur_id=1, salle_id=2), mesure(0, 22, capteur_id=2)])
+        self.traiter([mesure(10, 22, capteur_id=1, salle_id=1)])
+
+        # Assert
+        assert self.service._etats[(2, 'temperature')].valeurs == {}
+        assert self.service._etats[(1, 'temperature')].somme == 44
+
+    @patch('services.alerte_service.execute_query')
+    def test_capteur_desactive(self, mock_execute):
+        """Test qu'un capteur désactivé ou sans salle sort de la moyenne à la relecture des capteurs"""
+        # Arrange
+        mock_execute.return_value = [{'id': 2, 'id_salle': 1}]
+        self.service._expiration_capteurs = 0
+        self.traiter([mesure(0, 30, capteur_id=1), mesure(0, 22, capteur_id=2), mesure(0, 22, capteur_id=3)])
+
+        # Act
+        self.service.rafraichir_capteurs()
+
+        # Assert
+        assert self.service._etats[(1, 'temperature')].valeurs == {2: 22}
+        assert self.service._etats[(1, 'temperature')].somme == 22
+        assert list(self.service._salles_capteurs) == [(2, 'temperature')]
+
+    def test_capteur_silencieux_expire(self):
+        """Test qu'une valeur plus ancienne que la fraîcheur ne compte plus dans la moyenne"""
+        # Arrange
+        service = AlerteService(duree_min=120, fraicheur=600)
+        service._seuils = SEUILS
+        service._expiration_seuils = float('inf')
+        maintenant = datetime.now().replace(microsecond=0)
+        service.traiter_mesure(dict(mesure(0, 10, capteur_id=1), date_update=maintenant - timedelta(seconds=590)))
+
+        # Act
+        service.traiter_mesure(dict(mesure(0, 22, capteur_id=2), date_update=maintenant + timedelta(seconds=20)))
+
+        # Assert
+        assert service._etats[(1, 'temperature')].valeurs == {2: 22}
+        assert service._etats[(1, 'temperature')].debut_depassement is None
+
+    def test_rejeu_mesures_anciennes(self):
+        """Test que les dernières mesures anciennes relues au démarrage ne lancent pas de dépassement"""
+        # Arrange
+        service = AlerteService(duree_min=120, fraicheur=600)
+        service._seuils = SEUILS
+        service._expiration_seuils = float('inf')
+        maintenant = datetime.now().replace(microsecond=0)
+
+        # Act
+        rejeu = service.traiter_mesure(dict(mesure(0, 30), date_update=maintenant - timedelta(days=90)))
+        fraiche = service.traiter_mesure(dict(mesure(0, 30), date_update=maintenant))
+
+        # Assert
+        assert (rejeu, fraiche) == (None, None)
+        assert service._etats[(1, 'temperature')].debut_depassement == maintenant
+
+    def test_salle_sans_seuils(self):
+        """Test qu'une salle sans seuils de conformité ne déclenche rien"""
+        # Act
+        evenements = self.traiter([mesure(0, 50, salle_id=3), mesure(300, 50, salle_id=3)])
+
+        # Assert
+        assert evenements == []
+
+    @patch('services.alerte_service.execute_query')
+    def test_reinitialiser_alertes_en_cours(self, mock_execute):
+        """Test que les alertes en cours sont reprises depuis la table au démarrage"""
+        # Arrange
+        mock_execute.return_value = [
+            {'salle_id': 1, 'parametre': 'humidite', 'sens': 'basse', 'date_debut': DEBUT}
+        ]
+
+        # Act
+        self.service.reinitialiser()
+        self.service._seuils = SEUILS
+        self.service._expiration_seuils = float('inf')
+        pendant = self.traiter([mesure(0, 25, type_mesure='humidite')])
+        fin = self.traiter([mesure(10, 40, type_mesure='humidite'), mesure(130, 40, type_mesure='humidite')])
+
+        # Assert
+        assert pendant == []
+        assert [(e['evenement'], e['date_debut']) for e in fin] == [('fin', DEBUT)]
+
+    @patch('services.alerte_service.capteur_service')
+    def test_seuils_en_cache(self, mock_capteur_service):
+        """Test que les seuils ne sont relus qu'à expiration"""
+        # Arrange
+        self.service._expiration_seuils = 0
+        mock_capteur_service.get_seuils_conformite_salles.return_value = SEUILS
+
+        # Act
+        self.traiter([mesure(s, 22) for s in range(100)])
+
+        # Assert
+        mock_capteur_service.get_seuils_conformite_salles.assert_called_once()
+
+    @patch('services.alerte_service.execute_query', return_value=[])
+    @patch('services.alerte_service.execute_many')
+    @patch('services.live_service.execute_query')
+    @patch('services.live_service.execute_single_query', return_value={'id_max': 0})
+    def test_executer_enregistre_evenements(self, mock_single, mock_execute, mock_many, mock_capteurs):
+        """Test que les événements d'une exécution sont enregistrés en un seul lot"""
+        # Arrange
+        mock_execute.return_value = [mesure(0, 15), mesure(120, 15), mesure(120, 75, capteur_id=2, type_mesure='humidite')]
+
+        # Act
+        evenements = self.service.executer()
+
+        # Assert
+        assert [(e['parametre'], e['sens']) for e in evenements] == [('temperature', 'basse')]
+        mock_many.assert_called_once()
+        assert mock_many.call_args[0][0][0][1] == evenements
+
+    @patch('services.alerte_service.execute_query', return_value=[])
+    @patch('services.alerte_service.execute_many')
+    @patch('services.live_service.execute_query')
+    @patch('services.live_service.execute_single_query', return_value={'id_max': 0})
+    def test_executer_echec_ecriture_restaure_etat(self, mock_single, mock_execute, mock_many, mock_capteurs):
+        """Test qu'un enregistrement échoué ne perd pas l'événement : état et position restaurés"""
+        # Arrange
+        mock_execute.return_value = [mesure(0, 15), mesure(120, 15)]
+        mock_many.side_effect = [Exception("Erreur DB"), 2]
+
+        # Act
+        with pytest.raises(Exception) as exc_info:
+            self.service.executer()
+        etats_apres_echec = dict(self.service._etats)
+        watermark_apres_echec = self.service.suivi.watermark
+        evenements = self.service.executer()
+
+        # Assert
+        assert "Erreur lors de l'évaluation des alertes" in str(exc_info.value)
+        assert etats_apres_echec == {}
+        assert watermark_apres_echec is None
+        assert [(e['parametre'], e['evenement']) for e in evenements] == [('temperature', 'declenchement')]
+        assert mock_many.call_args_list[0] == mock_many.call_args_list[1]
+
+
+class TestRoutesAlertes:
+    """Tests pour GET /api/alertes"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.app = Flask(__name__)
+        self.app.register_blueprint(alertes_bp)
+        self.client = self.app.test_client()
+
+    @patch('routes.alertes.alerte_service')
+    def test_get_alertes(self, mock_service):
+        """Test GET /api/alertes avec filtres"""
+        # Arrange
+        mock_service.get_alertes.return_value = [{'id': 3, 'salle_id': 1, 'evenement': 'declenchement'}]
+
+        # Act
+        response = self.client.get('/api/alertes?salle_id=1&actives=true&depuis=2025-01-15T10:00:00&limit=10')
+
+        # Assert
+        assert response.status_code == 200
+        assert response.get_json()['data'] == [{'id': 3, 'salle_id': 1, 'evenement': 'declenchement'}]
+        mock_service.get_alertes.assert_called_once_with(
+            salle_id=1, parametre=None, actives=True, depuis=DEBUT, limit=10
+        )
+
+    @patch('routes.alertes.alerte_service')
+    def test_get_alertes_parametres_invalides(self, mock_service):
+        """Test GET /api/alertes - paramètres invalides"""
+        # Act
+        reponses = [
+            self.client.get('/api/alertes?parametre=co2'),
+            self.client.get('/api/alertes?limit=5000'),
+            self.client.get('/api/alertes?depuis=hier')
+        ]
+
+        # Assert
+        assert [r.status_code for r in reponses] == [400, 400, 400]
+        mock_service.get_alertes.assert_not_called()
+
+    @patch('routes.alertes.notification_service')
+    def test_get_notifications(self, mock_service):
+        """Test GET /api/alertes/notifications"""
+        # Arrange
+        mock_service.get_notifications.return_value = [{'id': 1, 'statut': 'echec', 'tentatives': 8}]
+
+        # Act
+        response = self.client.get('/api/alertes/notifications?statut=echec')
+        invalide = self.client.get('/api/alertes/notifications?statut=perdue')
+
+        # Assert
+        assert response.status_code == 200
+        assert response.get_json()['data'] == [{'id': 1, 'statut': 'echec', 'tentatives': 8}]
+        mock_service.get_notifications.assert_called_once_with(statut='echec', limit=100)
+        assert invalide.status_code == 400
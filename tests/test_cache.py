@@ -0,0 +1,354 @@
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, jsonify
+from app.cache import CacheReponses, cache_route, cache_service, cache_reponses, prechauffer
+from app.versions import DataVersions
+
+
+class TestCacheReponses:
+    """Tests pour le cache LRU des réponses"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.versions = DataVersions(tempfile.mkdtemp())
+        self.patcher = patch('app.cache.data_versions', self.versions)
+        self.patcher.start()
+        self.cache = CacheReponses(taille_max=2)
+        self.versions.abonner(self.cache.invalider)
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    def test_hit_apres_premier_calcul(self):
+        """Test qu'un second appel est servi depuis le cache"""
+        # Arrange
+        appels = []
+        calcul = lambda: appels.append(1) or 'valeur'
+
+        # Act
+        premier = self.cache.memoriser('cle', calcul, ttl=60, tags=('salle',))
+        second = self.cache.memoriser('cle', calcul, ttl=60, tags=('salle',))
+
+        # Assert
+        assert premier == second == 'valeur'
+        assert len(appels) == 1
+        assert self.cache.cache_info()[:2] == (1, 1)
+
+    def test_expiration_ttl(self):
+        """Test qu'une entrée expirée est recalculée"""
+        # Arrange
+        with patch('app.cache.time.monotonic', return_value=100):
+            self.cache.set('cle', 'ancienne', ttl=5)
+
+        # Act
+        with patch('app.cache.time.monotonic', return_value=106):
+            trouve, _ = self.cache.get('cle')
+
+        # Assert
+        assert not trouve
+        assert self.cache.cache_info().taille == 0
+
+    def test_eviction_lru(self):
+        """Test que l'entrée la moins récemment lue est évincée au-delà de taille_max"""
+        # Arrange
+        self.cache.set('a', 1, ttl=60)
+        self.cache.set('b', 2, ttl=60)
+        self.cache.get('a')
+
+        # Act
+        self.cache.set('c', 3, ttl=60)
+
+        # Assert
+        assert self.cache.get('a') == (True, 1)
+        assert self.cache.get('b') == (False, None)
+        assert self.cache.get('c') == (True, 3)
+
+    def test_invalidation_par_tag(self):
+        """Test qu'une écriture évince les entrées du tag et seulement celles-là"""
+        # Arrange
+        self.cache.set('salles', 1, ttl=60, tags=('salle',))
+        self.cache.set('capteurs', 2, ttl=60, tags=('capteur',))
+
+        # Act
+        self.versions.incrementer('salle')
+
+        # Assert
+        assert self.cache.cache_info().taille == 1
+        assert self.cache.get('salles') == (False, None)
+        assert self.cache.get('capteurs') == (True, 2)
+
+    def test_invalidation_par_autre_worker(self):
+        """Test qu'une version changée hors du processus rend l'entrée périmée"""
+        # Arrange
+        self.cache.set('salles', 1, ttl=60, tags=('salle',))
+        autre_worker = DataVersions(self.versions.repertoire)
+
+        # Act
+        autre_worker.incrementer('salle')
+
+        # Assert
+        assert self.cache.get('salles') == (False, None)
+
+    def test_ecriture_pendant_calcul(self):
+        """Test qu'une écriture survenue pendant le calcul n'est pas masquée par le cache"""
+        # Arrange
+        def calcul():
+            self.versions.incrementer('salle')
+            return 'calculée avant écriture'
+
+        # Act
+        self.cache.memoriser('cle', calcul, ttl=60, tags=('salle',))
+
+        # Assert
+        assert self.cache.get('cle') == (False, None)
+
+    def test_cache_inactif(self):
+        """Test qu'un cache désactivé exécute chaque appel"""
+        # Arrange
+        self.cache.actif = False
+        appels = []
+
+        # Act
+        self.cache.memoriser('cle', lambda: appels.append(1), ttl=60)
+        self.cache.memoriser('cle', lambda: appels.append(1), ttl=60)
+
+        # Assert
+        assert len(appels) == 2
+
+
+class TestDecorateursCache:
+    """Tests pour les décorateurs cache_service et cache_route"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.appels = 0
+        self.app = Flask(__name__)
+
+        @self.app.route('/moyennes/<int:salle_id>')
+        @cache_route(5, 'salle')
+        def moyennes(salle_id):
+            self.appels += 1
+            if salle_id == 0:
+                return jsonify({'erreur': True}), 404
+            return jsonify({'salle_id': salle_id, 'appels': self.appels})
+
+        self.client = self.app.test_client()
+
+    def test_cache_route(self):
+        """Test qu'une réponse 200 est servie depuis le cache pour la même URL"""
+        # Act
+        premiere = self.client.get('/moyennes/1')
+        seconde = self.client.get('/moyennes/1')
+        autre = self.client.get('/moyennes/1?limit=5')
+
+        # Assert
+        assert seconde.status_code == 200
+        assert seconde.get_json() == premiere.get_json() == {'salle_id': 1, 'appels': 1}
+        assert seconde.mimetype == 'application/json'
+        assert autre.get_json()['appels'] == 2
+
+    def test_cache_route_erreurs_non_cachees(self):
+        """Test que les réponses d'erreur ne sont pas mises en cache"""
+        # Act
+        self.client.get('/moyennes/0')
+        self.client.get('/moyennes/0')
+
+        # Assert
+        assert self.appels == 2
+
+    def test_cache_service_par_arguments(self):
+        """Test que le résultat d'une méthode est mis en cache par arguments, hors self"""
+        # Arrange
+        class Service:
+            def __init__(self):
+                self.appels = 0
+
+            @cache_service(60, 'salle')
+            def get_salle(self, salle_id, limit=10):
+                self.appels += 1
+                return {'id': salle_id}
+
+        service = Service()
+
+        # Act
+        service.get_salle(1)
+        service.get_salle(1)
+        service.get_salle(2)
+        Service().get_salle(1)
+
+        # Assert
+        assert service.appels == 2
+        assert cache_reponses.cache_info().taille == 2
+
+    def test_cache_service_arguments_non_hashables(self):
+        """Test qu'un argument non hashable contourne le cache"""
+        # Arrange
+        class Service:
+            appels = 0
+
+            @cache_service(60)
+            def filtrer(self, ids):
+                Service.appels += 1
+                return ids
+
+        # Act
+        Service().filtrer([1, 2])
+        Service().filtrer([1, 2])
+
+        # Assert
+        assert Service.appels == 2
+
+
+class TestStaleWhileRevalidate:
+    """Tests pour le service des valeurs périmées pendant leur recalcul en arrière-plan"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.versions = DataVersions(tempfile.mkdtemp())
+        self.patcher = patch('app.cache.data_versions', self.versions)
+        self.patcher.start()
+        self.cache = CacheReponses()
+        self.maintenant = 100
+        self.horloge = patch('app.cache.time.monotonic', side_effect=lambda: self.maintenant)
+        self.horloge.start()
+        self.appels = 0
+
+    def teardown_method(self):
+        self.horloge.stop()
+        self.patcher.stop()
+
+    def calcul(self):
+        self.appels += 1
+        return f'valeur {self.appels}'
+
+    def attendre_rafraichissement(self, delai=2):
+        fin = time.perf_counter() + delai
+        while self.cache._rafraichissements and time.perf_counter() < fin:
+            time.sleep(0.001)
+
+    def memoriser(self):
+        return self.cache.memoriser('conformite', self.calcul, ttl=10, tags=('salle',), obsolescence_max=60)
+
+    def test_valeur_perimee_servie_puis_rafraichie(self):
+        """Test qu'une valeur périmée est renvoyée aussitôt et recalculée en arrière-plan"""
+        # Arrange
+        self.memoriser()
+        self.maintenant = 115
+
+        # Act
+        perimee = self.memoriser()
+        self.attendre_rafraichissement()
+        rafraichie = self.memoriser()
+
+        # Assert
+        assert perimee == 'valeur 1'
+        assert rafraichie == 'valeur 2'
+        assert self.appels == 2
+        assert self.cache.cache_info().servies_perimees == 1
+
+    def test_obsolescence_maximale(self):
+        """Test qu'au-delà de l'obsolescence maximale, l'appel attend le recalcul"""
+        # Arrange
+        self.memoriser()
+        self.maintenant = 171
+
+        # Act
+        valeur = self.memoriser()
+
+        # Assert
+        assert valeur == 'valeur 2'
+        assert self.cache.cache_info().servies_perimees == 0
+
+    def test_ecriture_non_masquee(self):
+        """Test qu'une valeur invalidée par une écriture n'est jamais servie périmée"""
+        # Arrange
+        self.memoriser()
+        self.maintenant = 115
+        self.versions.incrementer('salle')
+
+        # Act
+        valeur = self.memoriser()
+
+        # Assert
+        assert valeur == 'valeur 2'
+
+    def test_erreur_de_rafraichissement(self):
+        """Test qu'un rafraîchissement en échec laisse la valeur périmée en cache"""
+        # Arrange
+        self.memoriser()
+        self.maintenant = 115
+
+        def calcul_en_erreur():
+            raise Exception("Erreur DB")
+
+        # Act
+        self.cache.memoriser('conformite', calcul_en_erreur, ttl=10, tags=('salle',), obsolescence_max=60)
+        self.attendre_rafraichissement()
+        valeur = self.memoriser()
+
+        # Assert
+        assert valeur == 'valeur 1'
+
+
+class TestPrechauffage:
+    """Tests pour la normalisation des clés et le préchauffage du cache"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        class Service:
+            appels = 0
+
+            @cache_service(10, 'salle')
+            def verifier(self, limit=10):
+                Service.appels += 1
+                return [{'limit': limit}]
+
+        self.Service = Service
+
+    def test_arguments_normalises(self):
+        """Test que f(), f(10) et f(limit=10) partagent la même entrée"""
+        # Arrange
+        service = self.Service()
+
+        # Act
+        service.verifier()
+        service.verifier(10)
+        service.verifier(limit=10)
+        service.verifier(20)
+
+        # Assert
+        assert self.Service.appels == 2
+
+    def test_prechauffer(self):
+        """Test que le préchauffage remplit le cache utilisé par les requêtes"""
+        # Arrange
+        service = self.Service()
+
+        # Act
+        with patch.dict('app.cache.PRECHAUFFAGES', {'conformite': service.verifier}), \
+                patch.dict(os.environ, {'CACHE_PREWARM': 'conformite, inconnu'}):
+            durees = prechauffer()
+        service.verifier(limit=10)
+
+        # Assert
+        assert list(durees) == ['conformite']
+        assert self.Service.appels == 1
+
+    def test_prechauffer_erreur(self):
+        """Test qu'une erreur de préchauffage n'est pas propagée"""
+        # Arrange
+        def calcul():
+            raise Exception("Base indisponible")
+
+        # Act
+        with patch.dict('app.cache.PRECHAUFFAGES', {'conformite': calcul}):
+            durees = prechauffer(['conformite'])
+
+        # Assert
+        assert durees == {}
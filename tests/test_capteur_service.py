@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -162,6 +163,27 @@ class TestCapteurService:
         assert "WHERE s.id = %s AND c.type_capteur = 'temperature'" in call_args[0]
         assert call_args[1] == (1, 5)
 
+    @patch('services.capteur_service.rollup_service')
+    def test_get_historique_reduit_a_max_points(self, mock_rollup_service):
+        """Test historique sur une période - agrégats choisis selon la résolution puis réduits"""
+        # Arrange
+        debut = datetime(2025, 1, 1)
+        fin = datetime(2025, 1, 8)
+        mock_rollup_service.get_agregats.return_value = [
+            {'date_update': debut + timedelta(minutes=i), 'nb_mesures': 2,
+             'valeur_min': 20, 'valeur_max': 22, 'valeur_moyenne': 21}
+            for i in range(0, 7 * 24 * 60)
+        ]
+        
+        # Act
+        result = self.service.get_historique('temperature', debut, fin, 500, salle_id=1)
+        
+        # Assert
+        assert len(result) == 500
+        mock_rollup_service.get_agregats.assert_called_once_with(
+            'temperature', debut, fin, 1209, capteur_id=None, salle_id=1
+        )
+
     @patch('services.capteur_service.execute_query')
     def test_get_humidite_by_salle_success(self, mock_execute_query):
         """Test récupération de l'humidité d'une salle - succès"""
@@ -267,6 +289,60 @@ class TestCapteurService:
         # Assert
         assert result is None
 
+    @patch('services.capteur_service.execute_query')
+    def test_get_dernieres_donnees_by_capteurs_derniere_mesure(self, mock_execute_query):
+        """Test données de plusieurs capteurs - dernière mesure lue en une requête"""
+        # Arrange
+        mock_execute_query.side_effect = [
+            [{**self.mock_capteur, 'id': 1}, {**self.mock_capteur, 'id': 3, 'type_capteur': 'humidite'}],
+            [
+                {'capteur_id': 3, 'valeur': 55.0, 'unite': '%', 'date_update': '2025-01-01 12:00:00'},
+                {'capteur_id': 1, 'valeur': 21.5, 'unite': '°C', 'date_update': '2025-01-01 12:00:00'}
+            ]
+        ]
+
+        # Act
+        result = self.service.get_dernieres_donnees_by_capteurs([3, 2, 1], 1)
+
+        # Assert
+        assert [r['capteur']['id'] for r in result] == [3, 1]
+        assert result[0]['donnees'] == [{'valeur': 55.0, 'unite': '%', 'date_update': '2025-01-01 12:00:00'}]
+        assert mock_execute_query.call_count == 2
+        assert 'capteur_derniere_mesure' in mock_execute_query.call_args[0][0]
+        assert mock_execute_query.call_args_list[0][0][1] == [3, 2, 1, 1]
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_dernieres_donnees_by_capteurs_une_requete_par_table(self, mock_execute_query):
+        """Test données de plusieurs capteurs - une requête par table de mesures concernée"""
+        # Arrange
+        capteurs = [{**self.mock_capteur, 'id': i, 'type_capteur': 'temperature' if i % 2 else 'pression'}
+                    for i in range(1, 201)]
+        mock_execute_query.side_effect = [capteurs, [], []]
+
+        # Act
+        result = self.service.get_dernieres_donnees_by_capteurs(list(range(1, 201)), 5)
+
+        # Assert
+        assert len(result) == 200
+        assert mock_execute_query.call_count == 3
+        requetes = [appel[0][0] for appel in mock_execute_query.call_args_list[1:]]
+        assert 'FROM temperature m' in requetes[0] and 'ROW_NUMBER()' in requetes[0]
+        assert 'FROM pression m' in requetes[1]
+        assert mock_execute_query.call_args_list[1][0][1][-1] == 5
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_dernieres_donnees_by_capteurs_aucun(self, mock_execute_query):
+        """Test données de plusieurs capteurs - aucun capteur actif trouvé"""
+        # Arrange
+        mock_execute_query.return_value = []
+
+        # Act
+        result = self.service.get_dernieres_donnees_by_capteurs([998, 999])
+
+        # Assert
+        assert result == []
+        assert mock_execute_query.call_count == 1
+
     @patch('services.capteur_service.execute_single_query')
     @patch('services.capteur_service.execute_query')
     def test_get_dernieres_donnees_by_capteur_humidite(self, mock_execute_query, mock_execute_single_query):
@@ -540,26 +616,29 @@ class TestCapteurService:
         assert result['details']['temperature']['seuil_min'] is None
         assert result['details']['humidite']['seuil_max'] is None
 
-    @patch('services.capteur_service.CapteurService.get_seuils_conformite_by_salle')
-    @patch('services.capteur_service.CapteurService.get_moyennes_dernieres_donnees_by_salle')
+    @patch('services.capteur_service.CapteurService.get_capteurs_salles_actives')
+    @patch('services.capteur_service.CapteurService.get_seuils_conformite_salles')
+    @patch('services.capteur_service.CapteurService.get_moyennes_salles')
     @patch('services.capteur_service.CapteurService.get_salles_actives')
-    def test_verifier_conformite_salles_success(self, mock_get_salles, mock_get_moyennes, mock_get_seuils):
+    def test_verifier_conformite_salles_success(self, mock_get_salles, mock_get_moyennes, mock_get_seuils, mock_get_capteurs):
         """Test vérification conformité de toutes les salles - succès"""
         # Arrange
         mock_get_salles.return_value = [self.mock_salle]
-        mock_get_moyennes.return_value = {
+        mock_get_moyennes.return_value = [{
+            'salle_id': 1,
             'moyenne_temperature': 25.0,
             'moyenne_humidite': 60.0,
             'moyenne_pression': 1013.0
-        }
-        mock_get_seuils.return_value = {
+        }]
+        mock_get_seuils.return_value = {1: {
             'temperature_haute': 28.0,
             'temperature_basse': 18.0,
             'humidite_haute': 70.0,
             'humidite_basse': 40.0,
             'pression_haute': 1020.0,
             'pression_basse': 1000.0
-        }
+        }}
+        mock_get_capteurs.return_value = {1: [self.mock_capteur]}
         
         # Act
         result = self.service.verifier_conformite_salles(5)
@@ -569,17 +648,22 @@ class TestCapteurService:
         assert result[0]['salle'] == self.mock_salle
         assert result[0]['statut'] == 'CONFORME'
         assert result[0]['alertes'] == []
-        mock_get_moyennes.assert_called_once_with(1, 5)
-        mock_get_seuils.assert_called_once_with(1)
-
-    @patch('services.capteur_service.CapteurService.get_seuils_conformite_by_salle')
-    @patch('services.capteur_service.CapteurService.get_moyennes_dernieres_donnees_by_salle')
+        assert result[0]['capteurs'] == [self.mock_capteur]
+        mock_get_moyennes.assert_called_once_with()
+        mock_get_seuils.assert_called_once_with()
+        mock_get_capteurs.assert_called_once_with()
+
+    @patch('services.capteur_service.CapteurService.get_capteurs_salles_actives')
+    @patch('services.capteur_service.CapteurService.get_seuils_conformite_salles')
+    @patch('services.capteur_service.CapteurService.get_moyennes_salles')
     @patch('services.capteur_service.CapteurService.get_salles_actives')
-    def test_verifier_conformite_salles_aucune_donnee(self, mock_get_salles, mock_get_moyennes, mock_get_seuils):
+    def test_verifier_conformite_salles_aucune_donnee(self, mock_get_salles, mock_get_moyennes, mock_get_seuils, mock_get_capteurs):
         """Test vérification conformité - aucune donnée"""
         # Arrange
         mock_get_salles.return_value = [self.mock_salle]
-        mock_get_moyennes.return_value = None
+        mock_get_moyennes.return_value = []
+        mock_get_seuils.return_value = {}
+        mock_get_capteurs.return_value = {}
         
         # Act
         result = self.service.verifier_conformite_salles()
@@ -588,20 +672,22 @@ class TestCapteurService:
         assert len(result) == 1
         assert result[0]['statut'] == 'AUCUNE_DONNEE'
         assert 'Aucune donnée de capteur disponible' in result[0]['alertes']
-        mock_get_seuils.assert_not_called()
 
-    @patch('services.capteur_service.CapteurService.get_seuils_conformite_by_salle')
-    @patch('services.capteur_service.CapteurService.get_moyennes_dernieres_donnees_by_salle')
+    @patch('services.capteur_service.CapteurService.get_capteurs_salles_actives')
+    @patch('services.capteur_service.CapteurService.get_seuils_conformite_salles')
+    @patch('services.capteur_service.CapteurService.get_moyennes_salles')
     @patch('services.capteur_service.CapteurService.get_salles_actives')
-    def test_verifier_conformite_salles_seuils_non_definis(self, mock_get_salles, mock_get_moyennes, mock_get_seuils):
+    def test_verifier_conformite_salles_seuils_non_definis(self, mock_get_salles, mock_get_moyennes, mock_get_seuils, mock_get_capteurs):
         """Test vérification conformité - seuils non définis"""
         # Arrange
         mock_get_salles.return_value = [self.mock_salle]
-        mock_get_moyennes.return_value = {
+        mock_get_moyennes.return_value = [{
+            'salle_id': 1,
             'moyenne_temperature': 25.0,
             'moyenne_humidite': 60.0
-        }
-        mock_get_seuils.return_value = None
+        }]
+        mock_get_seuils.return_value = {}
+        mock_get_capteurs.return_value = {}
         
         # Act
         result = self.service.verifier_conformite_salles()
@@ -610,6 +696,92 @@ class TestCapteurService:
         assert len(result) == 1
         assert result[0]['statut'] == 'SEUILS_NON_DEFINIS'
         assert 'Seuils de conformité non définis' in result[0]['alertes']
+        assert result[0]['capteurs'] == []
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_moyennes_salles_une_requete(self, mock_execute_query):
+        """Test moyennes de plusieurs salles - une seule requête groupée filtrée"""
+        # Arrange
+        mock_execute_query.return_value = [{'salle_id': 1, 'moyenne_temperature': 21.5}, {'salle_id': 2}]
+
+        # Act
+        result = self.service.get_moyennes_salles(salle_ids=[1, 2, 3], batiments=['A'])
+
+        # Assert
+        assert result == mock_execute_query.return_value
+        query, params = mock_execute_query.call_args[0]
+        assert "s.id IN (%s, %s, %s, %s)" in query
+        assert "s.batiment IN (%s)" in query
+        assert "GROUP BY s.id, s.nom, s.batiment, s.etage" in query
+        assert params == [1, 2, 3, 3, 'A']
+        assert mock_execute_query.call_count == 1
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_moyennes_salles_sans_filtre(self, mock_execute_query):
+        """Test moyennes de plusieurs salles - toutes les salles actives sans filtre"""
+        # Arrange
+        mock_execute_query.return_value = []
+
+        # Act
+        self.service.get_moyennes_salles()
+
+        # Assert
+        query, params = mock_execute_query.call_args[0]
+        assert "WHERE s.etat = 'active'\n" in query
+        assert params is None
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_seuils_conformite_salles_garde_le_plus_recent(self, mock_execute_query):
+        """Test seuils de toutes les salles - seul le seuil le plus récent est conservé"""
+        # Arrange
+        mock_execute_query.return_value = [
+            {'id': 3, 'salle_id': 1, 'date_debut': '2025-06-01 00:00:00'},
+            {'id': 1, 'salle_id': 1, 'date_debut': '2025-01-01 00:00:00'},
+            {'id': 2, 'salle_id': 2, 'date_debut': '2025-01-01 00:00:00'}
+        ]
+        
+        # Act
+        result = self.service.get_seuils_conformite_salles()
+        
+        # Assert
+        assert result[1]['id'] == 3
+        assert result[2]['id'] == 2
+        call_args = mock_execute_query.call_args[0]
+        assert "ORDER BY salle_id, date_debut DESC" in call_args[0]
+
+    @patch('services.capteur_service.data_versions')
+    @patch('services.capteur_service.execute_query')
+    def test_get_seuils_conformite_salles_incremente_version_si_modifies(self, mock_execute_query, mock_versions):
+        """Test seuils de toutes les salles - une modification invalide le tag 'conformite'"""
+        # Arrange
+        seuil = {'id': 1, 'salle_id': 1, 'temperature_haute': 26, 'date_debut': '2025-01-01 00:00:00'}
+        mock_execute_query.side_effect = [[seuil], [seuil], [{**seuil, 'temperature_haute': 24}]]
+        
+        # Act
+        self.service.get_seuils_conformite_salles()
+        self.service.get_seuils_conformite_salles()
+        mock_versions.incrementer.assert_not_called()
+        self.service.get_seuils_conformite_salles()
+        
+        # Assert
+        mock_versions.incrementer.assert_called_once_with('conformite')
+
+    @patch('services.capteur_service.execute_query')
+    def test_get_capteurs_salles_actives_groupes_par_salle(self, mock_execute_query):
+        """Test capteurs de toutes les salles - regroupement par salle"""
+        # Arrange
+        mock_execute_query.return_value = [
+            {**self.mock_capteur, 'id_salle': 1},
+            {**self.mock_capteur, 'id': 2, 'id_salle': 2}
+        ]
+        
+        # Act
+        result = self.service.get_capteurs_salles_actives()
+        
+        # Assert
+        assert [c['id'] for c in result[1]] == [1]
+        assert [c['id'] for c in result[2]] == [2]
+        assert 'id_salle' not in result[2][0]
 
     @patch('services.capteur_service.CapteurService.get_salles_actives')
     def test_verifier_conformite_salles_aucune_salle(self, mock_get_salles):
@@ -0,0 +1,90 @@
+import gzip
+import json
+import sys
+import os
+import zlib
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, Response, jsonify
+from app.compression import Compression, encodages_acceptes
+
+
+class TestCompression:
+    """Tests pour la compression négociée des réponses"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.app = Flask(__name__)
+        Compression(niveau_gzip=6, taille_min=200).init_app(self.app)
+        self.lignes = [{'salle_nom': 'A01', 'batiment': 'A', 'etage': 0, 'valeur': i} for i in range(200)]
+
+        @self.app.route('/historique')
+        def historique():
+            return jsonify(success=True, data=self.lignes)
+
+        @self.app.route('/petit')
+        def petit():
+            return jsonify(success=True)
+
+        @self.app.route('/flux')
+        def flux():
+            def generer():
+                for i in range(3):
+                    yield json.dumps({'valeur': i}) + '\n'
+            return Response(generer(), mimetype='application/x-ndjson')
+
+        self.client = self.app.test_client()
+
+    def test_gzip_au_dela_du_seuil(self):
+        """Test gzip - réponse compressée, Vary et Content-Length mis à jour"""
+        # Act
+        response = self.client.get('/historique', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        # Assert
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert json.loads(gzip.decompress(response.data))['data'] == self.lignes
+
+    def test_pas_de_compression_sous_le_seuil_ou_sans_accept(self):
+        """Test seuil minimal et client sans Accept-Encoding"""
+        # Act
+        petit = self.client.get('/petit', headers={'Accept-Encoding': 'gzip'})
+        sans_accept = self.client.get('/historique')
+        refuse = self.client.get('/historique', headers={'Accept-Encoding': 'gzip;q=0'})
+
+        # Assert
+        assert 'Content-Encoding' not in petit.headers
+        assert 'Content-Encoding' not in sans_accept.headers
+        assert 'Content-Encoding' not in refuse.headers
+
+    def test_flux_compresse_par_morceaux(self):
+        """Test réponse streamée - chaque morceau est décompressible dès sa réception"""
+        # Act
+        response = self.client.get('/flux', headers={'Accept-Encoding': 'gzip'})
+        morceaux = list(response.response)
+
+        # Assert
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        decompresseur = zlib.decompressobj(31)
+        assert decompresseur.decompress(morceaux[0]) == b'{"valeur": 0}\n'
+        texte = decompresseur.decompress(b''.join(morceaux[1:]))
+        assert texte == b'{"valeur": 1}\n{"valeur": 2}\n'
+
+    def test_choix_encodage(self):
+        """Test négociation - brotli préféré s'il est disponible, poids q respectés"""
+        compression = Compression()
+
+        with patch('app.compression.brotli', object()):
+            assert compression.choisir_encodage('gzip, deflate, br') == 'br'
+            assert compression.choisir_encodage('br;q=0.5, gzip') == 'gzip'
+        with patch('app.compression.brotli', None):
+            assert compression.choisir_encodage('br') is None
+            assert compression.choisir_encodage('*') == 'gzip'
+
+    def test_encodages_acceptes(self):
+        """Test lecture de l'en-tête Accept-Encoding"""
+        assert encodages_acceptes('gzip;q=0.8, BR, identity;q=abc') == {'gzip': 0.8, 'br': 1.0, 'identity': 0.0}
@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.derniere_mesure_service import DerniereMesureService, CREATE_TRIGGER_QUERY
+
+
+class TestDerniereMesureService:
+    """Tests pour la table matérialisée capteur_derniere_mesure"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = DerniereMesureService()
+
+    def _mock_engine(self, mock_engine):
+        conn = MagicMock()
+        mock_engine.begin.return_value.__enter__.return_value = conn
+        return conn
+
+    @patch('services.derniere_mesure_service.engine')
+    def test_installer_cree_table_et_triggers(self, mock_engine):
+        """Test installation - table puis un trigger par table de mesures"""
+        # Arrange
+        conn = self._mock_engine(mock_engine)
+
+        # Act
+        result = self.service.installer()
+
+        # Assert
+        assert result is True
+        requetes = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert len(requetes) == 8
+        assert "CREATE TABLE IF NOT EXISTS capteur_derniere_mesure" in requetes[0]
+        assert "CREATE TABLE IF NOT EXISTS mesure_flux" in requetes[1]
+        assert "AFTER INSERT ON temperature" in requetes[2]
+        assert "trg_temperature_flux" in requetes[3]
+        assert "AFTER INSERT ON humidite" in requetes[4]
+        assert "INSERT INTO mesure_flux" in requetes[5]
+        assert "AFTER INSERT ON pression" in requetes[6]
+        assert "'pression', NEW.valeur" in requetes[7]
+
+    def test_trigger_ne_remplace_pas_par_mesure_plus_ancienne(self):
+        """Test trigger - une mesure plus ancienne n'écrase pas la dernière mesure"""
+        query = CREATE_TRIGGER_QUERY.format(type_mesure='temperature')
+
+        assert "VALUES (NEW.capteur_id, 'temperature', NEW.valeur, NEW.unite, NEW.date_update)" in query
+        assert "IF(VALUES(date_update) >= date_update, VALUES(valeur), valeur)" in query
+        assert query.rstrip().endswith("date_update = GREATEST(date_update, VALUES(date_update))")
+
+    @patch('services.derniere_mesure_service.engine')
+    def test_reconstruire_success(self, mock_engine):
+        """Test reconstruction depuis l'historique - succès"""
+        # Arrange
+        conn = self._mock_engine(mock_engine)
+        conn.execute.return_value.scalar.return_value = 12
+
+        # Act
+        result = self.service.reconstruire()
+
+        # Assert
+        assert result == 12
+        requetes = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert requetes[0] == "DELETE FROM capteur_derniere_mesure"
+        assert "FROM temperature m" in requetes[1]
+        assert "FROM humidite m" in requetes[2]
+        assert "FROM pression m" in requetes[3]
+
+    @patch('services.derniere_mesure_service.engine')
+    def test_reconstruire_exception(self, mock_engine):
+        """Test reconstruction - exception"""
+        # Arrange
+        mock_engine.begin.side_effect = Exception("Erreur DB")
+
+        # Act & Assert
+        with pytest.raises(Exception) as exc_info:
+            self.service.reconstruire()
+        assert "Erreur lors de la reconstruction de capteur_derniere_mesure" in str(exc_info.value)
+
+    @patch('services.derniere_mesure_service.engine')
+    def test_purger_flux(self, mock_engine):
+        """Test purge du journal mesure_flux - lignes plus anciennes que la rétention"""
+        # Arrange
+        conn = self._mock_engine(mock_engine)
+        conn.execute.return_value.rowcount = 42
+
+        # Act
+        result = self.service.purger_flux(retention=600, limite=500)
+
+        # Assert
+        assert result == 42
+        query, params = conn.execute.call_args.args
+        assert "DELETE FROM mesure_flux" in str(query)
+        assert params == {'retention': 600, 'limite': 500}
@@ -0,0 +1,80 @@
+import sys
+import os
+import math
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.downsampling import moyenne_par_intervalle, lttb
+
+
+class TestDownsampling:
+    """Tests pour la réduction du nombre de points d'un historique"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.debut = datetime(2025, 1, 1)
+        self.points = [
+            {
+                'date_update': self.debut + timedelta(minutes=i),
+                'nb_mesures': 1,
+                'valeur_min': None,
+                'valeur_max': None,
+                'valeur_moyenne': 20 + 5 * math.sin(i / 50)
+            }
+            for i in range(10000)
+        ]
+        self.fin = self.debut + timedelta(minutes=10000)
+
+    def test_moyenne_par_intervalle_borne_le_nombre_de_points(self):
+        """Test moyenne par intervalle - au plus max_points points"""
+        result = list(moyenne_par_intervalle(iter(self.points), self.debut, self.fin, 500))
+
+        assert len(result) == 500
+        assert sum(p['nb_mesures'] for p in result) == 10000
+        assert all(p['valeur_min'] <= p['valeur_moyenne'] <= p['valeur_max'] for p in result)
+
+    def test_moyenne_par_intervalle_ponderee(self):
+        """Test moyenne par intervalle - pondération par nb_mesures des agrégats"""
+        points = [
+            {'date_update': self.debut, 'nb_mesures': 3, 'valeur_min': 9, 'valeur_max': 11, 'valeur_moyenne': 10},
+            {'date_update': self.debut + timedelta(minutes=1), 'nb_mesures': 1, 'valeur_min': 30, 'valeur_max': 30, 'valeur_moyenne': 30},
+        ]
+
+        result = list(moyenne_par_intervalle(points, self.debut, self.debut + timedelta(hours=1), 1))
+
+        assert result == [{
+            'date_update': self.debut,
+            'nb_mesures': 4,
+            'valeur_min': 9.0,
+            'valeur_max': 30.0,
+            'valeur_moyenne': 15.0
+        }]
+
+    def test_moyenne_par_intervalle_ignore_valeurs_nulles(self):
+        """Test moyenne par intervalle - points sans valeur ignorés"""
+        points = [{'date_update': self.debut, 'nb_mesures': 1, 'valeur_moyenne': None}]
+
+        assert list(moyenne_par_intervalle(points, self.debut, self.fin, 10)) == []
+
+    def test_lttb_borne_le_nombre_de_points(self):
+        """Test LTTB - au plus max_points points, extrémités conservées"""
+        result = lttb(self.points, 500)
+
+        assert len(result) == 500
+        assert result[0] is self.points[0]
+        assert result[-1] is self.points[-1]
+        dates = [p['date_update'] for p in result]
+        assert dates == sorted(dates)
+
+    def test_lttb_conserve_le_pic(self):
+        """Test LTTB - un pic isolé est conservé"""
+        self.points[5000]['valeur_moyenne'] = 100
+
+        result = lttb(self.points, 100)
+
+        assert any(p['valeur_moyenne'] == 100 for p in result)
+
+    def test_lttb_moins_de_points_que_max(self):
+        """Test LTTB - série déjà plus courte que max_points"""
+        assert lttb(self.points[:10], 500) == self.points[:10]
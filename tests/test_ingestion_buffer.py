@@ -0,0 +1,155 @@
+import pytest
+import sys
+import os
+import time
+import threading
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.ingestion_buffer import IngestionBuffer, BufferPleinError
+
+
+class TestIngestionBuffer:
+    """Tests pour le buffer d'écriture différée des mesures"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.ecritures = []
+        self.ecrit = threading.Event()
+
+    def teardown_method(self):
+        """Arrêt du thread d'écriture après chaque test"""
+        self.buffer.arreter()
+
+    def ecrire(self, lignes):
+        self.ecritures.append(lignes)
+        self.ecrit.set()
+
+    def test_flush_par_taille(self):
+        """Test flush déclenché par le nombre de lignes en attente"""
+        # Arrange
+        self.buffer = IngestionBuffer(self.ecrire, taille_flush=3, delai_flush=60, capacite=100)
+
+        # Act
+        self.buffer.ajouter({'temperature': [1, 2], 'humidite': [3]})
+
+        # Assert
+        assert self.ecrit.wait(2)
+        assert self.ecritures == [{'temperature': [1, 2], 'humidite': [3]}]
+
+    def test_flush_par_delai_regroupe_les_lots(self):
+        """Test flush déclenché par le délai - plusieurs lots regroupés en une écriture"""
+        # Arrange
+        self.buffer = IngestionBuffer(self.ecrire, taille_flush=1000, delai_flush=0.1, capacite=100)
+
+        # Act
+        self.buffer.ajouter({'temperature': [1]})
+        self.buffer.ajouter({'temperature': [2], 'pression': [3]})
+
+        # Assert
+        assert self.ecrit.wait(2)
+        assert self.ecritures == [{'temperature': [1, 2], 'pression': [3]}]
+
+    def test_buffer_plein(self):
+        """Test contre-pression - capacité dépassée"""
+        # Arrange
+        self.buffer = IngestionBuffer(self.ecrire, taille_flush=1000, delai_flush=60, capacite=3)
+        self.buffer.ajouter({'temperature': [1, 2]})
+
+        # Act & Assert
+        with pytest.raises(BufferPleinError):
+            self.buffer.ajouter({'temperature': [3, 4]})
+        assert self.buffer.get_statut()['en_attente'] == 2
+
+    def test_echec_ecriture_remet_en_attente(self):
+        """Test échec transitoire - les lignes sont conservées pour le prochain flush"""
+        # Arrange
+        def ecrire_en_echec(lignes):
+            raise OperationalError("INSERT", {}, Exception("Lost connection"))
+
+        self.buffer = IngestionBuffer(ecrire_en_echec, taille_flush=1000, delai_flush=60, capacite=100)
+        self.buffer._lignes = {'temperature': [1]}
+        self.buffer._nb_en_attente = 1
+
+        # Act & Assert
+        with pytest.raises(OperationalError):
+            self.buffer.flush()
+        assert self.buffer.get_statut()['en_attente'] == 1
+        assert self.buffer._lignes == {'temperature': [1]}
+
+    def test_echecs_transitoires_lot_ecarte(self):
+        """Test échecs transitoires répétés - le lot est écarté après max_tentatives"""
+        # Arrange
+        def ecrire_en_echec(lignes):
+            raise OperationalError("INSERT", {}, Exception("Lock wait timeout"))
+
+        self.buffer = IngestionBuffer(ecrire_en_echec, taille_flush=1000, delai_flush=60, capacite=100,
+                                      max_tentatives=3)
+        self.buffer._lignes = {'temperature': [1, 2]}
+        self.buffer._nb_en_attente = 2
+
+        # Act
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                self.buffer.flush()
+
+        # Assert
+        statut = self.buffer.get_statut()
+        assert statut['en_attente'] == 0
+        assert statut['ecartees'] == 2
+
+    def test_ligne_invalide_isolee(self):
+        """Test erreur non transitoire - seule la ligne fautive est écartée, les autres sont écrites"""
+        # Arrange
+        def ecrire(lignes):
+            if any(ligne == 'invalide' for lignes_type in lignes.values() for ligne in lignes_type):
+                raise IntegrityError("INSERT", {}, Exception("Cannot add or update a child row"))
+            self.ecritures.append(lignes)
+
+        self.buffer = IngestionBuffer(ecrire, taille_flush=1000, delai_flush=60, capacite=100)
+        self.buffer.ajouter({'temperature': [1, 2, 'invalide', 4, 5], 'humidite': [6]})
+
+        # Act
+        ecrites = self.buffer.flush()
+
+        # Assert
+        assert ecrites == 5
+        assert sorted(l for e in self.ecritures for lt in e.values() for l in lt) == [1, 2, 4, 5, 6]
+        assert self.buffer.get_statut()['ecartees'] == 1
+        assert self.buffer.get_statut()['en_attente'] == 0
+
+    def test_echecs_transitoires_pendant_isolement(self):
+        """Test erreur transitoire persistante après une erreur de ligne - le lot est écarté après max_tentatives"""
+        # Arrange
+        erreurs = [IntegrityError("INSERT", {}, Exception("Duplicate entry"))]
+
+        def ecrire(lignes):
+            raise erreurs.pop() if erreurs else OperationalError("INSERT", {}, Exception("Lost connection"))
+
+        self.buffer = IngestionBuffer(ecrire, taille_flush=1000, delai_flush=60, capacite=100, max_tentatives=3)
+        self.buffer._lignes = {'temperature': [1, 2, 3]}
+        self.buffer._nb_en_attente = 3
+
+        # Act
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                self.buffer.flush()
+
+        # Assert
+        statut = self.buffer.get_statut()
+        assert statut['en_attente'] == 0
+        assert statut['ecartees'] == 3
+
+    def test_arreter_vide_le_buffer(self):
+        """Test arrêt - les lignes en attente sont écrites"""
+        # Arrange
+        self.buffer = IngestionBuffer(self.ecrire, taille_flush=1000, delai_flush=60, capacite=100)
+        self.buffer.ajouter({'humidite': [1, 2]})
+
+        # Act
+        self.buffer.arreter()
+
+        # Assert
+        assert self.ecritures == [{'humidite': [1, 2]}]
+        assert self.buffer.get_statut()['en_attente'] == 0
@@ -0,0 +1,116 @@
+import sys
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from app.jobs import JobArrierePlan, JOBS
+
+
+class TestJobArrierePlan:
+    """Tests pour les jobs d'arrière-plan partagés par les services"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.executions = threading.Event()
+        self.iteration = MagicMock(side_effect=lambda: self.executions.set())
+        self.jobs = []
+
+    def teardown_method(self):
+        for job in self.jobs:
+            job.arreter()
+            JOBS.remove(job)
+
+    def creer(self, **kwargs):
+        job = JobArrierePlan('test', self.iteration, intervalle=lambda: 0.01, activation='TEST_JOB_ENABLED', **kwargs)
+        self.jobs.append(job)
+        return job
+
+    def test_demarrer_une_fois_par_processus(self):
+        """Test qu'un second démarrage réutilise le thread en cours, et que l'arrêt l'attend"""
+        # Arrange
+        job = self.creer()
+
+        # Act
+        thread = job.demarrer()
+        meme_thread = job.demarrer()
+        execute = self.executions.wait(1)
+        job.arreter()
+
+        # Assert
+        assert meme_thread is thread
+        assert thread.name == 'test-job'
+        assert execute
+        assert not thread.is_alive()
+        assert job in JOBS
+
+    def test_doit_tourner(self):
+        """Test que le job n'est activé que par sa variable d'environnement"""
+        # Arrange
+        job = self.creer()
+
+        # Act & Assert
+        with patch.dict(os.environ, {'TEST_JOB_ENABLED': 'true'}):
+            assert job.doit_tourner() is True
+        with patch.dict(os.environ, {'TEST_JOB_ENABLED': 'false'}):
+            assert job.doit_tourner() is False
+
+    def test_erreur_iteration_ne_stoppe_pas_le_job(self):
+        """Test qu'une exécution en erreur est journalisée et la suivante a lieu"""
+        # Arrange
+        erreurs = [Exception("Erreur DB")]
+
+        def iteration():
+            if erreurs:
+                raise erreurs.pop()
+
+        self.iteration.side_effect = iteration
+        job = self.creer(apres_arret=MagicMock())
+
+        # Act
+        job.demarrer()
+        for _ in range(100):
+            if self.iteration.call_count >= 2:
+                break
+            threading.Event().wait(0.01)
+        job.arreter()
+
+        # Assert
+        assert self.iteration.call_count >= 2
+        job.apres_arret.assert_called_once()
+
+    @patch('app.jobs.engine')
+    def test_verrou_non_obtenu(self, mock_engine):
+        """Test qu'un autre processus détenant le verrou empêche l'exécution"""
+        # Arrange
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.scalar.return_value = 0
+        job = self.creer(verrou='climhetic_test')
+
+        # Act
+        job._boucle_verrouillee()
+
+        # Assert
+        self.iteration.assert_not_called()
+        assert conn.execute.call_args.args[1] == {'verrou': 'climhetic_test'}
+
+    @patch('app.jobs.engine')
+    def test_verrou_garde_jusqu_a_la_perte(self, mock_engine):
+        """Test initialisation après le verrou, exécutions tant qu'il est détenu, puis libération"""
+        # Arrange
+        conn = mock_engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.scalar.side_effect = [1, 1, 1, 0]
+        initialiser = MagicMock()
+        job = self.creer(verrou='climhetic_test', initialiser=initialiser)
+
+        # Act
+        job._boucle_verrouillee()
+
+        # Assert
+        initialiser.assert_called_once_with()
+        assert self.iteration.call_count == 2
+        requetes = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert "GET_LOCK" in requetes[0]
+        assert "RELEASE_LOCK" in requetes[-1]
+        conn.commit.assert_called_once()
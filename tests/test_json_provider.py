@@ -0,0 +1,52 @@
+import json
+import sys
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, jsonify
+from app.json_provider import ClimHeticJSONProvider
+
+
+class TestJSONProvider:
+    """Tests pour le provider JSON orjson"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.app = Flask(__name__)
+        self.app.json = ClimHeticJSONProvider(self.app)
+
+    def test_types_mariadb(self):
+        """Test Decimal en nombre, datetime et date en ISO 8601"""
+        donnees = {
+            'valeur': Decimal('25.50'),
+            'date_update': datetime(2025, 1, 15, 10, 30),
+            'date_installation': date(2025, 1, 1),
+            1: 'clé entière'
+        }
+
+        with self.app.app_context():
+            texte = self.app.json.dumps(donnees)
+
+        assert json.loads(texte) == {
+            'valeur': 25.5,
+            'date_update': '2025-01-15T10:30:00',
+            'date_installation': '2025-01-01',
+            '1': 'clé entière'
+        }
+
+    def test_reponse_compacte_par_defaut(self):
+        """Test jsonify - sortie compacte hors debug, indentée en debug"""
+        with self.app.test_request_context():
+            compacte = jsonify(success=True, data=[1, 2]).get_data(as_text=True)
+            self.app.debug = True
+            indentee = jsonify(success=True, data=[1, 2]).get_data(as_text=True)
+
+        assert compacte == '{"success":true,"data":[1,2]}\n'
+        assert '\n  "success": true' in indentee
+
+    def test_loads(self):
+        """Test désérialisation"""
+        assert self.app.json.loads(b'{"id": 1}') == {'id': 1}
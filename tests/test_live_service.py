@@ -0,0 +1,324 @@
+import sys
+import os
+import queue
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.live_service import LiveService, Abonnement, Evenement, SuiviMesures
+
+
+def mesure(capteur_id, salle_id, seconde, type_mesure='temperature', valeur=21.5, identifiant=None, is_active=1):
+    """Ligne du journal mesure_flux (id 100 + seconde par défaut) avec le capteur joint"""
+    return {
+        'id': identifiant or 100 + seconde,
+        'capteur_id': capteur_id,
+        'salle_id': salle_id,
+        'is_active': is_active,
+        'type_capteur': type_mesure,
+        'type': type_mesure,
+        'valeur': valeur,
+        'unite': '°C',
+        'date_update': datetime(2025, 1, 15, 10, 30, seconde)
+    }
+
+
+class TestLiveService:
+    """Tests pour la diffusion des nouvelles mesures"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.purge = patch('services.live_service.derniere_mesure_service')
+        self.mock_derniere_mesure = self.purge.start()
+        self.service = LiveService(intervalle=60, taille_file=10)
+        self.service.suivi.watermark = 100
+
+    def teardown_method(self):
+        self.purge.stop()
+
+    def abonner(self, salle_ids=None):
+        """Abonnement sans démarrer la boucle de détection"""
+        abonnement = Abonnement(self.service, salle_ids, self.service.taille_file)
+        self.service._abonnements.add(abonnement)
+        self.service._indexer(abonnement, abonnement.salle_ids)
+        return abonnement
+
+    def evenements(self, abonnement):
+        evenements = []
+        while True:
+            try:
+                evenements.append(abonnement.file.get_nowait())
+            except queue.Empty:
+                return evenements
+
+    @patch('services.live_service.execute_single_query')
+    def test_watermark_initial(self, mock_single):
+        """Test que la première vérification part de la fin du journal sans rien diffuser"""
+        # Arrange
+        self.service.suivi.watermark = None
+        mock_single.return_value = {'id_max': 120}
+
+        # Act
+        nouvelles = self.service.nouvelles_mesures()
+
+        # Assert
+        assert nouvelles == []
+        assert self.service.suivi.watermark == 120
+
+    @patch('services.live_service.execute_query')
+    @patch('services.live_service.execute_single_query')
+    def test_depuis_debut_dernieres_mesures(self, mock_single, mock_execute):
+        """Test que le premier appel avec depuis_debut renvoie la dernière mesure de chaque capteur"""
+        # Arrange
+        suivi = SuiviMesures(depuis_debut=True)
+        mock_single.return_value = {'id_max': 120}
+        mock_execute.return_value = [{'capteur_id': 1, 'salle_id': 1}]
+
+        # Act
+        nouvelles = suivi.nouvelles_mesures()
+
+        # Assert
+        assert nouvelles == [{'capteur_id': 1, 'salle_id': 1}]
+        assert suivi.watermark == 120
+        assert "FROM capteur_derniere_mesure" in mock_execute.call_args[0][0]
+
+    @patch('services.live_service.execute_query')
+    def test_chaque_mesure_une_fois(self, mock_execute):
+        """Test que toutes les mesures d'un capteur sont diffusées, une seule fois chacune"""
+        # Arrange
+        mock_execute.side_effect = [
+            [mesure(1, 1, 1, valeur=21.0), mesure(1, 1, 2, valeur=21.5)],
+            [],
+        ]
+
+        # Act
+        premiere = self.service.nouvelles_mesures()
+        seconde = self.service.nouvelles_mesures()
+
+        # Assert
+        assert [m['valeur'] for m in premiere] == [21.0, 21.5]
+        assert 'id' not in premiere[0]
+        assert seconde == []
+        assert mock_execute.call_args[0][1] == (102, 5000)
+
+    @patch('services.live_service.execute_query')
+    def test_id_saute_relu_a_son_arrivee(self, mock_execute):
+        """Test qu'un id validé après un id plus grand est relu puis diffusé"""
+        # Arrange
+        mock_execute.side_effect = [
+            [mesure(1, 1, 1), mesure(2, 1, 3)],
+            [mesure(3, 1, 2)],
+            [],
+        ]
+
+        # Act
+        premiere = self.service.nouvelles_mesures()
+        seconde = self.service.nouvelles_mesures()
+        troisieme = self.service.nouvelles_mesures()
+
+        # Assert
+        assert [m['capteur_id'] for m in premiere] == [1, 2]
+        assert [m['capteur_id'] for m in seconde] == [3]
+        assert troisieme == []
+        query, params = mock_execute.call_args_list[1][0]
+        assert "OR f.id IN (%s)" in query
+        assert params == (103, 102, 5000)
+        assert "OR f.id IN" not in mock_execute.call_args[0][0]
+
+    @patch('services.live_service.execute_query', return_value=[])
+    def test_id_saute_abandonne_apres_delai(self, mock_execute):
+        """Test qu'un id jamais validé (transaction annulée) n'est plus attendu après delai_trous"""
+        # Arrange
+        self.service.suivi._trous = {99: time.monotonic() - 60, 100: time.monotonic()}
+
+        # Act
+        self.service.nouvelles_mesures()
+
+        # Assert
+        assert mock_execute.call_args[0][1] == (100, 100, 5000)
+        assert list(self.service.suivi._trous) == [100]
+
+    @patch('services.live_service.execute_query')
+    def test_mesures_ecartees_avancent_watermark(self, mock_execute):
+        """Test que les mesures de capteurs inactifs ou sans salle sont lues sans être diffusées"""
+        # Arrange
+        mock_execute.return_value = [
+            mesure(1, 1, 1, is_active=0),
+            mesure(2, None, 2),
+            mesure(3, 1, 3, identifiant=103) | {'type_capteur': 'humidite'},
+            mesure(4, 1, 4),
+        ]
+
+        # Act
+        nouvelles = self.service.nouvelles_mesures()
+
+        # Assert
+        assert [m['capteur_id'] for m in nouvelles] == [4]
+        assert self.service.suivi.watermark == 104
+        assert self.service.suivi._trous == {}
+
+    @patch('services.live_service.execute_query')
+    def test_lot_limite(self, mock_execute):
+        """Test qu'un lot complet signale un retard, pour relire le journal sans attendre"""
+        # Arrange
+        suivi = SuiviMesures(taille_lot=2)
+        suivi.watermark = 100
+        mock_execute.side_effect = [[mesure(1, 1, 1), mesure(1, 1, 2)], [mesure(1, 1, 3)]]
+
+        # Act
+        suivi.nouvelles_mesures()
+        en_retard = suivi.en_retard
+        suivi.nouvelles_mesures()
+
+        # Assert
+        assert en_retard is True
+        assert suivi.en_retard is False
+        assert mock_execute.call_args[0][1] == (102, 2)
+
+    @patch('services.live_service.execute_query', return_value=[])
+    def test_purge_periodique(self, mock_execute):
+        """Test que le journal est purgé au plus une fois par intervalle_purge"""
+        # Act
+        self.service.nouvelles_mesures()
+        self.service.nouvelles_mesures()
+
+        # Assert
+        self.mock_derniere_mesure.purger_flux.assert_called_once_with(3600)
+
+    @patch('services.live_service.capteur_service')
+    @patch('services.live_service.execute_query')
+    def test_diffusion_par_salle(self, mock_execute, mock_capteur_service):
+        """Test que chaque abonné ne reçoit que les salles suivies, avec les moyennes recalculées"""
+        # Arrange
+        salle_1 = self.abonner({1})
+        toutes = self.abonner()
+        mock_execute.return_value = [mesure(1, 1, 5), mesure(7, 2, 6)]
+        mock_capteur_service.get_moyennes_salles.return_value = [
+            {'salle_id': 1, 'moyenne_temperature': 21.5},
+            {'salle_id': 2, 'moyenne_temperature': 19.0}
+        ]
+        mock_capteur_service.get_seuils_conformite_salles.return_value = {}
+
+        # Act
+        nb = self.service.verifier()
+
+        # Assert
+        assert nb == 2
+        assert [nom for nom, _ in self.evenements(salle_1)] == ['mesure', 'moyennes']
+        assert sorted(nom for nom, _ in self.evenements(toutes)) == ['mesure', 'mesure', 'moyennes', 'moyennes']
+        mock_capteur_service.get_moyennes_salles.assert_called_once_with(salle_ids=[1, 2])
+
+    @patch('services.live_service.capteur_service')
+    @patch('services.live_service.execute_query')
+    def test_salle_sans_abonne(self, mock_execute, mock_capteur_service):
+        """Test que les moyennes ne sont pas recalculées pour des salles sans abonné"""
+        # Arrange
+        self.abonner({3})
+        mock_execute.return_value = [mesure(1, 1, 5)]
+
+        # Act
+        self.service.verifier()
+
+        # Assert
+        mock_capteur_service.get_moyennes_salles.assert_not_called()
+
+    def test_file_pleine(self):
+        """Test qu'un abonné lent perd des événements sans bloquer les autres"""
+        # Arrange
+        self.service.taille_file = 3
+        lent = self.abonner({1})
+        rapide = self.abonner({1})
+
+        # Act
+        for i in range(5):
+            self.service.publier(1, 'mesure', i)
+            self.evenements(rapide)
+
+        # Assert
+        assert lent.file.qsize() == 3
+        assert lent.perdus == 2
+        assert rapide.perdus == 0
+
+    @patch('services.live_service.execute_single_query')
+    def test_boucle_demarree_par_abonnement(self, mock_single):
+        """Test que la boucle démarre au premier abonné et s'arrête sans abonné"""
+        # Arrange
+        mock_single.return_value = {'id_max': None}
+
+        # Act
+        abonnement = self.service.abonner({1})
+        thread = self.service._thread
+        abonnement.fermer()
+        self.service.arreter()
+
+        # Assert
+        assert thread is not None
+        assert not thread.is_alive()
+        assert self.service.nb_abonnements() == 0
+
+    @patch('services.live_service.capteur_service')
+    @patch('services.live_service.execute_query')
+    def test_conformite_publiee_au_changement(self, mock_execute, mock_capteur_service):
+        """Test qu'un événement conformite n'est publié que si le statut de la salle change"""
+        # Arrange
+        abonnement = self.abonner({1})
+        mock_execute.side_effect = [[mesure(1, 1, 5)], [mesure(1, 1, 6)], [mesure(1, 1, 7)]]
+        mock_capteur_service.get_moyennes_salles.return_value = [{'salle_id': 1}]
+        mock_capteur_service.get_seuils_conformite_salles.return_value = {1: {'salle_id': 1}}
+        mock_capteur_service.verifier_seuils.side_effect = [
+            {'statut': 'CONFORME', 'niveau_conformite': 'BON', 'score_conformite': 2, 'alertes': []},
+            {'statut': 'CONFORME', 'niveau_conformite': 'BON', 'score_conformite': 2, 'alertes': []},
+            {'statut': 'NON_CONFORME', 'niveau_conformite': 'MAUVAIS', 'score_conformite': 4,
+             'alertes': ['Température trop élevée']},
+        ]
+
+        # Act
+        for _ in range(3):
+            self.service.verifier()
+
+        # Assert
+        conformites = [donnees for nom, donnees in self.evenements(abonnement) if nom == 'conformite']
+        assert [c['statut'] for c in conformites] == ['CONFORME', 'NON_CONFORME']
+
+    def test_modifier_salles(self):
+        """Test que les salles suivies peuvent être ajoutées et retirées en cours d'abonnement"""
+        # Arrange
+        abonnement = self.abonner(set())
+
+        # Act
+        abonnement.ajouter_salles([1, 2])
+        abonnement.retirer_salles([1])
+        self.service.publier(1, 'mesure', 'salle 1')
+        self.service.publier(2, 'mesure', 'salle 2')
+
+        # Assert
+        assert [donnees for _, donnees in self.evenements(abonnement)] == ['salle 2']
+        assert set(self.service._par_salle) == {2}
+
+    def test_desabonner_nettoie_index(self):
+        """Test que la fermeture d'un abonnement le retire de l'index des salles"""
+        # Arrange
+        abonnement = self.abonner({1, 2})
+
+        # Act
+        abonnement.fermer()
+
+        # Assert
+        assert self.service._par_salle == {}
+        assert self.service.publier(1, 'mesure', {}) == 0
+
+    def test_message_serialise_une_fois(self):
+        """Test que le message WebSocket d'un événement n'est sérialisé qu'une fois"""
+        # Arrange
+        evenement = Evenement('mesure', {'valeur': 21.5})
+        json = Mock()
+        json.dumps.return_value = '{"event":"mesure"}'
+
+        # Act
+        messages = [evenement.message(json) for _ in range(3)]
+
+        # Assert
+        assert messages == ['{"event":"mesure"}'] * 3
+        json.dumps.assert_called_once_with({'event': 'mesure', 'data': {'valeur': 21.5}})
@@ -0,0 +1,106 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.mesure_service import MesureService, MAX_MESURES_PAR_REQUETE
+
+
+class TestMesureService:
+    """Tests pour l'ingestion des mesures par lots"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = MesureService()
+        self.types_capteurs = {1: 'temperature', 2: 'humidite', 3: 'pression', 4: 'co2'}
+
+    def test_valider_mesure_success(self):
+        """Test validation d'une mesure - succès avec unité par défaut"""
+        type_mesure, ligne = self.service.valider_mesure(
+            {'capteur_id': 1, 'valeur': 21.5, 'date_update': '2025-01-01T12:00:00'},
+            self.types_capteurs
+        )
+
+        assert type_mesure == 'temperature'
+        assert ligne == {
+            'capteur_id': 1,
+            'valeur': Decimal('21.5'),
+            'unite': '°C',
+            'date_update': datetime(2025, 1, 1, 12, 0)
+        }
+
+    @pytest.mark.parametrize('mesure, erreur', [
+        ({'capteur_id': '1', 'valeur': 21.5}, "capteur_id doit être un entier"),
+        ({'capteur_id': 99, 'valeur': 21.5}, "Capteur 99 introuvable ou inactif"),
+        ({'capteur_id': 1, 'valeur': 21.5, 'type': 'humidite'}, "mesure 'temperature', pas 'humidite'"),
+        ({'capteur_id': 4, 'valeur': 410}, "Le capteur 4 est de type 'co2', sans table de mesures"),
+        ({'capteur_id': 1, 'valeur': 'chaud'}, "valeur doit être un nombre"),
+        ({'capteur_id': 1}, "valeur doit être un nombre"),
+        ({'capteur_id': 1, 'valeur': 1e8}, "valeur doit être comprise entre"),
+        ({'capteur_id': 1, 'valeur': '-1e40'}, "valeur doit être comprise entre"),
+        ({'capteur_id': 1, 'valeur': 21.5, 'date_update': 'hier'}, "date_update doit être une date ISO 8601"),
+    ])
+    def test_valider_mesure_invalide(self, mesure, erreur):
+        """Test validation d'une mesure - cas invalides"""
+        with pytest.raises(ValueError) as exc_info:
+            self.service.valider_mesure(mesure, self.types_capteurs)
+        assert erreur in str(exc_info.value)
+
+    def test_valider_mesure_arrondie(self):
+        """Test validation d'une mesure - valeur arrondie à la précision des colonnes"""
+        _, ligne = self.service.valider_mesure({'capteur_id': 1, 'valeur': 21.456}, self.types_capteurs)
+
+        assert ligne['valeur'] == Decimal('21.46')
+
+    @patch('services.mesure_service.execute_many')
+    @patch('services.mesure_service.MesureService.get_types_capteurs')
+    def test_enregistrer_mesures_une_requete_par_table(self, mock_get_types, mock_execute_many):
+        """Test enregistrement - regroupement par table dans une seule transaction"""
+        # Arrange
+        mock_get_types.return_value = self.types_capteurs
+        mesures = [
+            {'capteur_id': 1, 'valeur': 21.5},
+            {'capteur_id': 2, 'valeur': 45},
+            {'capteur_id': 1, 'valeur': 21.7},
+            {'capteur_id': 99, 'valeur': 10},
+            {'capteur_id': 3, 'valeur': 1013.2}
+        ]
+
+        # Act
+        result = self.service.enregistrer_mesures(mesures)
+
+        # Assert
+        assert result['inserees'] == 4
+        assert result['par_type'] == {'temperature': 2, 'humidite': 1, 'pression': 1}
+        assert result['rejetees'] == 1
+        assert result['erreurs'][0]['index'] == 3
+        mock_get_types.assert_called_once_with({1, 2, 3, 99})
+        mock_execute_many.assert_called_once()
+        batches = mock_execute_many.call_args[0][0]
+        assert "INSERT INTO temperature" in batches[0][0]
+        assert [l['valeur'] for l in batches[0][1]] == [Decimal('21.5'), Decimal('21.7')]
+        assert "INSERT INTO humidite" in batches[1][0]
+        assert "INSERT INTO pression" in batches[2][0]
+
+    def test_enregistrer_mesures_trop_nombreuses(self):
+        """Test enregistrement - lot trop volumineux"""
+        with pytest.raises(ValueError) as exc_info:
+            self.service.enregistrer_mesures([{}] * (MAX_MESURES_PAR_REQUETE + 1))
+        assert f"Au plus {MAX_MESURES_PAR_REQUETE} mesures" in str(exc_info.value)
+
+    @patch('services.mesure_service.execute_many')
+    @patch('services.mesure_service.MesureService.get_types_capteurs')
+    def test_enregistrer_mesures_exception(self, mock_get_types, mock_execute_many):
+        """Test enregistrement - erreur base de données"""
+        # Arrange
+        mock_get_types.return_value = self.types_capteurs
+        mock_execute_many.side_effect = Exception("Erreur DB")
+
+        # Act & Assert
+        with pytest.raises(Exception) as exc_info:
+            self.service.enregistrer_mesures([{'capteur_id': 1, 'valeur': 21.5}])
+        assert "Erreur lors de l'enregistrement des mesures" in str(exc_info.value)
@@ -0,0 +1,93 @@
+import json
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, Blueprint
+from functools import lru_cache
+from app.metrics import Metriques
+
+
+class TestMetriques:
+    """Tests pour l'exposition des métriques Prometheus"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.app = Flask(__name__)
+        bp = Blueprint('capteurs', __name__)
+
+        @bp.route('/salles/<int:salle_id>')
+        def salle(salle_id):
+            return {'id': salle_id}
+
+        self.app.register_blueprint(bp, url_prefix='/api/capteurs')
+        self.client = self.app.test_client()
+
+    def _exposer(self, metriques):
+        with patch('app.metrics._statut_tunnel', return_value={'enabled': True, 'active': False}):
+            return metriques.exposer()
+
+    def test_compteurs_et_histogrammes_par_route(self):
+        """Test hooks - compteur et histogramme par blueprint, route et statut"""
+        # Arrange
+        metriques = Metriques()
+        metriques.init_app(self.app)
+
+        # Act
+        self.client.get('/api/capteurs/salles/1')
+        self.client.get('/api/capteurs/salles/2')
+        self.client.get('/inexistant')
+        texte = self._exposer(metriques)
+
+        # Assert
+        assert '# TYPE climhetic_http_requests_total counter' in texte
+        assert ('climhetic_http_requests_total{blueprint="capteurs",method="GET",'
+                'route="/api/capteurs/salles/<int:salle_id>",status="200"} 2') in texte
+        assert 'route="inconnue",status="404"} 1' in texte
+        assert ('climhetic_http_request_duration_seconds_count{blueprint="capteurs",method="GET",'
+                'route="/api/capteurs/salles/<int:salle_id>"} 2') in texte
+        assert 'le="+Inf"} 2' in texte
+        assert 'climhetic_ssh_tunnel_enabled 1' in texte
+        assert 'climhetic_ssh_tunnel_active 0' in texte
+
+    def test_taux_de_succes_des_caches(self):
+        """Test caches - hits, misses et ratio"""
+        # Arrange
+        @lru_cache(maxsize=8)
+        def carre(x):
+            return x * x
+
+        metriques = Metriques()
+        metriques.enregistrer_cache('carres', carre.cache_info)
+        carre(2), carre(2), carre(2), carre(3)
+
+        # Act
+        texte = self._exposer(metriques)
+
+        # Assert
+        assert 'climhetic_cache_hits_total{cache="carres"} 2' in texte
+        assert 'climhetic_cache_misses_total{cache="carres"} 2' in texte
+        assert 'climhetic_cache_hit_ratio{cache="carres"} 0.5' in texte
+
+    def test_agregation_multi_workers(self, tmp_path):
+        """Test répertoire partagé - compteurs sommés, jauges des seuls workers vivants"""
+        # Arrange
+        metriques = Metriques(repertoire=str(tmp_path))
+        metriques.incrementer('climhetic_http_requests_total', {'route': '/api/health', 'status': '200'}, 3)
+        worker_arrete = {
+            'pid': 2 ** 22 + 12345,
+            'compteurs': [['climhetic_http_requests_total', [['route', '/api/health'], ['status', '200']], 4]],
+            'histogrammes': [],
+            'jauges': [['climhetic_db_pool_checked_out', [], 7]]
+        }
+        (tmp_path / 'worker_99999999.json').write_text(json.dumps(worker_arrete))
+
+        # Act
+        texte = self._exposer(metriques)
+
+        # Assert
+        assert 'climhetic_http_requests_total{route="/api/health",status="200"} 7' in texte
+        assert 'climhetic_db_pool_checked_out' not in texte
+        assert (tmp_path / f'worker_{os.getpid()}.json').exists()
@@ -0,0 +1,227 @@
+import sys
+import os
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.alerte_service import AlerteService
+from services.notification_service import NotificationService
+
+
+class WebhookLocal:
+    """Serveur HTTP local qui remplace un webhook : statuts et délai de réponse configurables"""
+
+    def __init__(self, statuts=(200,), delai=0):
+        self.statuts = list(statuts)
+        self.delai = delai
+        self.recus = []
+        self.simultanes = 0
+        self.max_simultanes = 0
+        self._lock = threading.Lock()
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with webhook._lock:
+                    webhook.simultanes += 1
+                    webhook.max_simultanes = max(webhook.max_simultanes, webhook.simultanes)
+                    statut = webhook.statuts.pop(0) if len(webhook.statuts) > 1 else webhook.statuts[0]
+                corps = self.rfile.read(int(self.headers['Content-Length']))
+                time.sleep(webhook.delai)
+                with webhook._lock:
+                    webhook.recus.append((self.path, json.loads(corps)))
+                    webhook.simultanes -= 1
+                self.send_response(statut)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.serveur.server_address[1]}"
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+
+    def fermer(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+
+def notification(id, url, tentatives=0):
+    return {'id': id, 'url': url, 'evenement': 'conformite', 'payload': '{"evenement": "conformite"}',
+            'tentatives': tentatives}
+
+
+class TestNotificationService:
+    """Tests pour l'envoi des notifications aux webhooks"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = NotificationService(taille_pool=4, max_par_cible=2, max_tentatives=3,
+                                           delai_base=5, delai_max=60, timeout=1)
+        self.webhook = None
+
+    def teardown_method(self):
+        self.service.arreter()
+        if self.webhook is not None:
+            self.webhook.fermer()
+
+    def test_envoyer_succes(self):
+        """Test qu'une notification est envoyée en POST JSON"""
+        # Arrange
+        self.webhook = WebhookLocal()
+
+        # Act
+        erreur = self.service.envoyer(f"{self.webhook.url}/alertes", '{"statut": "NON_CONFORME"}')
+
+        # Assert
+        assert erreur is None
+        assert self.webhook.recus == [('/alertes', {'statut': 'NON_CONFORME'})]
+
+    def test_envoyer_erreurs(self):
+        """Test les erreurs renvoyées pour un statut HTTP d'erreur, un délai dépassé et une cible absente"""
+        # Arrange
+        self.webhook = WebhookLocal(statuts=[503])
+        lent = WebhookLocal(delai=2)
+
+        # Act
+        erreur_http = self.service.envoyer(self.webhook.url, '{}')
+        erreur_delai = self.service.envoyer(lent.url, '{}')
+        lent.fermer()
+        erreur_connexion = self.service.envoyer(lent.url, '{}')
+
+        # Assert
+        assert erreur_http == 'HTTP 503'
+        assert 'timed out' in erreur_delai
+        assert erreur_connexion
+
+    def test_delai_exponentiel(self):
+        """Test que le délai double à chaque tentative jusqu'au plafond"""
+        # Act
+        delais = [self.service.delai(tentatives) for tentatives in range(1, 7)]
+
+        # Assert
+        for delai, attendu in zip(delais, [5, 10, 20, 40, 60, 60]):
+            assert attendu * 0.9 <= delai <= attendu * 1.1
+
+    @patch('services.notification_service.execute_write')
+    def test_echec_replanifie_puis_abandonne(self, mock_write):
+        """Test qu'un échec est replanifié, puis abandonné après max_tentatives"""
+        # Act
+        avant = datetime.now()
+        self.service._enregistrer_resultat(notification(1, 'http://cible', tentatives=0), 'HTTP 500')
+        self.service._enregistrer_resultat(notification(1, 'http://cible', tentatives=2), 'HTTP 500')
+
+        # Assert
+        premiere, derniere = [c[0][1] for c in mock_write.call_args_list]
+        assert premiere['statut'] == 'en_attente'
+        assert premiere['tentatives'] == 1
+        assert 4 <= (premiere['prochaine'] - avant).total_seconds() <= 6
+        assert derniere['statut'] == 'echec'
+
+    @patch('services.notification_service.execute_write')
+    @patch('services.notification_service.execute_query')
+    def test_distribuer_limite_par_cible(self, mock_execute, mock_write):
+        """Test qu'une cible lente n'occupe pas plus de max_par_cible threads du pool"""
+        # Arrange
+        self.webhook = WebhookLocal(delai=0.3)
+        rapide = WebhookLocal()
+        mock_execute.return_value = [notification(i, self.webhook.url) for i in range(1, 6)] + [
+            notification(6, rapide.url)
+        ]
+
+        # Act
+        confiees = self.service.distribuer()
+        time.sleep(0.1)
+        recus_rapide = len(rapide.recus)
+        self.service.arreter()
+        rapide.fermer()
+
+        # Assert
+        assert confiees == 3
+        assert self.webhook.max_simultanes == 2
+        assert recus_rapide == 1
+        assert self.service._en_cours == set()
+        assert self.service._par_cible == {}
+        assert mock_write.call_count == 3
+
+    @patch('services.notification_service.execute_write')
+    @patch('services.notification_service.execute_query')
+    def test_distribuer_sans_doublon(self, mock_execute, mock_write):
+        """Test qu'une notification en cours d'envoi n'est pas confiée une seconde fois"""
+        # Arrange
+        self.webhook = WebhookLocal(delai=0.2)
+        mock_execute.return_value = [notification(1, self.webhook.url)]
+
+        # Act
+        premiere = self.service.distribuer()
+        seconde = self.service.distribuer()
+        self.service.arreter()
+
+        # Assert
+        assert (premiere, seconde) == (1, 0)
+        assert len(self.webhook.recus) == 1
+
+    def test_lignes_outbox(self):
+        """Test qu'une notification est préparée par webhook configuré, en JSON"""
+        # Act
+        with patch.dict(os.environ, {'WEBHOOK_URLS': 'http://a/hook, http://b/hook'}):
+            lignes = self.service.lignes_outbox('conformite', {'salle_id': 1, 'date': datetime(2025, 1, 15, 10, 0)})
+
+        # Assert
+        assert [l['url'] for l in lignes] == ['http://a/hook', 'http://b/hook']
+        assert json.loads(lignes[0]['payload']) == {
+            'evenement': 'conformite', 'data': {'salle_id': 1, 'date': '2025-01-15T10:00:00'}
+        }
+
+
+class TestChangementConformite:
+    """Tests pour les notifications produites par le moteur d'alertes"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = AlerteService(duree_min=0, fraicheur=None)
+        self.service._seuils = {1: {
+            'temperature_basse': 18, 'temperature_haute': 26,
+            'humidite_basse': 30, 'humidite_haute': 70,
+            'pression_basse': None, 'pression_haute': None
+        }}
+        self.service._expiration_seuils = float('inf')
+
+    @patch('services.alerte_service.execute_query', return_value=[{'id': 1, 'id_salle': 1}, {'id': 2, 'id_salle': 1}])
+    @patch('services.alerte_service.notification_service')
+    @patch('services.alerte_service.execute_many')
+    @patch('services.live_service.derniere_mesure_service')
+    @patch('services.live_service.execute_query')
+    @patch('services.live_service.execute_single_query', return_value={'id_max': 10})
+    def test_notifications_au_changement_de_statut(self, mock_single, mock_execute, mock_derniere_mesure,
+                                                    mock_many, mock_notifications, mock_capteurs):
+        """Test qu'une salle n'est notifiée qu'à sa première alerte et à la fin de la dernière"""
+        # Arrange
+        mesures = [
+            {'capteur_id': 1, 'salle_id': 1, 'type': 'temperature', 'valeur': 28, 'date_update': datetime(2025, 1, 15, 10, 0)},
+            {'capteur_id': 2, 'salle_id': 1, 'type': 'humidite', 'valeur': 80, 'date_update': datetime(2025, 1, 15, 10, 0)},
+            {'id': 11, 'capteur_id': 1, 'salle_id': 1, 'is_active': 1, 'type': 'temperature', 'type_capteur': 'temperature',
+             'valeur': 22, 'unite': '°C', 'date_update': datetime(2025, 1, 15, 10, 1)},
+            {'id': 12, 'capteur_id': 2, 'salle_id': 1, 'is_active': 1, 'type': 'humidite', 'type_capteur': 'humidite',
+             'valeur': 50, 'unite': '%', 'date_update': datetime(2025, 1, 15, 10, 2)},
+        ]
+        mock_execute.side_effect = [mesures[:2], mesures[2:3], mesures[3:]]
+        mock_notifications.lignes_outbox.side_effect = lambda evenement, donnees: [donnees]
+
+        # Act
+        for _ in range(3):
+            self.service.executer()
+
+        # Assert
+        changements = [c[0][1] for c in mock_notifications.lignes_outbox.call_args_list]
+        assert [c['statut'] for c in changements] == ['NON_CONFORME', 'CONFORME']
+        assert [a['parametre'] for a in changements[0]['alertes']] == ['temperature']
+        notifications_ecrites = [appel[0][0][1][1] for appel in mock_many.call_args_list]
+        assert [len(n) for n in notifications_ecrites] == [1, 0, 1]
+        assert mock_notifications.reveiller.call_count == 2
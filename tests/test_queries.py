@@ -0,0 +1,182 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+from flask import Flask
+from app import database
+from app.database import Resultat, stream_query
+from app.json_provider import ClimHeticJSONProvider
+from app.queries import compiler_requete, execute_query, execute_single_query, preparer_requete
+
+
+class TestQueries:
+    """Tests pour les helpers SQL de app.queries"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        compiler_requete.cache_clear()
+
+    def _mock_engine(self, mock_engine, rows):
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        conn.execute.return_value.keys.return_value = ['id', 'nom']
+        conn.execute.return_value.fetchall.return_value = rows
+        conn.execute.return_value.fetchone.return_value = rows[0] if rows else None
+        return conn
+
+    def test_compiler_requete_reecrit_les_parametres(self):
+        """Test réécriture des %s en :param_i"""
+        statement, noms = compiler_requete("SELECT * FROM salle WHERE id = %s AND etat = %s", 2)
+
+        assert str(statement) == "SELECT * FROM salle WHERE id = :param_0 AND etat = :param_1"
+        assert noms == ('param_0', 'param_1')
+
+    def test_compiler_requete_en_cache(self):
+        """Test cache - la même requête n'est compilée qu'une fois"""
+        premier = compiler_requete("SELECT * FROM salle WHERE id = %s", 1)
+        second = compiler_requete("SELECT * FROM salle WHERE id = %s", 1)
+
+        assert premier[0] is second[0]
+        assert compiler_requete.cache_info().hits == 1
+
+    @patch('app.database.engine')
+    def test_execute_query_lie_les_valeurs(self, mock_engine):
+        """Test execute_query - seules les valeurs changent d'un appel à l'autre"""
+        # Arrange
+        conn = self._mock_engine(mock_engine, [(1, 'A01')])
+
+        # Act
+        result = execute_query("SELECT id, nom FROM salle WHERE id = %s", (1,))
+        execute_query("SELECT id, nom FROM salle WHERE id = %s", 2)
+
+        # Assert
+        assert result == [{'id': 1, 'nom': 'A01'}]
+        premier, second = conn.execute.call_args_list
+        assert premier.args[0] is second.args[0]
+        assert premier.args[1] == {'param_0': 1}
+        assert second.args[1] == {'param_0': 2}
+
+    @patch('app.database.engine')
+    def test_execute_single_query_sans_parametres(self, mock_engine):
+        """Test execute_single_query - requête sans paramètres"""
+        # Arrange
+        conn = self._mock_engine(mock_engine, [])
+
+        # Act
+        result = execute_single_query("SELECT id, nom FROM salle")
+
+        # Assert
+        assert result is None
+        assert len(conn.execute.call_args.args) == 1
+
+    @patch('app.database.engine')
+    def test_execute_query_tabulaire(self, mock_engine):
+        """Test execute_query - mode tabulaire sans dict par ligne"""
+        # Arrange
+        self._mock_engine(mock_engine, [(1, 'A01'), (2, 'A02')])
+
+        # Act
+        result = execute_query("SELECT id, nom FROM salle", tabulaire=True)
+
+        # Assert
+        assert isinstance(result, Resultat)
+        assert result.columns == ['id', 'nom']
+        assert len(result) == 2
+
+    @patch('app.database.engine')
+    def test_connexion_reutilisee_pendant_la_requete(self, mock_engine):
+        """Test connexion de requête - un seul checkout du pool, rendu en teardown_request"""
+        # Arrange
+        app = Flask(__name__)
+        database.init_app(app)
+        conn = mock_engine.connect.return_value
+        conn.execute.return_value.keys.return_value = ['id']
+        conn.execute.return_value.fetchall.return_value = [(1,)]
+        conn.execute.return_value.fetchone.return_value = (1,)
+
+        # Act
+        with app.test_request_context():
+            execute_query("SELECT id FROM salle WHERE id = %s", 1)
+            execute_single_query("SELECT id FROM salle WHERE id = %s", 1)
+            database.execute_write("UPDATE salle SET nom = :nom WHERE id = 1", {'nom': 'A01'})
+            conn.close.assert_not_called()
+            app.do_teardown_request()
+
+        # Assert
+        mock_engine.connect.assert_called_once()
+        assert conn.execute.call_count == 3
+        conn.commit.assert_called_once()
+        conn.close.assert_called_once()
+
+    @patch('app.database.engine')
+    def test_connexion_rollback_en_cas_erreur(self, mock_engine):
+        """Test connexion de requête - le travail non validé est annulé si une requête échoue"""
+        # Arrange
+        app = Flask(__name__)
+        conn = mock_engine.connect.return_value
+        conn.execute.side_effect = Exception("Erreur DB")
+
+        # Act & Assert
+        with app.test_request_context():
+            with pytest.raises(Exception):
+                execute_query("SELECT id FROM salle")
+            conn.rollback.assert_called_once()
+
+    @patch('app.database.engine')
+    def test_connexion_hors_requete(self, mock_engine):
+        """Test hors requête (threads, scripts) - une connexion dédiée par appel"""
+        # Arrange
+        self._mock_engine(mock_engine, [(1, 'A01')])
+
+        # Act
+        execute_query("SELECT id, nom FROM salle")
+        execute_query("SELECT id, nom FROM salle")
+
+        # Assert
+        assert mock_engine.connect.call_count == 2
+
+    @patch('app.database.engine')
+    def test_stream_query_par_lots(self, mock_engine):
+        """Test stream_query - curseur côté serveur, lignes renvoyées par lots"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        result = conn.execution_options.return_value.execute.return_value
+        result.keys.return_value = ['id', 'nom']
+        result.partitions.return_value = iter([[(1, 'A01'), (2, 'A02')], [(3, 'A03')]])
+
+        # Act
+        lots = list(stream_query(*preparer_requete("SELECT id, nom FROM salle WHERE etat = %s", 'active'), taille_lot=2))
+
+        # Assert
+        statement, params = conn.execution_options.return_value.execute.call_args[0]
+        assert str(statement) == "SELECT id, nom FROM salle WHERE etat = :param_0"
+        assert params == {'param_0': 'active'}
+        conn.execution_options.assert_called_once_with(stream_results=True, max_row_buffer=2)
+        result.partitions.assert_called_once_with(2)
+        result.fetchall.assert_not_called()
+        assert [len(lot) for lot in lots] == [2, 1]
+        assert lots[1].columns == ['id', 'nom']
+
+    def test_resultat_formats(self):
+        """Test Resultat - formats compact, colonnes et objets"""
+        resultat = Resultat(['id', 'nom'], [(1, 'A01'), (2, 'A02')])
+
+        assert resultat.compact() == {'columns': ['id', 'nom'], 'rows': [(1, 'A01'), (2, 'A02')]}
+        assert resultat.colonnes() == {'id': [1, 2], 'nom': ['A01', 'A02']}
+        assert list(resultat.objets()) == [{'id': 1, 'nom': 'A01'}, {'id': 2, 'nom': 'A02'}]
+        assert Resultat(['id'], []).colonnes() == {'id': []}
+
+    def test_json_provider_serialise_resultat(self):
+        """Test provider JSON - un Resultat est sérialisé au format compact"""
+        app = Flask(__name__)
+        app.json = ClimHeticJSONProvider(app)
+
+        with app.app_context():
+            data = json.loads(app.json.dumps({'data': Resultat(['id'], [(1,), (2,)])}))
+
+        assert data == {'data': {'columns': ['id'], 'rows': [[1], [2]]}}
@@ -0,0 +1,134 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import create_engine, text
+from app.query_stats import QueryStats, normaliser_requete, SRC
+
+# Service factice compilé comme s'il était défini dans src/services
+FAUX_SERVICE = '''
+from sqlalchemy import text
+
+class FauxService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_salles(self, salle_id):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT id, nom FROM salle WHERE id >= :id"), {'id': salle_id}).fetchall()
+'''
+
+
+class TestQueryStats:
+    """Tests pour la mesure des requêtes SQL"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE salle (id INTEGER PRIMARY KEY, nom TEXT)"))
+            conn.execute(text("INSERT INTO salle VALUES (1, 'A01'), (2, 'A02'), (3, 'B01')"))
+
+        self.stats = QueryStats(seuil_lent_ms=1000, periode_appelants=1)
+        self.stats.installer(self.engine)
+
+        module = {}
+        exec(compile(FAUX_SERVICE, os.path.join(SRC, 'services', 'faux_service.py'), 'exec'), module)
+        self.service = module['FauxService'](self.engine)
+
+    def test_normaliser_requete(self):
+        """Test normalisation - valeurs, paramètres et listes IN remplacés"""
+        requete = normaliser_requete(
+            "SELECT *  FROM salle\n WHERE nom = 'A01' AND id IN (%(id_1)s, %(id_2)s) LIMIT 10"
+        )
+
+        assert requete == "SELECT * FROM salle WHERE nom = ? AND id IN (?) LIMIT ?"
+
+    def test_stats_par_requete_et_appelant(self):
+        """Test hooks - latence, lignes et méthode de service appelante"""
+        # Act
+        self.service.get_salles(1)
+        self.service.get_salles(3)
+
+        # Assert
+        stats = self.stats.get_stats()
+        requete = next(r for r in stats['requetes'] if r['requete'].startswith('SELECT id, nom'))
+        assert requete['requete'] == "SELECT id, nom FROM salle WHERE id >= ?"
+        assert requete['appels'] == 2
+        assert requete['appelants'] == {'FauxService.get_salles': 2}
+        assert sum(requete['histogramme'].values()) == 2
+        assert stats['par_appelant'][0]['appelant'] == 'FauxService.get_salles'
+        assert stats['requetes_lentes'] == []
+
+    def test_journal_requetes_lentes(self):
+        """Test journal - requêtes au-delà du seuil conservées sans leurs paramètres"""
+        # Arrange
+        self.stats.seuil_lent_ms = 0
+
+        # Act
+        self.service.get_salles(2)
+
+        # Assert
+        lente = self.stats.get_stats()['requetes_lentes'][0]
+        assert lente['appelant'] == 'FauxService.get_salles'
+        assert 'parametres' not in lente
+
+    def test_requete_en_erreur(self):
+        """Test hooks - une requête en erreur ne laisse rien sur la connexion et n'est pas comptée"""
+        # Act
+        with self.engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM table_absente"))
+            conn.rollback()
+            conn.execute(text("SELECT id FROM salle"))
+            info = dict(conn.info)
+
+        # Assert
+        requetes = [r['requete'] for r in self.stats.get_stats()['requetes']]
+        assert "SELECT id FROM salle" in requetes
+        assert not any('table_absente' in r for r in requetes)
+        assert 'debuts_requetes' not in info
+
+    def test_appelants_echantillonnes(self):
+        """Test hooks - appelant cherché pour une exécution sur periode_appelants"""
+        # Arrange
+        self.stats.periode_appelants = 3
+
+        # Act
+        for salle_id in range(6):
+            self.service.get_salles(salle_id)
+
+        # Assert
+        requete = next(r for r in self.stats.get_stats()['requetes'] if r['requete'].startswith('SELECT id, nom'))
+        assert requete['appels'] == 6
+        assert requete['appelants'] == {'FauxService.get_salles': 2}
+
+    def test_percentiles_et_tri(self):
+        """Test percentiles estimés depuis l'histogramme et tri"""
+        # Arrange
+        for duree in [1, 1, 1, 40]:
+            self.stats.enregistrer("SELECT id FROM salle", duree, 1, 'A.a')
+        self.stats.enregistrer("SELECT nom FROM salle", 3, 5, 'B.b')
+
+        # Act
+        stats = self.stats.get_stats(tri='lignes_total')
+
+        # Assert
+        assert [r['requete'] for r in stats['requetes']] == ["SELECT nom FROM salle", "SELECT id FROM salle"]
+        assert stats['requetes'][1]['p50_ms'] == 1
+        assert stats['requetes'][1]['p99_ms'] == 40
+
+    def test_tri_invalide(self):
+        """Test tri invalide"""
+        with pytest.raises(ValueError):
+            self.stats.get_stats(tri='nom')
+
+    def test_reinitialiser(self):
+        """Test remise à zéro"""
+        self.service.get_salles(1)
+
+        self.stats.reinitialiser()
+
+        assert self.stats.get_stats()['requetes'] == []
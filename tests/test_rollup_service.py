@@ -0,0 +1,223 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.rollup_service import RollupService, choisir_granularite
+
+
+class TestRollupService:
+    """Tests pour les agrégats minute/heure/jour"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.service = RollupService()
+        self.debut = datetime(2025, 1, 1)
+        self.fin = datetime(2025, 1, 8)
+
+    def test_choisir_granularite(self):
+        """Test choix de la granularité la plus grossière compatible"""
+        assert choisir_granularite(30) is None
+        assert choisir_granularite(60) == 'minute'
+        assert choisir_granularite(1800) == 'minute'
+        assert choisir_granularite(3600) == 'heure'
+        assert choisir_granularite(86399) == 'heure'
+        assert choisir_granularite(7 * 86400) == 'jour'
+
+    @patch('services.rollup_service.execute_query')
+    def test_get_agregats_salle_par_heure(self, mock_execute_query):
+        """Test historique agrégé d'une salle - agrégat horaire"""
+        # Arrange
+        mock_execute_query.side_effect = [[{'derniere_date': self.fin}], []]
+
+        # Act
+        result = self.service.get_agregats('temperature', self.debut, self.fin, 7200, salle_id=1)
+
+        # Assert
+        assert result == []
+        call_args = mock_execute_query.call_args[0]
+        assert "FROM mesure_rollup_salle" in call_args[0]
+        assert "valeur_somme / nb_mesures as valeur_moyenne" in call_args[0]
+        assert call_args[1] == (1, 'temperature', 'heure', self.debut, self.fin)
+
+    @patch('services.rollup_service.execute_query')
+    def test_get_agregats_capteur_prioritaire(self, mock_execute_query):
+        """Test historique agrégé - le capteur est prioritaire sur la salle"""
+        # Arrange
+        mock_execute_query.side_effect = [[{'derniere_date': self.fin}], []]
+
+        # Act
+        self.service.get_agregats('humidite', self.debut, self.fin, 86400, capteur_id=4, salle_id=1)
+
+        # Assert
+        call_args = mock_execute_query.call_args[0]
+        assert "FROM mesure_rollup_capteur" in call_args[0]
+        assert call_args[1] == (4, 'humidite', 'jour', self.debut, self.fin)
+
+    @patch('services.rollup_service.execute_query')
+    def test_get_agregats_mesures_brutes(self, mock_execute_query):
+        """Test historique agrégé - résolution inférieure à la minute"""
+        # Arrange
+        mock_execute_query.return_value = []
+
+        # Act
+        self.service.get_agregats('pression', self.debut, self.fin, 10, salle_id=1)
+
+        # Assert
+        call_args = mock_execute_query.call_args[0]
+        assert "FROM pression m" in call_args[0]
+        assert "c.id_salle = %s" in call_args[0]
+        assert call_args[1] == (1, self.debut, self.fin)
+
+    @patch('services.rollup_service.execute_query')
+    def test_get_agregats_rollup_vide(self, mock_execute_query):
+        """Test historique agrégé - job jamais exécuté : mesures brutes agrégées en base"""
+        # Arrange
+        mesures = [{'date_update': self.debut, 'nb_mesures': 12, 'valeur_min': 20,
+                    'valeur_max': 22, 'valeur_moyenne': 21}]
+        mock_execute_query.side_effect = [[], mesures]
+
+        # Act
+        result = self.service.get_agregats('temperature', self.debut, self.fin, 1209, salle_id=1)
+
+        # Assert
+        assert result == mesures
+        call_args = mock_execute_query.call_args[0]
+        assert "FROM temperature m" in call_args[0]
+        assert "DATE_FORMAT(m.date_update, '%Y-%m-%d %H:%i:00')" in call_args[0]
+        assert "GROUP BY 1" in call_args[0]
+        assert call_args[1] == (1, self.debut, self.fin)
+
+    @patch('services.rollup_service.execute_query')
+    def test_get_agregats_complete_apres_watermark(self, mock_execute_query):
+        """Test historique agrégé - les intervalles postérieurs au watermark sont agrégés sur les mesures brutes"""
+        # Arrange
+        watermark = datetime(2025, 1, 7, 15, 42)
+        agregat = {'date_update': datetime(2025, 1, 7, 14), 'nb_mesures': 60}
+        brute = {'date_update': datetime(2025, 1, 7, 15), 'nb_mesures': 42}
+        mock_execute_query.side_effect = [[{'derniere_date': watermark}], [agregat], [brute]]
+
+        # Act
+        result = self.service.get_agregats('temperature', self.debut, self.fin, 3600, capteur_id=4)
+
+        # Assert
+        assert result == [agregat, brute]
+        rollup, brutes = mock_execute_query.call_args_list[1][0], mock_execute_query.call_args_list[2][0]
+        assert "debut < %s" in rollup[0]
+        assert rollup[1] == (4, 'temperature', 'heure', self.debut, datetime(2025, 1, 7, 15))
+        assert "DATE_FORMAT(m.date_update, '%Y-%m-%d %H:00:00')" in brutes[0]
+        assert brutes[1] == (4, datetime(2025, 1, 7, 15), self.fin)
+
+    def test_get_agregats_type_invalide(self):
+        """Test historique agrégé - type de mesure invalide"""
+        with pytest.raises(Exception) as exc_info:
+            self.service.get_agregats('co2', self.debut, self.fin, 3600, salle_id=1)
+        assert "Type de mesure invalide" in str(exc_info.value)
+
+    @patch('services.rollup_service.engine')
+    def test_executer_verrou_pris(self, mock_engine):
+        """Test job - un autre processus détient le verrou"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        conn.execute.return_value.scalar.return_value = 0
+
+        # Act
+        result = self.service.executer()
+
+        # Assert
+        assert result is None
+        assert conn.execute.call_count == 1
+
+    @patch('services.rollup_service.engine')
+    def test_executer_incremental_depuis_watermark(self, mock_engine):
+        """Test job - les intervalles sont recalculés depuis le watermark moins la fenêtre de recalcul"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        watermark = datetime(2025, 1, 1, 12, 0)
+        derniere = datetime(2025, 1, 1, 12, 5)
+        # verrou, puis (watermark, max date_update) pour chaque type, puis release
+        conn.execute.return_value.scalar.side_effect = [1] + [watermark, derniere] * 3
+
+        # Act
+        result = self.service.executer()
+
+        # Assert
+        assert result['temperature'] == {'depuis': datetime(2025, 1, 1, 11, 0), 'jusqua': derniere}
+        rollups = [c for c in conn.execute.call_args_list if "INSERT INTO mesure_rollup" in str(c.args[0])]
+        # 3 types x 3 granularités x (capteur + salle)
+        assert len(rollups) == 18
+        assert [c.args[1]['depuis'] for c in rollups[:6]] == [datetime(2025, 1, 1, 11, 0)] * 4 + [datetime(2025, 1, 1)] * 2
+        assert all(c.args[1]['jusqua'] == derniere for c in rollups)
+        assert all("nb_mesures = VALUES(nb_mesures)" in str(c.args[0]) for c in rollups)
+        assert "granularite = 'minute'" in str(rollups[2].args[0])
+        requetes = [str(c.args[0]) for c in conn.execute.call_args_list]
+        purges = [i for i, r in enumerate(requetes) if "DELETE FROM mesure_rollup_salle" in r]
+        salles = [i for i, r in enumerate(requetes) if "INSERT INTO mesure_rollup_salle" in r]
+        # la salle courante d'un capteur déplacé remplace son ancienne salle sur la fenêtre recalculée
+        assert len(purges) == 9
+        assert all(purge < salle for purge, salle in zip(purges, salles))
+        assert conn.begin.call_count == 3
+        conn.commit.assert_not_called()
+        assert "RELEASE_LOCK" in str(conn.execute.call_args_list[-1].args[0])
+
+    @patch('services.rollup_service.engine')
+    def test_executer_erreur_sans_commit(self, mock_engine):
+        """Test job - une erreur annule la transaction du type et libère le verrou sans commit"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        conn.execute.return_value.scalar.side_effect = [1, datetime(2025, 1, 1, 12, 0), datetime(2025, 1, 1, 12, 5)]
+
+        def executer(query, params=None):
+            if "INSERT INTO mesure_rollup_salle" in str(query):
+                raise RuntimeError("connexion perdue")
+            return conn.execute.return_value
+        conn.execute.side_effect = executer
+
+        # Act
+        with pytest.raises(Exception) as exc_info:
+            self.service.executer()
+
+        # Assert
+        assert "connexion perdue" in str(exc_info.value)
+        conn.commit.assert_not_called()
+        assert not any("rollup_watermark" in str(c.args[0]) and "INSERT" in str(c.args[0])
+                       for c in conn.execute.call_args_list)
+        assert "RELEASE_LOCK" in str(conn.execute.call_args_list[-1].args[0])
+        conn.begin.return_value.__exit__.assert_called_once()
+        assert conn.begin.return_value.__exit__.call_args.args[0] is RuntimeError
+
+    @patch('services.rollup_service.engine')
+    def test_executer_recalcul_force(self, mock_engine):
+        """Test job - recalcul depuis une date donnée, même sans nouvelle mesure"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        watermark = datetime(2025, 1, 1, 12, 0)
+        conn.execute.return_value.scalar.side_effect = [1] + [watermark, watermark] * 3
+
+        # Act
+        result = self.service.executer(depuis=datetime(2024, 12, 1, 8, 30))
+
+        # Assert
+        assert result['pression'] == {'depuis': datetime(2024, 12, 1, 8, 30), 'jusqua': watermark}
+
+    @patch('services.rollup_service.engine')
+    def test_executer_rien_de_nouveau(self, mock_engine):
+        """Test job - aucune nouvelle mesure depuis le watermark"""
+        # Arrange
+        conn = MagicMock()
+        mock_engine.connect.return_value.__enter__.return_value = conn
+        watermark = datetime(2025, 1, 1, 12, 0)
+        conn.execute.return_value.scalar.side_effect = [1] + [watermark, watermark] * 3
+
+        # Act
+        result = self.service.executer()
+
+        # Assert
+        assert result == {'temperature': None, 'humidite': None, 'pression': None}
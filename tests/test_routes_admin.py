@@ -538,4 +538,29 @@ class TestRoutesAdmin:
         
         mock_service.supprimer_capteur.return_value = True
         response = self.client.delete('/api/admin/capteurs/4?confirmer=true')
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+    @patch('routes.admin.query_stats')
+    def test_get_stats_requetes(self, mock_stats):
+        """Test GET /api/admin/requetes/stats - statistiques triées"""
+        # Arrange
+        mock_stats.get_stats.return_value = {'requetes': [], 'par_appelant': [], 'requetes_lentes': []}
+        
+        # Act
+        response = self.client.get('/api/admin/requetes/stats?tri=appels&limite=10')
+        
+        # Assert
+        assert response.status_code == 200
+        assert json.loads(response.data)['data']['requetes'] == []
+        mock_stats.get_stats.assert_called_once_with('appels', 10)
+
+    @patch('routes.admin.query_stats')
+    def test_get_stats_requetes_tri_invalide(self, mock_stats):
+        """Test GET /api/admin/requetes/stats - tri invalide"""
+        # Arrange
+        mock_stats.get_stats.side_effect = ValueError("tri invalide")
+        
+        # Act
+        response = self.client.get('/api/admin/requetes/stats?tri=nom')
+        
+        # Assert
+        assert response.status_code == 400
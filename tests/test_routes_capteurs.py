@@ -2,12 +2,16 @@ import pytest
 import json
 import sys
 import os
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from flask import Flask
 from routes.capteurs import capteurs_bp
+from services.ingestion_buffer import BufferPleinError
+from services.live_service import Abonnement
+from app.database import Resultat
 
 
 class TestRoutesCapteurs:
@@ -165,6 +169,36 @@ class TestRoutesCapteurs:
         assert 'Aucune donnée trouvée pour la salle 999' in data['message']
 
     
+    @patch('routes.capteurs.capteur_service')
+    def test_get_moyennes_salles(self, mock_service):
+        """Test GET /api/capteurs/moyennes?salle_ids=2,1 - plusieurs salles en un appel"""
+        # Arrange
+        mock_service.get_moyennes_salles.return_value = [self.mock_moyennes, {**self.mock_moyennes, 'salle_id': 2}]
+
+        # Act
+        response = self.client.get('/api/capteurs/moyennes?salle_ids=2,1')
+
+        # Assert
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['data'][0] == self.mock_moyennes
+        mock_service.get_moyennes_salles.assert_called_once_with(salle_ids=[1, 2], batiments=None)
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_moyennes_salles_par_batiment(self, mock_service):
+        """Test GET /api/capteurs/moyennes?batiment=A&batiment=B"""
+        # Arrange
+        mock_service.get_moyennes_salles.return_value = []
+
+        # Act
+        response = self.client.get('/api/capteurs/moyennes?batiment=A&batiment=B')
+        invalide = self.client.get('/api/capteurs/moyennes?salle_ids=a')
+
+        # Assert
+        assert response.status_code == 200
+        mock_service.get_moyennes_salles.assert_called_once_with(salle_ids=None, batiments=['A', 'B'])
+        assert invalide.status_code == 400
+
     @patch('routes.capteurs.capteur_service')
     def test_get_donnees_by_capteur_success(self, mock_service):
         """Test GET /api/capteurs/:id/donnees - succès"""
@@ -215,6 +249,55 @@ class TestRoutesCapteurs:
         assert 'Capteur 999 non trouvé ou inactif' in data['message']
 
     
+    @patch('routes.capteurs.capteur_service')
+    def test_get_donnees_by_capteurs(self, mock_service):
+        """Test GET /api/capteurs/donnees?ids=3,1,2 - plusieurs capteurs en un appel"""
+        # Arrange
+        mock_service.get_dernieres_donnees_by_capteurs.return_value = [
+            {'capteur': {'id': 3}, 'donnees': []},
+            {'capteur': {'id': 1}, 'donnees': []}
+        ]
+
+        # Act
+        response = self.client.get('/api/capteurs/donnees?ids=3,1,2,3&limit=5')
+
+        # Assert
+        assert response.status_code == 200
+        data = json.loads(response.data)['data']
+        assert [c['capteur']['id'] for c in data['capteurs']] == [3, 1]
+        assert data['introuvables'] == [2]
+        mock_service.get_dernieres_donnees_by_capteurs.assert_called_once_with([3, 1, 2], 5)
+
+    @patch('routes.capteurs.capteur_service')
+    def test_post_donnees_by_capteurs(self, mock_service):
+        """Test POST /api/capteurs/donnees - longue liste d'IDs dans le corps"""
+        # Arrange
+        mock_service.get_dernieres_donnees_by_capteurs.return_value = []
+
+        # Act
+        response = self.client.post('/api/capteurs/donnees', json={'ids': list(range(1, 1001))})
+
+        # Assert
+        assert response.status_code == 200
+        mock_service.get_dernieres_donnees_by_capteurs.assert_called_once_with(list(range(1, 1001)), 1)
+
+    @patch('routes.capteurs.capteur_service')
+    def test_donnees_by_capteurs_parametres_invalides(self, mock_service):
+        """Test /api/capteurs/donnees - paramètres invalides"""
+        # Act
+        reponses = [
+            self.client.get('/api/capteurs/donnees'),
+            self.client.get('/api/capteurs/donnees?ids=1,a'),
+            self.client.get('/api/capteurs/donnees?ids=1&limit=500'),
+            self.client.post('/api/capteurs/donnees', json={'ids': list(range(1001))}),
+            self.client.post('/api/capteurs/donnees', json={'ids': [1], 'limit': '5'}),
+            self.client.post('/api/capteurs/donnees', json=[1, 2])
+        ]
+
+        # Assert
+        assert [r.status_code for r in reponses] == [400] * 6
+        mock_service.get_dernieres_donnees_by_capteurs.assert_not_called()
+
     @patch('routes.capteurs.capteur_service')
     def test_get_temperature_by_salle_success(self, mock_service):
         """Test GET /api/capteurs/salles/:id/temperature - succès"""
@@ -234,6 +317,128 @@ class TestRoutesCapteurs:
         assert data['data'] == mock_temperatures
         mock_service.get_temperature_by_salle.assert_called_once_with(1, 10)
 
+    @patch('routes.capteurs.capteur_service')
+    def test_get_temperature_by_salle_intervalle(self, mock_service):
+        """Test GET /api/capteurs/salles/:id/temperature?from=&to=&max_points= - historique réduit"""
+        # Arrange
+        mock_service.get_historique.return_value = []
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/temperature?from=2025-01-01T00:00:00&to=2025-01-08T00:00:00&max_points=200')
+        
+        # Assert
+        assert response.status_code == 200
+        mock_service.get_temperature_by_salle.assert_not_called()
+        mock_service.get_historique.assert_called_once_with(
+            'temperature', datetime(2025, 1, 1), datetime(2025, 1, 8), 200, 'moyenne',
+            salle_id=1, capteur_id=None
+        )
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_pression_by_salle_intervalle_lttb(self, mock_service):
+        """Test GET /api/capteurs/salles/:id/pression?max_points=&methode=lttb - 24h par défaut"""
+        # Arrange
+        mock_service.get_historique.return_value = []
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/pression?max_points=100&methode=lttb')
+        
+        # Assert
+        assert response.status_code == 200
+        args = mock_service.get_historique.call_args[0]
+        assert args[0] == 'pression'
+        assert args[2] - args[1] == timedelta(days=1)
+        assert args[3:] == (100, 'lttb')
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_temperature_by_capteur_intervalle_invalide(self, mock_service):
+        """Test GET /api/capteurs/:id/temperature - période invalide"""
+        # Act
+        response = self.client.get('/api/capteurs/1/temperature?from=2025-01-08&to=2025-01-01')
+        response_date = self.client.get('/api/capteurs/1/temperature?from=hier')
+        response_points = self.client.get('/api/capteurs/1/temperature?max_points=100000')
+        
+        # Assert
+        assert response.status_code == 400
+        assert response_date.status_code == 400
+        assert response_points.status_code == 400
+        mock_service.get_historique.assert_not_called()
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_temperature_by_salle_format_compact(self, mock_service):
+        """Test GET /api/capteurs/salles/:id/temperature?format=compact - colonnes + lignes"""
+        # Arrange
+        mock_service.get_temperature_by_salle.return_value = Resultat(
+            ['capteur_id', 'valeur'], [(1, 25.5), (1, 25.4)]
+        )
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/temperature?limit=2&format=compact')
+        
+        # Assert
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['data'] == {'columns': ['capteur_id', 'valeur'], 'rows': [[1, 25.5], [1, 25.4]]}
+        mock_service.get_temperature_by_salle.assert_called_once_with(1, 2, tabulaire=True)
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_temperature_by_salle_format_ndjson(self, mock_service):
+        """Test GET /api/capteurs/salles/:id/temperature?format=ndjson - réponse streamée par lots"""
+        # Arrange
+        def lots():
+            yield Resultat(['capteur_id', 'valeur'], [(1, 25.5), (1, 25.4)])
+            yield Resultat(['capteur_id', 'valeur'], [(2, 24.0)])
+        mock_service.get_temperature_by_salle.return_value = lots()
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/temperature?limit=1000000&format=ndjson')
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        lignes = [json.loads(ligne) for ligne in response.get_data(as_text=True).splitlines()]
+        assert lignes == [
+            {'capteur_id': 1, 'valeur': 25.5},
+            {'capteur_id': 1, 'valeur': 25.4},
+            {'capteur_id': 2, 'valeur': 24.0}
+        ]
+        mock_service.get_temperature_by_salle.assert_called_once_with(1, 1000000, flux=True)
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_temperature_by_capteur_format_csv(self, mock_service):
+        """Test GET /api/capteurs/:id/temperature?format=csv - export CSV streamé"""
+        # Arrange
+        mock_service.get_temperature_by_capteur.return_value = iter([
+            Resultat(['capteur_id', 'valeur'], [(1, 25.5)]),
+            Resultat(['capteur_id', 'valeur'], [(1, 25.4)])
+        ])
+        
+        # Act
+        response = self.client.get('/api/capteurs/1/temperature?limit=2&format=csv')
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'temperature_capteur_1.csv' in response.headers['Content-Disposition']
+        assert response.get_data(as_text=True).splitlines() == ['capteur_id,valeur', '1,25.5', '1,25.4']
+
+    @patch('routes.capteurs.capteur_service')
+    def test_get_pression_by_salle_flux_erreur(self, mock_service):
+        """Test format=ndjson - une erreur sur le premier lot donne une réponse 500 JSON"""
+        # Arrange
+        def lots():
+            raise Exception("Erreur DB")
+            yield
+        mock_service.get_pression_by_salle.return_value = lots()
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/pression?format=ndjson')
+        
+        # Assert
+        assert response.status_code == 500
+        assert json.loads(response.data)['success'] is False
+
     @patch('routes.capteurs.capteur_service')
     def test_get_temperature_by_salle_empty(self, mock_service):
         """Test GET /api/capteurs/salles/:id/temperature - aucune donnée"""
@@ -718,4 +923,152 @@ class TestRoutesCapteurs:
         
         assert len(alertes['pression']) == 1
         assert alertes['pression'][0]['salle'] == 'A02'
-        assert 'Pression trop élevée' in alertes['pression'][0]['message']
\ No newline at end of file
+        assert 'Pression trop élevée' in alertes['pression'][0]['message']
+    @patch('routes.capteurs.mesure_service')
+    def test_post_mesures_json(self, mock_service):
+        """Test POST /api/capteurs/mesures - lot JSON"""
+        # Arrange
+        mock_service.enregistrer_mesures.return_value = {
+            'inserees': 2, 'par_type': {'temperature': 2, 'humidite': 0, 'pression': 0},
+            'rejetees': 0, 'erreurs': [], 'differee': False
+        }
+        mesures = [{'capteur_id': 1, 'valeur': 21.5}, {'capteur_id': 1, 'valeur': 21.6}]
+        
+        # Act
+        response = self.client.post('/api/capteurs/mesures', json={'mesures': mesures})
+        
+        # Assert
+        assert response.status_code == 201
+        data = json.loads(response.data)
+        assert data['data']['inserees'] == 2
+        assert 'mesures_par_seconde' in data['data']
+        mock_service.enregistrer_mesures.assert_called_once_with(mesures, buffer=None)
+
+    @patch('routes.capteurs.mesure_service')
+    def test_post_mesures_ndjson(self, mock_service):
+        """Test POST /api/capteurs/mesures - lot NDJSON"""
+        # Arrange
+        mock_service.enregistrer_mesures.return_value = {
+            'inserees': 2, 'par_type': {}, 'rejetees': 0, 'erreurs': [], 'differee': False
+        }
+        body = '{"capteur_id": 1, "valeur": 21.5}\n\n{"capteur_id": 2, "valeur": 40}\n'
+        
+        # Act
+        response = self.client.post('/api/capteurs/mesures', data=body, content_type='application/x-ndjson')
+        
+        # Assert
+        assert response.status_code == 201
+        mock_service.enregistrer_mesures.assert_called_once_with([
+            {'capteur_id': 1, 'valeur': 21.5},
+            {'capteur_id': 2, 'valeur': 40}
+        ], buffer=None)
+
+    @patch('routes.capteurs.mesure_service')
+    def test_post_mesures_invalides(self, mock_service):
+        """Test POST /api/capteurs/mesures - corps invalide ou aucune mesure valide"""
+        # Arrange
+        mock_service.enregistrer_mesures.return_value = {
+            'inserees': 0, 'par_type': {}, 'rejetees': 1, 'erreurs': [{'index': 0, 'erreur': 'x'}],
+            'differee': False
+        }
+        
+        # Act
+        response_vide = self.client.post('/api/capteurs/mesures', json=[])
+        response_corps = self.client.post('/api/capteurs/mesures', json={'capteur_id': 1})
+        response_ndjson = self.client.post('/api/capteurs/mesures', data='{pas du json', content_type='application/x-ndjson')
+        response_rejet = self.client.post('/api/capteurs/mesures', json=[{'capteur_id': 99, 'valeur': 1}])
+        
+        # Assert
+        assert response_vide.status_code == 400
+        assert response_corps.status_code == 400
+        assert response_ndjson.status_code == 400
+        assert response_rejet.status_code == 400
+        assert json.loads(response_rejet.data)['data']['rejetees'] == 1
+
+    @patch('routes.capteurs.should_use_ingestion_buffer', return_value=True)
+    @patch('routes.capteurs.mesure_service')
+    def test_post_mesures_buffer(self, mock_service, mock_should_use):
+        """Test POST /api/capteurs/mesures - écriture différée via le buffer"""
+        # Arrange
+        mock_service.enregistrer_mesures.return_value = {
+            'inserees': 1, 'par_type': {}, 'rejetees': 0, 'erreurs': [], 'differee': True
+        }
+        
+        # Act
+        response = self.client.post('/api/capteurs/mesures', json=[{'capteur_id': 1, 'valeur': 21.5}])
+        
+        # Assert
+        assert response.status_code == 202
+        assert mock_service.enregistrer_mesures.call_args[1]['buffer'] is not None
+
+    @patch('routes.capteurs.mesure_service')
+    def test_post_mesures_buffer_plein(self, mock_service):
+        """Test POST /api/capteurs/mesures - buffer plein (429)"""
+        # Arrange
+        mock_service.enregistrer_mesures.side_effect = BufferPleinError("Buffer d'ingestion plein")
+        
+        # Act
+        response = self.client.post('/api/capteurs/mesures', json=[{'capteur_id': 1, 'valeur': 21.5}])
+        
+        # Assert
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+
+    @patch('routes.capteurs.live_service')
+    @patch('routes.capteurs.capteur_service')
+    def test_stream_salle(self, mock_service, mock_live):
+        """Test GET /api/capteurs/salles/1/stream - moyennes initiales puis mesures en SSE"""
+        # Arrange
+        mock_service.get_moyennes_dernieres_donnees_by_salle.return_value = self.mock_moyennes
+        abonnement = Abonnement(mock_live, {1})
+        abonnement.publier(('mesure', {'capteur_id': 1, 'valeur': 21.5}))
+        mock_live.abonner.return_value = abonnement
+        
+        # Act
+        response = self.client.get('/api/capteurs/salles/1/stream')
+        morceaux = iter(response.response)
+        evenements = [next(morceaux).decode() for _ in range(3)]
+        response.close()
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert evenements[0] == 'retry: 3000\n\n'
+        assert evenements[1].startswith('event: moyennes\ndata: ')
+        assert json.loads(evenements[1].split('data: ')[1]) == self.mock_moyennes
+        assert evenements[2].startswith('event: mesure\ndata: ')
+        assert json.loads(evenements[2].split('data: ')[1]) == {'capteur_id': 1, 'valeur': 21.5}
+        mock_live.abonner.assert_called_once_with({1})
+        mock_live.desabonner.assert_called_once_with(abonnement)
+
+    @patch('routes.capteurs.live_service')
+    @patch('routes.capteurs.capteur_service')
+    def test_stream_salles(self, mock_service, mock_live):
+        """Test GET /api/capteurs/stream?salle_ids=2,1 - moyennes initiales des salles demandées"""
+        # Arrange
+        mock_service.get_moyennes_salles.return_value = [{'salle_id': 1}, {'salle_id': 2}]
+        mock_live.abonner.return_value = Abonnement(mock_live, {1, 2})
+        
+        # Act
+        response = self.client.get('/api/capteurs/stream?salle_ids=2,1')
+        morceaux = iter(response.response)
+        evenements = [next(morceaux).decode() for _ in range(3)]
+        response.close()
+        
+        # Assert
+        assert response.status_code == 200
+        assert [json.loads(e.split('data: ')[1]) for e in evenements[1:]] == [{'salle_id': 1}, {'salle_id': 2}]
+        assert all(e.endswith('\n\n') for e in evenements)
+        mock_service.get_moyennes_salles.assert_called_once_with(salle_ids=[1, 2])
+        mock_live.abonner.assert_called_once_with([1, 2])
+
+    @patch('routes.capteurs.live_service')
+    def test_stream_salles_ids_invalides(self, mock_live):
+        """Test GET /api/capteurs/stream?salle_ids=a - paramètre invalide"""
+        # Act
+        response = self.client.get('/api/capteurs/stream?salle_ids=1,a')
+        
+        # Assert
+        assert response.status_code == 400
+        mock_live.abonner.assert_not_called()
@@ -0,0 +1,164 @@
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from app.cache import CacheReponses
+from app.single_flight import SingleFlight
+
+
+def lancer(nb, cible):
+    """Démarrer nb threads sur cible et renvoyer la liste des threads"""
+    threads = [threading.Thread(target=cible) for _ in range(nb)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def attendre_partages(vols, nb, delai=2):
+    """Attendre que nb appels soient en attente du calcul en cours"""
+    fin = time.monotonic() + delai
+    while vols.partages < nb and time.monotonic() < fin:
+        time.sleep(0.001)
+
+
+class TestSingleFlight:
+    """Tests pour le regroupement des appels concurrents identiques"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.vols = SingleFlight()
+        self.liberer = threading.Event()
+        self.appels = 0
+        self.resultats = []
+        self.erreurs = []
+
+    def calcul(self):
+        self.appels += 1
+        self.liberer.wait(2)
+        return {'salles': 3}
+
+    def appeler(self, cle='conformite', calcul=None):
+        try:
+            self.resultats.append(self.vols.executer(cle, calcul or self.calcul))
+        except Exception as e:
+            self.erreurs.append(e)
+
+    def test_appels_simultanes_partagent_un_calcul(self):
+        """Test que 20 appels simultanés n'exécutent le calcul qu'une fois"""
+        # Arrange
+        meneur = lancer(1, self.appeler)
+        while self.vols.en_cours() == 0:
+            time.sleep(0.001)
+        suiveurs = lancer(19, self.appeler)
+        attendre_partages(self.vols, 19)
+
+        # Act
+        self.liberer.set()
+        for thread in meneur + suiveurs:
+            thread.join()
+
+        # Assert
+        assert self.appels == 1
+        assert len(self.resultats) == 20
+        assert all(resultat is self.resultats[0] for resultat in self.resultats)
+        assert self.vols.partages == 19
+        assert self.vols.en_cours() == 0
+
+    def test_cles_differentes_non_partagees(self):
+        """Test que des arguments différents donnent des calculs distincts"""
+        # Arrange
+        self.liberer.set()
+
+        # Act
+        self.appeler(('conformite', 10))
+        self.appeler(('conformite', 20))
+
+        # Assert
+        assert self.appels == 2
+        assert self.vols.partages == 0
+
+    def test_appels_successifs_recalculent(self):
+        """Test qu'un appel arrivé après la fin du calcul en relance un"""
+        # Arrange
+        self.liberer.set()
+
+        # Act
+        self.appeler()
+        self.appeler()
+
+        # Assert
+        assert self.appels == 2
+
+    def test_erreur_transmise_a_tous(self):
+        """Test que l'exception du calcul est levée pour chaque appel en attente"""
+        # Arrange
+        def calcul_en_erreur():
+            self.liberer.wait(2)
+            raise Exception("Erreur SQL")
+
+        meneur = lancer(1, lambda: self.appeler(calcul=calcul_en_erreur))
+        while self.vols.en_cours() == 0:
+            time.sleep(0.001)
+        suiveurs = lancer(4, lambda: self.appeler(calcul=calcul_en_erreur))
+        attendre_partages(self.vols, 4)
+
+        # Act
+        self.liberer.set()
+        for thread in meneur + suiveurs:
+            thread.join()
+
+        # Assert
+        assert len(self.erreurs) == 5
+        assert all(str(e) == "Erreur SQL" for e in self.erreurs)
+        assert self.vols.en_cours() == 0
+
+    def test_interruption_du_meneur(self):
+        """Test qu'une interruption du calcul ne renvoie pas None aux appels en attente"""
+        # Arrange
+        vols = SingleFlight()
+
+        def calcul():
+            raise KeyboardInterrupt()
+
+        # Act / Assert
+        with pytest.raises(KeyboardInterrupt):
+            vols.executer('cle', calcul)
+        assert vols.en_cours() == 0
+
+
+class TestCacheSingleFlight:
+    """Tests du regroupement des calculs par le cache des réponses"""
+
+    def test_absence_simultanee_un_seul_calcul(self):
+        """Test que des absences simultanées dans le cache ne calculent qu'une fois"""
+        # Arrange
+        cache = CacheReponses()
+        liberer = threading.Event()
+        appels = []
+        resultats = []
+
+        def calcul():
+            appels.append(1)
+            liberer.wait(2)
+            return [{'salle': 1}]
+
+        def appeler():
+            resultats.append(cache.memoriser('conformite', calcul, ttl=10))
+
+        threads = lancer(10, appeler)
+        attendre_partages(cache._vols, 9)
+
+        # Act
+        liberer.set()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert len(appels) == 1
+        assert len(resultats) == 10
+        assert cache.cache_info().appels_partages == 9
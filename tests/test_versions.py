@@ -0,0 +1,85 @@
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, jsonify
+from app.compression import Compression
+from app.versions import DataVersions, etag_versions
+
+
+class TestVersions:
+    """Tests pour les versions de tables et les ETags"""
+
+    def setup_method(self):
+        """Setup avant chaque test"""
+        self.appels = 0
+        self.app = Flask(__name__)
+
+        @self.app.route('/salles')
+        @etag_versions('salle')
+        def salles():
+            self.appels += 1
+            return jsonify(success=True, data=[{'id': 1, 'nom': 'A01'}] * 100)
+
+        self.client = self.app.test_client()
+
+    def test_versions_partagees_par_fichier(self, tmp_path):
+        """Test versions - même jeton pour deux instances, nouveau jeton à chaque écriture"""
+        # Arrange
+        worker_1 = DataVersions(str(tmp_path))
+        worker_2 = DataVersions(str(tmp_path))
+        version = worker_1.get_version('salle')
+
+        # Act
+        worker_2.incrementer('salle')
+
+        # Assert
+        assert worker_2.get_version('salle') != version
+        assert worker_1.get_version('salle') == worker_2.get_version('salle')
+        assert worker_1.get_versions(('salle', 'capteur'))[0] == worker_2.get_version('salle')
+
+    def test_304_sans_executer_la_vue(self, tmp_path):
+        """Test If-None-Match - 304 sans appel de la vue, 200 après une écriture"""
+        with patch('app.versions.data_versions', DataVersions(str(tmp_path))) as versions:
+            # Arrange
+            premiere = self.client.get('/salles')
+            etag = premiere.headers['ETag']
+
+            # Act
+            inchangee = self.client.get('/salles', headers={'If-None-Match': etag})
+            versions.incrementer('salle')
+            modifiee = self.client.get('/salles', headers={'If-None-Match': etag})
+
+        # Assert
+        assert premiere.status_code == 200
+        assert inchangee.status_code == 304
+        assert inchangee.data == b''
+        assert modifiee.status_code == 200
+        assert modifiee.headers['ETag'] != etag
+        assert self.appels == 2
+
+    def test_etag_par_url(self, tmp_path):
+        """Test ETag - les paramètres de la requête font partie de l'ETag"""
+        with patch('app.versions.data_versions', DataVersions(str(tmp_path))):
+            etag = self.client.get('/salles?limit=10').headers['ETag']
+            response = self.client.get('/salles?limit=20', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+
+    def test_etag_variante_compressee(self, tmp_path):
+        """Test ETag fort - une variante par encodage, reconnue en If-None-Match"""
+        # Arrange
+        Compression(taille_min=100).init_app(self.app)
+
+        with patch('app.versions.data_versions', DataVersions(str(tmp_path))):
+            # Act
+            compressee = self.client.get('/salles', headers={'Accept-Encoding': 'gzip'})
+            etag = compressee.headers['ETag']
+            response = self.client.get('/salles', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        # Assert
+        assert etag.endswith('-gzip"')
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
@@ -0,0 +1,138 @@
+import sys
+import os
+import json
+import queue
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from app.flux import servir_websocket, traiter_commande
+from services.live_service import LiveService
+
+DECONNEXION = object()
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+class FausseWebSocket:
+    """WebSocket simulée : messages du client dans une file, messages envoyés dans une liste"""
+
+    def __init__(self):
+        self.entrants = queue.Queue()
+        self.envoyes = []
+        self.connected = True
+
+    def receive(self):
+        message = self.entrants.get()
+        if message is DECONNEXION:
+            self.connected = False
+            raise ConnectionClosed()
+        return message
+
+    def send(self, message):
+        if not self.connected:
+            raise ConnectionClosed()
+        self.envoyes.append(json.loads(message))
+
+    def attendre(self, nb, delai=2):
+        fin = time.monotonic() + delai
+        while len(self.envoyes) < nb and time.monotonic() < fin:
+            time.sleep(0.001)
+        return self.envoyes
+
+
+class TestWebSocket:
+    """Tests pour les sessions WebSocket du hub de diffusion"""
+
+    def setup_method(self):
+        """Setup avant chaque test (boucle de détection neutralisée)"""
+        self.hub = LiveService(intervalle=60, taille_file=10)
+        self.hub._thread = threading.current_thread()
+        self.ws = FausseWebSocket()
+
+    def demarrer(self):
+        session = threading.Thread(target=servir_websocket, args=(self.ws, self.hub, json), kwargs={'keepalive': 0.05})
+        session.start()
+        return session
+
+    def test_commande_abonner(self):
+        """Test qu'un client s'abonne à plusieurs salles et reçoit leurs événements"""
+        # Arrange
+        session = self.demarrer()
+
+        # Act
+        self.ws.entrants.put(json.dumps({'action': 'abonner', 'salle_ids': [2, 1]}))
+        self.ws.attendre(1)
+        self.hub.publier(1, 'mesure', {'capteur_id': 4})
+        self.hub.publier(3, 'mesure', {'capteur_id': 9})
+        self.ws.attendre(2)
+        self.ws.entrants.put(DECONNEXION)
+        session.join(2)
+
+        # Assert
+        assert self.ws.envoyes == [
+            {'event': 'abonnements', 'data': {'salle_ids': [1, 2]}},
+            {'event': 'mesure', 'data': {'capteur_id': 4}}
+        ]
+        assert not session.is_alive()
+        assert self.hub.nb_abonnements() == 0
+        assert self.hub._par_salle == {}
+
+    def test_commande_desabonner(self):
+        """Test qu'une salle retirée ne reçoit plus d'événements"""
+        # Arrange
+        session = self.demarrer()
+        self.ws.entrants.put(json.dumps({'action': 'abonner', 'salle_ids': [1, 2]}))
+        self.ws.attendre(1)
+
+        # Act
+        self.ws.entrants.put(json.dumps({'action': 'desabonner', 'salle_ids': [1]}))
+        self.ws.attendre(2)
+        destinataires = self.hub.publier(1, 'mesure', {})
+        self.ws.entrants.put(DECONNEXION)
+        session.join(2)
+
+        # Assert
+        assert self.ws.envoyes[1] == {'event': 'abonnements', 'data': {'salle_ids': [2]}}
+        assert destinataires == 0
+
+    def test_commandes_invalides(self):
+        """Test les réponses d'erreur aux commandes invalides"""
+        # Arrange
+        abonnement = self.hub.abonner(set())
+
+        # Act
+        reponses = [
+            traiter_commande(abonnement, 'pas du json', json),
+            traiter_commande(abonnement, '[1, 2]', json),
+            traiter_commande(abonnement, json.dumps({'action': 'effacer'}), json),
+            traiter_commande(abonnement, json.dumps({'action': 'abonner', 'salle_ids': ['a']}), json),
+            traiter_commande(abonnement, json.dumps({'action': 'abonner', 'salle_ids': list(range(501))}), json),
+            traiter_commande(abonnement, json.dumps({'action': 'ping'}), json),
+        ]
+
+        # Assert
+        assert [r['event'] for r in reponses] == ['erreur'] * 5 + ['pong']
+        assert abonnement.salle_ids == set()
+
+    def test_client_lent(self):
+        """Test qu'un client qui ne lit pas perd ses événements sans bloquer la diffusion"""
+        # Arrange
+        lent = self.hub.abonner({1})
+        rapide = self.hub.abonner({1})
+
+        # Act
+        debut = time.monotonic()
+        for i in range(50):
+            self.hub.publier(1, 'mesure', i)
+            while not rapide.file.empty():
+                rapide.file.get_nowait()
+        duree = time.monotonic() - debut
+
+        # Assert
+        assert lent.perdus == 40
+        assert rapide.perdus == 0
+        assert duree < 1